@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+"""
+Migração do analytics de receita e conversão
+Cria analytics_rollups (totais do funil por hora/dia, bot e plano) e registra o plano
+escolhido em payments/payments_history. Depois rode migrations/backfill_analytics.py
+para preencher os rollups com os pagamentos existentes
+"""
+
+import sys
+import os
+sys.path.append('/app')
+
+from src.database.models import db
+from src.app import create_app
+from sqlalchemy import text
+
+def migrate_analytics_rollups():
+    """Cria analytics_rollups e adiciona plan_name em payments e payments_history"""
+    
+    app = create_app(start_bots=False, consume_webhooks=False)
+    
+    with app.app_context():
+        try:
+            print("🔄 Iniciando migração do analytics...")
+            
+            migration_queries = [
+                "ALTER TABLE payments ADD COLUMN IF NOT EXISTS plan_name VARCHAR(100);",
+                "ALTER TABLE payments_history ADD COLUMN IF NOT EXISTS plan_name VARCHAR(100);",
+                """CREATE TABLE IF NOT EXISTS analytics_rollups (
+                    id SERIAL PRIMARY KEY,
+                    period VARCHAR(5) NOT NULL,
+                    bucket TIMESTAMP NOT NULL,
+                    bot_id INTEGER NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    plan VARCHAR(100) NOT NULL DEFAULT '',
+                    starts INTEGER NOT NULL DEFAULT 0,
+                    pix_generated INTEGER NOT NULL DEFAULT 0,
+                    payments INTEGER NOT NULL DEFAULT 0,
+                    revenue DOUBLE PRECISION NOT NULL DEFAULT 0,
+                    CONSTRAINT uq_analytics_rollups_key UNIQUE (period, bucket, bot_id, plan)
+                );""",
+                "CREATE INDEX IF NOT EXISTS ix_analytics_rollups_user_period_bucket ON analytics_rollups (user_id, period, bucket);",
+            ]
+            
+            for query in migration_queries:
+                try:
+                    db.session.execute(text(query))
+                    print(f"✅ Executado: {query[:50]}...")
+                except Exception as e:
+                    if "already exists" in str(e).lower() or "duplicate column" in str(e).lower():
+                        print(f"⚠️  Já existe: {query[:50]}...")
+                    else:
+                        print(f"❌ Erro: {e}")
+            
+            db.session.commit()
+            
+            print("✅ Migração concluída com sucesso!")
+            
+        except Exception as e:
+            print(f"❌ Erro durante migração: {e}")
+            db.session.rollback()
+            raise
+
+if __name__ == "__main__":
+    migrate_analytics_rollups()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+
+"""
+Migração para registrar a última mudança de configuração de cada bot
+(o reconciliador processa só os bots com updated_at novo, sem varrer a tabela)
+O trigger de NOTIFY do Postgres é instalado pelo próprio reconciliador ao iniciar
+"""
+
+import sys
+import os
+sys.path.append('/app')
+
+from src.database.models import db
+from src.app import create_app
+from sqlalchemy import text
+
+def migrate_bot_updated_at():
+    """Adiciona telegram_bots.updated_at, preenche com created_at e cria o índice"""
+    
+    app = create_app(start_bots=False)
+    
+    with app.app_context():
+        try:
+            print("🔄 Iniciando migração de updated_at em telegram_bots...")
+            
+            migration_queries = [
+                "ALTER TABLE telegram_bots ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;",
+                "UPDATE telegram_bots SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE updated_at IS NULL;",
+                "CREATE INDEX IF NOT EXISTS ix_telegram_bots_updated_at ON telegram_bots (updated_at);",
+            ]
+            
+            for query in migration_queries:
+                try:
+                    db.session.execute(text(query))
+                    print(f"✅ Executado: {query[:50]}...")
+                except Exception as e:
+                    if "already exists" in str(e).lower() or "duplicate column" in str(e).lower():
+                        print(f"⚠️  Campo já existe: {query[:50]}...")
+                    else:
+                        print(f"❌ Erro: {e}")
+            
+            db.session.commit()
+            
+            print("✅ Migração concluída com sucesso!")
+            
+        except Exception as e:
+            print(f"❌ Erro durante migração: {e}")
+            db.session.rollback()
+            raise
+
+if __name__ == "__main__":
+    migrate_bot_updated_at()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+"""
+Migração dos índices de payments e da tabela de histórico
+(bot_id, status) para o painel, índice parcial dos pendentes por vencimento para a
+reconciliação e (user_id, created_at) para relatórios; payments_history recebe os
+pagamentos encerrados movidos pelo arquivador
+"""
+
+import sys
+import os
+sys.path.append('/app')
+
+from src.database.models import db
+from src.app import create_app
+from sqlalchemy import text
+
+def migrate_payment_indexes():
+    """Cria os índices de payments e a tabela payments_history"""
+    
+    app = create_app(start_bots=False)
+    
+    with app.app_context():
+        try:
+            print("🔄 Iniciando migração dos índices de payments...")
+            
+            migration_queries = [
+                "CREATE INDEX IF NOT EXISTS ix_payments_bot_status ON payments (bot_id, status);",
+                "CREATE INDEX IF NOT EXISTS ix_payments_pending_expires ON payments (expires_at) WHERE status = 'pending';",
+                "CREATE INDEX IF NOT EXISTS ix_payments_user_created ON payments (user_id, created_at);",
+                """CREATE TABLE IF NOT EXISTS payments_history (
+                    id INTEGER PRIMARY KEY,
+                    pix_code VARCHAR(255) NOT NULL,
+                    amount DOUBLE PRECISION NOT NULL,
+                    status VARCHAR(50) NOT NULL,
+                    telegram_user_id BIGINT,
+                    telegram_username VARCHAR(255),
+                    pix_key VARCHAR(255),
+                    created_at TIMESTAMP,
+                    paid_at TIMESTAMP,
+                    expires_at TIMESTAMP,
+                    archived_at TIMESTAMP NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    bot_id INTEGER NOT NULL
+                );""",
+                "CREATE INDEX IF NOT EXISTS ix_payments_history_pix_code ON payments_history (pix_code);",
+                "CREATE INDEX IF NOT EXISTS ix_payments_history_user_created ON payments_history (user_id, created_at);",
+                "CREATE INDEX IF NOT EXISTS ix_payments_history_bot_created ON payments_history (bot_id, created_at);",
+                "ANALYZE payments;",
+            ]
+            
+            for query in migration_queries:
+                try:
+                    db.session.execute(text(query))
+                    print(f"✅ Executado: {query[:50]}...")
+                except Exception as e:
+                    if "already exists" in str(e).lower():
+                        print(f"⚠️  Já existe: {query[:50]}...")
+                    else:
+                        print(f"❌ Erro: {e}")
+            
+            db.session.commit()
+            
+            print("✅ Migração concluída com sucesso!")
+            print("💡 Em tabelas grandes, prefira criar os índices com CREATE INDEX CONCURRENTLY fora de transação")
+            
+        except Exception as e:
+            print(f"❌ Erro durante migração: {e}")
+            db.session.rollback()
+            raise
+
+if __name__ == "__main__":
+    migrate_payment_indexes()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+"""
+Migração para registrar no pagamento o usuário do Telegram que gerou o PIX
+(necessário para liberar o acesso automaticamente quando o pagamento é confirmado)
+"""
+
+import sys
+import os
+sys.path.append('/app')
+
+from src.database.models import db
+from src.app import create_app
+from sqlalchemy import text
+
+def migrate_payment_telegram_user():
+    """Adiciona telegram_user_id e telegram_username em payments"""
+    
+    app = create_app(start_bots=False)
+    
+    with app.app_context():
+        try:
+            print("🔄 Iniciando migração dos campos do cliente em payments...")
+            
+            migration_queries = [
+                "ALTER TABLE payments ADD COLUMN IF NOT EXISTS telegram_user_id BIGINT;",
+                "ALTER TABLE payments ADD COLUMN IF NOT EXISTS telegram_username VARCHAR(255);",
+            ]
+            
+            for query in migration_queries:
+                try:
+                    db.session.execute(text(query))
+                    print(f"✅ Executado: {query[:50]}...")
+                except Exception as e:
+                    if "already exists" in str(e).lower() or "duplicate column" in str(e).lower():
+                        print(f"⚠️  Campo já existe: {query[:50]}...")
+                    else:
+                        print(f"❌ Erro: {e}")
+            
+            db.session.commit()
+            
+            print("✅ Migração concluída com sucesso!")
+            
+        except Exception as e:
+            print(f"❌ Erro durante migração: {e}")
+            db.session.rollback()
+            raise
+
+if __name__ == "__main__":
+    migrate_payment_telegram_user()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+
+"""
+Reconstrói os rollups de analytics a partir de payments e payments_history
+PIX gerados, pagamentos e receita são recalculados em lote no banco; os /start
+(que só existem nos rollups) são mantidos
+
+Uso:
+    python migrations/backfill_analytics.py            # todo o histórico
+    python migrations/backfill_analytics.py --days 7   # só os últimos 7 dias
+"""
+
+import sys
+import os
+import argparse
+from datetime import datetime, timedelta
+sys.path.append('/app')
+
+from src.database.models import db
+from src.app import create_app
+from src.services.analytics import rebuild_rollups
+
+def backfill_analytics(days=None):
+    """Recalcula os rollups horários e diários"""
+    
+    app = create_app(start_bots=False, consume_webhooks=False)
+    
+    with app.app_context():
+        since = datetime.utcnow() - timedelta(days=days) if days else None
+        print(f"🔄 Reconstruindo rollups de analytics {'dos últimos %d dias' % days if days else 'de todo o histórico'}...")
+        
+        started = datetime.utcnow()
+        try:
+            written = rebuild_rollups(db.engine, since)
+        except Exception as e:
+            print(f"❌ Erro durante o backfill: {e}")
+            raise
+        
+        elapsed = (datetime.utcnow() - started).total_seconds()
+        print(f"✅ Backfill concluído: {written} linhas de rollup em {elapsed:.1f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconstrói os rollups de analytics a partir dos pagamentos")
+    parser.add_argument('--days', type=int, default=None, help="recalcula só os últimos N dias")
+    args = parser.parse_args()
+    backfill_analytics(args.days)
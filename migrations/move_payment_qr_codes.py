@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+"""
+Migração para tirar a imagem base64 do QR Code da tabela payments
+O PNG passa a ficar em payment_qr_codes até o PIX expirar; pagamentos antigos
+têm o QR gerado de novo a partir do código copia e cola (pix_key) quando necessário
+"""
+
+import sys
+import os
+sys.path.append('/app')
+
+from src.database.models import db
+from src.app import create_app
+from sqlalchemy import text
+
+def migrate_payment_qr_codes():
+    """Cria payment_qr_codes e remove payments.pix_qr_code"""
+    
+    app = create_app(start_bots=False)
+    
+    with app.app_context():
+        try:
+            print("🔄 Iniciando migração dos QR Codes de payments...")
+            
+            migration_queries = [
+                """CREATE TABLE IF NOT EXISTS payment_qr_codes (
+                    payment_id INTEGER PRIMARY KEY REFERENCES payments (id) ON DELETE CASCADE,
+                    png BYTEA NOT NULL,
+                    source VARCHAR(10) NOT NULL,
+                    created_at TIMESTAMP,
+                    expires_at TIMESTAMP NOT NULL
+                );""",
+                "CREATE INDEX IF NOT EXISTS ix_payment_qr_codes_expires_at ON payment_qr_codes (expires_at);",
+                "ALTER TABLE payments DROP COLUMN IF EXISTS pix_qr_code;",
+            ]
+            
+            for query in migration_queries:
+                try:
+                    db.session.execute(text(query))
+                    print(f"✅ Executado: {query[:50]}...")
+                except Exception as e:
+                    if "already exists" in str(e).lower() or "does not exist" in str(e).lower():
+                        print(f"⚠️  Já aplicado: {query[:50]}...")
+                    else:
+                        print(f"❌ Erro: {e}")
+            
+            db.session.commit()
+            
+            print("✅ Migração concluída com sucesso!")
+            print("💡 Rode VACUUM FULL payments (em janela de manutenção) para devolver o espaço ao disco")
+            
+        except Exception as e:
+            print(f"❌ Erro durante migração: {e}")
+            db.session.rollback()
+            raise
+
+if __name__ == "__main__":
+    migrate_payment_qr_codes()
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+from flask import Blueprint, request, jsonify
+from flask_login import login_required, current_user
+from ...services import analytics
+
+analytics_bp = Blueprint('analytics', __name__, url_prefix='/analytics')
+
+MAX_DAYS = 366  # período máximo por consulta
+MAX_HOURLY_DAYS = 14  # série por hora só para períodos curtos
+
+def _parse_range():
+    """Período da consulta: ?start=&end= (YYYY-MM-DD, UTC) ou ?days=N até agora (padrão 30)"""
+    now = datetime.utcnow()
+    try:
+        if request.args.get('start'):
+            start = datetime.strptime(request.args['start'], '%Y-%m-%d')
+            end = datetime.strptime(request.args['end'], '%Y-%m-%d') + timedelta(days=1) if request.args.get('end') else now
+        else:
+            days = int(request.args.get('days', 30))
+            end = now
+            start = now - timedelta(days=days)
+    except ValueError:
+        raise ValueError('Período inválido: use days=N ou start/end no formato YYYY-MM-DD')
+
+    if end <= start or end - start > timedelta(days=MAX_DAYS):
+        raise ValueError(f'Período deve ter entre 1 e {MAX_DAYS} dias')
+    return start, end
+
+def _bot_filter():
+    bot_id = request.args.get('bot_id')
+    return int(bot_id) if bot_id else None
+
+def _range_payload(start, end) -> dict:
+    return {'start': start.isoformat(), 'end': end.isoformat()}
+
+@analytics_bp.route('/api/funnel', methods=['GET'])
+@login_required
+def funnel():
+    """Totais e conversão /start -> PIX -> pago dos bots do usuário"""
+    try:
+        start, end = _parse_range()
+        bot_id = _bot_filter()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        **_range_payload(start, end),
+        'bot_id': bot_id,
+        **analytics.funnel(current_user.id, start, end, bot_id)
+    })
+
+@analytics_bp.route('/api/timeseries', methods=['GET'])
+@login_required
+def timeseries():
+    """Série de receita e funil por dia (?period=day) ou por hora (?period=hour)"""
+    period = request.args.get('period', 'day')
+    if period not in analytics.PERIODS:
+        return jsonify({'error': 'period deve ser hour ou day'}), 400
+    try:
+        start, end = _parse_range()
+        bot_id = _bot_filter()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if period == 'hour' and end - start > timedelta(days=MAX_HOURLY_DAYS):
+        return jsonify({'error': f'Série por hora limitada a {MAX_HOURLY_DAYS} dias'}), 400
+
+    return jsonify({
+        **_range_payload(start, end),
+        'period': period,
+        'bot_id': bot_id,
+        'series': analytics.timeseries(current_user.id, period, start, end, bot_id)
+    })
+
+@analytics_bp.route('/api/breakdown', methods=['GET'])
+@login_required
+def breakdown():
+    """Receita e funil por bot (?by=bot) ou por plano (?by=plan)"""
+    by = request.args.get('by', 'bot')
+    if by not in ('bot', 'plan'):
+        return jsonify({'error': 'by deve ser bot ou plan'}), 400
+    try:
+        start, end = _parse_range()
+        bot_id = _bot_filter()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        **_range_payload(start, end),
+        'by': by,
+        'items': analytics.breakdown(current_user.id, by, start, end, bot_id)
+    })
@@ -1,3 +1,4 @@
+from datetime import datetime
 from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify
 from flask_login import login_user, logout_user, login_required, current_user
 from ...models.client import User
@@ -117,7 +118,7 @@ def profile():
         'email': current_user.email,
         'created_at': current_user.created_at.isoformat(),
         'active_bots': current_user.get_active_bots_count(),
-        'total_bots': len(current_user.bots)
+        'total_bots': current_user.get_total_bots_count()
     }
     
     if request.is_json:
@@ -151,9 +152,19 @@ def save_pushinpay_token():
     
     # Salva o token
     try:
+        from ...models.bot import TelegramBot
         current_user.pushinpay_token = token
+        # Mesma transação: avança updated_at dos bots do usuário para o reconciliador de cada
+        # processo (workers do supervisor inclusive) recarregar o snapshot com o novo token
+        TelegramBot.query.filter_by(user_id=current_user.id).update(
+            {'updated_at': datetime.utcnow()}, synchronize_session=False
+        )
         db.session.commit()
         
+        # Os bots em execução neste processo passam a usar o novo token na hora
+        from ...services.bot_config_cache import bot_config_cache
+        bot_config_cache.refresh_owner(current_user)
+        
         if request.is_json:
             return jsonify({'message': 'Token PushinPay salvo com sucesso'})
         
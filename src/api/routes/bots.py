@@ -1,13 +1,18 @@
 from flask import Blueprint, request, jsonify, render_template, flash, redirect, url_for
 from flask_login import login_required, current_user
-from werkzeug.utils import secure_filename
-import os
-from datetime import datetime
+from typing import Optional
 from ...models.bot import TelegramBot
 from ...models.payment import Payment
 from ...database.models import db
 from ...services.pushinpay_service import PushinPayService
-from ...services.telegram_media_service import TelegramMediaService, run_async_media_upload
+from ...services.telegram_media_service import TelegramMediaService, MAX_MEDIA_SIZE
+from ...services.media_health import WELCOME_MEDIA_COLUMNS
+from ...services.job_queue import job_queue
+from ...services.bot_reconciler import bot_reconciler
+from ...services.heartbeat_registry import heartbeat_registry
+from ...services.media_store import media_store, MediaRejected
+from ...services.fulfillment_service import confirm_payment
+from ...services.user_stats import user_stats
 from ...utils.logger import logger
 from ...utils.validators import TelegramValidationService
 
@@ -20,32 +25,95 @@ ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'mp3', 'wav', 'ogg'}
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def save_welcome_media(bot: TelegramBot, file, media_type: str) -> Optional[str]:
+    """
+    Grava a mídia de boas-vindas no store local (por conteúdo) e reaproveita o file_id
+    se o bot já enviou esse mesmo conteúdo ao Telegram
+    
+    Sem file_id conhecido, o upload é feito por uma tarefa em segundo plano (no loop
+    dos bots), e não dentro da requisição HTTP; até lá o /start usa a cópia local
+    
+    Returns:
+        Mensagem de erro da validação, ou None se a mídia foi salva
+    """
+    media_service = TelegramMediaService(bot.bot_token)
+    validation = media_service.validate_media_file(file)
+    if not validation['valid'] or validation['media_type'] != media_type:
+        return validation.get('error', 'Arquivo inválido')
+    
+    file_id_column, path_column = WELCOME_MEDIA_COLUMNS[media_type]
+    
+    # Uma única passada pelo upload: grava no store e calcula o hash ao mesmo tempo
+    try:
+        stored = media_store.store_stream(file.stream, validation['extension'], max_size=MAX_MEDIA_SIZE)
+    except MediaRejected as e:
+        return str(e)
+    
+    file_id = media_store.lookup_file_id(stored.sha256, bot.id)
+    setattr(bot, path_column, stored.path)
+    setattr(bot, file_id_column, file_id)
+    
+    if file_id:
+        logger.info(f"♻️  Mídia {media_type} já enviada por este bot, reutilizando file_id")
+    elif not bot.id_logs:
+        logger.warning("⚠️  Grupo de logs não configurado, mídia ficará apenas no arquivo local")
+    else:
+        logger.info(f"⏳ Upload da mídia {media_type} para o Telegram agendado")
+    
+    return None
+
+def media_upload_pending(bot: TelegramBot) -> bool:
+    """Se o bot tem mídia de boas-vindas só no arquivo local (ainda sem file_id)"""
+    return bool(
+        (bot.welcome_image and not bot.welcome_image_file_id)
+        or (bot.welcome_audio and not bot.welcome_audio_file_id)
+    )
+
+def process_welcome_uploads(bot: TelegramBot):
+    """Processa os uploads de imagem e áudio de boas-vindas do formulário"""
+    for field, media_type, label in (('welcome_image', 'photo', 'da imagem'), ('welcome_audio', 'audio', 'do áudio')):
+        file = request.files.get(field)
+        if not file or not file.filename or not allowed_file(file.filename):
+            continue
+        try:
+            error = save_welcome_media(bot, file, media_type)
+            if error:
+                flash(f'Erro na validação {label}: {error}', 'error')
+        except Exception as e:
+            logger.error(f"❌ Erro ao processar {label}: {e}")
+            flash(f'Erro ao processar {label}. Tente novamente.', 'error')
+
 @bots_bp.route('/', methods=['GET'])
 @login_required
 def list_bots():
     """Lista todos os bots do usuário"""
-    user_bots = TelegramBot.query.filter_by(user_id=current_user.id).all()
+    # Consulta projetada: só as colunas exibidas na lista
+    user_bots = user_stats.list_bots(current_user.id)
     
     bots_data = []
     for bot in user_bots:
+        running = heartbeat_registry.bot_running(bot)
+        last_activity = heartbeat_registry.last_activity(bot.id, default=bot.last_activity)
         bots_data.append({
             'id': bot.id,
             'username': bot.bot_username,
             'name': bot.bot_name,
-            'status': bot.get_status(),
+            'status': TelegramBot.status_label(bot.is_active, running),
             'is_active': bot.is_active,
-            'is_running': bot.is_running,
+            'is_running': running,
+            'last_activity': last_activity.isoformat() if last_activity else None,
             'created_at': bot.created_at.isoformat() if bot.created_at else None
         })
     
+    can_add_more = current_user.can_add_bot()
     if request.is_json:
         return jsonify({
             'bots': bots_data,
             'total': len(bots_data),
-            'can_add_more': current_user.can_add_bot()
+            'can_add_more': can_add_more
         })
     
-    return render_template('bots/list.html', bots=bots_data, can_add_more=current_user.can_add_bot())
+    return render_template('bots/list.html', bots=bots_data, can_add_more=can_add_more)
 
 @bots_bp.route('/validate-token', methods=['POST'])
 @login_required
@@ -149,7 +217,15 @@ def create_bot():
             flash('Este token já está sendo usado por outro bot', 'error')
             return render_template('bots/create.html')
         
-        # Valida token novamente
+        # Verifica se usuário tem token PushinPay (antes de gravar o bot e as mídias)
+        if not current_user.pushinpay_token:
+            if request.is_json:
+                return jsonify({'error': 'Configure seu token PushinPay no perfil antes de criar bots'}), 400
+            flash('Configure seu token PushinPay no perfil antes de criar bots.', 'error')
+            return redirect(url_for('auth.profile'))
+        
+        # Valida o formato do token (local, sem rede): o getMe no Telegram roda na tarefa
+        # start_bot, e um token recusado aparece como erro em /bots/jobs/<id>
         validation_service = TelegramValidationService()
         validation_result = validation_service.validate_bot_token(token)
         
@@ -196,144 +272,25 @@ def create_bot():
             db.session.add(bot)
             db.session.flush()  # Para obter o ID do bot
 
-            # Processa uploads de arquivos usando TelegramMediaService
-            if 'welcome_image' in request.files:
-                file = request.files['welcome_image']
-                if file and allowed_file(file.filename):
-                    try:
-                        media_service = TelegramMediaService(bot.bot_token)
-                        validation = media_service.validate_media_file(file)
-                        if validation['valid'] and validation['media_type'] == 'photo':
-                            temp_path = media_service.create_temp_file(file, prefix=f"bot_{bot.id}_img_")
-                            try:
-                                if bot.id_logs:
-                                    file_id = run_async_media_upload(
-                                        bot.bot_token,
-                                        temp_path,
-                                        bot.id_logs,
-                                        bot.id,
-                                        'photo'
-                                    )
-                                    if file_id:
-                                        bot.welcome_image_file_id = file_id
-                                        bot.welcome_image = None
-                                        logger.info(f"✅ Imagem enviada para Telegram. File ID: {file_id}")
-                                    else:
-                                        logger.warning("⚠️  Falha no upload para Telegram, mantendo arquivo local")
-                                        filename = secure_filename(file.filename)
-                                        filename = f"bot_{bot.id}_welcome_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{filename}"
-                                        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-                                        file_path = os.path.join(UPLOAD_FOLDER, filename)
-                                        file.save(file_path)
-                                        bot.welcome_image = file_path
-                                else:
-                                    logger.warning("⚠️  Grupo de logs não configurado, salvando localmente")
-                                    filename = secure_filename(file.filename)
-                                    filename = f"bot_{bot.id}_welcome_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{filename}"
-                                    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-                                    file_path = os.path.join(UPLOAD_FOLDER, filename)
-                                    file.save(file_path)
-                                    bot.welcome_image = file_path
-                            finally:
-                                media_service.cleanup_temp_file(temp_path)
-                        else:
-                            flash(f'Erro na validação da imagem: {validation.get("error", "Arquivo inválido")}', 'error')
-                    except Exception as e:
-                        logger.error(f"❌ Erro ao processar imagem: {e}")
-                        flash('Erro ao processar imagem. Tente novamente.', 'error')
-
-            if 'welcome_audio' in request.files:
-                file = request.files['welcome_audio']
-                if file and allowed_file(file.filename):
-                    try:
-                        media_service = TelegramMediaService(bot.bot_token)
-                        validation = media_service.validate_media_file(file)
-                        if validation['valid'] and validation['media_type'] == 'audio':
-                            temp_path = media_service.create_temp_file(file, prefix=f"bot_{bot.id}_audio_")
-                            try:
-                                if bot.id_logs:
-                                    file_id = run_async_media_upload(
-                                        bot.bot_token,
-                                        temp_path,
-                                        bot.id_logs,
-                                        bot.id,
-                                        'audio'
-                                    )
-                                    if file_id:
-                                        bot.welcome_audio_file_id = file_id
-                                        bot.welcome_audio = None
-                                        logger.info(f"✅ Áudio enviado para Telegram. File ID: {file_id}")
-                                    else:
-                                        logger.warning("⚠️  Falha no upload para Telegram, mantendo arquivo local")
-                                        filename = secure_filename(file.filename)
-                                        filename = f"bot_{bot.id}_audio_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{filename}"
-                                        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-                                        file_path = os.path.join(UPLOAD_FOLDER, filename)
-                                        file.save(file_path)
-                                        bot.welcome_audio = file_path
-                                else:
-                                    logger.warning("⚠️  Grupo de logs não configurado, salvando localmente")
-                                    filename = secure_filename(file.filename)
-                                    filename = f"bot_{bot.id}_audio_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{filename}"
-                                    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-                                    file_path = os.path.join(UPLOAD_FOLDER, filename)
-                                    file.save(file_path)
-                                    bot.welcome_audio = file_path
-                            finally:
-                                media_service.cleanup_temp_file(temp_path)
-                        else:
-                            flash(f'Erro na validação do áudio: {validation.get("error", "Arquivo inválido")}', 'error')
-                    except Exception as e:
-                        logger.error(f"❌ Erro ao processar áudio: {e}")
-                        flash('Erro ao processar áudio. Tente novamente.', 'error')
-
-            # Verifica se usuário tem token PushinPay
-            if not current_user.pushinpay_token:
-                flash('Configure seu token PushinPay no perfil antes de criar bots.', 'error')
-                return redirect(url_for('auth.profile'))
+            # Processa uploads de arquivos (store local + Telegram)
+            process_welcome_uploads(bot)
 
             # Bot é criado diretamente ativo (sem necessidade de pagamento interno)
             bot.is_active = True
             db.session.commit()
+            user_stats.invalidate(current_user.id)
 
-            # Inicia o bot Telegram automaticamente e marca como rodando
-            from ...services.telegram_bot_manager import bot_manager
-            import asyncio
-            import logging
-
-            logger = logging.getLogger(__name__)
+            # Início do bot e upload das mídias rodam em segundo plano (progresso em /bots/jobs/<id>)
             logger.info(f"🚀 Iniciando bot {bot.bot_name} automaticamente...")
-
-            def start_bot_async():
-                try:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    success = loop.run_until_complete(bot_manager.start_bot(bot))
-                    
-                    if success:
-                        # Marca o bot como rodando no banco de dados
-                        bot.is_running = True
-                        bot.last_activity = datetime.utcnow()
-                        db.session.commit()
-                        logger.info(f"✅ Bot {bot.bot_name} iniciado e rodando com sucesso!")
-                    else:
-                        logger.error(f"❌ Falha ao iniciar bot {bot.bot_name}")
-                        
-                except Exception as e:
-                    logger.error(f"❌ Erro ao iniciar bot {bot.bot_name}: {e}")
-
-            import threading
-            bot_thread = threading.Thread(target=start_bot_async, daemon=True)
-            bot_thread.start()
-            
-            # Pequeno delay para dar tempo do bot iniciar
-            import time
-            time.sleep(2)
+            jobs = [job_queue.enqueue('start_bot', current_user.id, bot.id, 'Aguardando início do bot')]
+            if media_upload_pending(bot):
+                jobs.append(job_queue.enqueue('media_upload', current_user.id, bot.id, 'Aguardando envio das mídias'))
 
             if request.is_json:
                 return jsonify({
                     'success': True,
                     'bot_id': bot.id,
+                    'jobs': [job.to_dict() for job in jobs],
                     'message': 'Bot criado e está sendo iniciado automaticamente! 🚀'
                 }), 201
 
@@ -391,11 +348,11 @@ def check_payment_status_api(bot_id):
             )
             
             if status_result.get('paid'):
-                # Confirma pagamento localmente
-                payment.status = 'completed'
-                payment.paid_at = datetime.utcnow()
+                # Confirma pagamento localmente (idempotente; a liberação sai pelo outbox)
+                confirm_payment(payment.id, 'completed')
                 bot.is_active = True
                 db.session.commit()
+                user_stats.invalidate(bot.user_id)
                 
                 return jsonify({'paid': True, 'status': 'confirmed'})
                 
@@ -404,6 +361,22 @@ def check_payment_status_api(bot_id):
     
         return jsonify({'paid': False, 'status': 'pending'})
 
+@bots_bp.route('/jobs/<job_id>', methods=['GET'])
+@login_required
+def job_status(job_id):
+    """Andamento de uma tarefa em segundo plano (início do bot, upload de mídia)"""
+    job = job_queue.get(job_id)
+    if not job or job.user_id != current_user.id:
+        return jsonify({'error': 'Tarefa não encontrada'}), 404
+    
+    return jsonify(job.to_dict())
+
+@bots_bp.route('/reconciler/metrics', methods=['GET'])
+@login_required
+def reconciler_metrics():
+    """Métricas da reconciliação dos bots deste processo (eventos, ações e desejado x em execução)"""
+    return jsonify(bot_reconciler.get_stats())
+
 @bots_bp.route('/edit/<slug>', methods=['GET', 'POST'])
 @login_required
 def edit_bot(slug):
@@ -471,127 +444,17 @@ def edit_bot(slug):
             else:
                 bot.id_logs = None
             
-            # Processa upload de imagem de boas-vindas usando Telegram
-            if 'welcome_image' in request.files:
-                file = request.files['welcome_image']
-                if file and file.filename and allowed_file(file.filename):
-                    try:
-                        # Cria serviço de mídia
-                        media_service = TelegramMediaService(bot.bot_token)
-                        
-                        # Valida arquivo
-                        validation = media_service.validate_media_file(file)
-                        
-                        if validation['valid'] and validation['media_type'] == 'photo':
-                            # Cria arquivo temporário
-                            temp_path = media_service.create_temp_file(file, prefix=f"bot_{bot.id}_img_")
-                            
-                            try:
-                                # Faz upload para Telegram se tiver grupo de logs configurado
-                                if bot.id_logs:
-                                    file_id = run_async_media_upload(
-                                        bot.bot_token, 
-                                        temp_path, 
-                                        bot.id_logs, 
-                                        bot.id, 
-                                        'photo'
-                                    )
-                                    
-                                    if file_id:
-                                        bot.welcome_image_file_id = file_id
-                                        # Remove referência ao arquivo local antigo se existir
-                                        bot.welcome_image = None
-                                        logger.info(f"✅ Imagem enviada para Telegram. File ID: {file_id}")
-                                    else:
-                                        logger.warning("⚠️  Falha no upload para Telegram, mantendo arquivo local")
-                                        # Fallback: salva localmente se o upload falhar
-                                        filename = secure_filename(file.filename)
-                                        filename = f"bot_{bot.id}_welcome_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{filename}"
-                                        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-                                        file_path = os.path.join(UPLOAD_FOLDER, filename)
-                                        file.save(file_path)
-                                        bot.welcome_image = file_path
-                                else:
-                                    logger.warning("⚠️  Grupo de logs não configurado, salvando localmente")
-                                    # Fallback: salva localmente se não tiver grupo configurado
-                                    filename = secure_filename(file.filename)
-                                    filename = f"bot_{bot.id}_welcome_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{filename}"
-                                    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-                                    file_path = os.path.join(UPLOAD_FOLDER, filename)
-                                    file.save(file_path)
-                                    bot.welcome_image = file_path
-                                    
-                            finally:
-                                # Limpa arquivo temporário
-                                media_service.cleanup_temp_file(temp_path)
-                        else:
-                            flash(f'Erro na validação da imagem: {validation.get("error", "Arquivo inválido")}', 'error')
-                            
-                    except Exception as e:
-                        logger.error(f"❌ Erro ao processar imagem: {e}")
-                        flash('Erro ao processar imagem. Tente novamente.', 'error')
-            
-            # Processa upload de áudio de boas-vindas usando Telegram
-            if 'welcome_audio' in request.files:
-                file = request.files['welcome_audio']
-                if file and file.filename and allowed_file(file.filename):
-                    try:
-                        # Cria serviço de mídia
-                        media_service = TelegramMediaService(bot.bot_token)
-                        
-                        # Valida arquivo
-                        validation = media_service.validate_media_file(file)
-                        
-                        if validation['valid'] and validation['media_type'] == 'audio':
-                            # Cria arquivo temporário
-                            temp_path = media_service.create_temp_file(file, prefix=f"bot_{bot.id}_audio_")
-                            
-                            try:
-                                # Faz upload para Telegram se tiver grupo de logs configurado
-                                if bot.id_logs:
-                                    file_id = run_async_media_upload(
-                                        bot.bot_token, 
-                                        temp_path, 
-                                        bot.id_logs, 
-                                        bot.id, 
-                                        'audio'
-                                    )
-                                    
-                                    if file_id:
-                                        bot.welcome_audio_file_id = file_id
-                                        # Remove referência ao arquivo local antigo se existir
-                                        bot.welcome_audio = None
-                                        logger.info(f"✅ Áudio enviado para Telegram. File ID: {file_id}")
-                                    else:
-                                        logger.warning("⚠️  Falha no upload para Telegram, mantendo arquivo local")
-                                        # Fallback: salva localmente se o upload falhar
-                                        filename = secure_filename(file.filename)
-                                        filename = f"bot_{bot.id}_audio_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{filename}"
-                                        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-                                        file_path = os.path.join(UPLOAD_FOLDER, filename)
-                                        file.save(file_path)
-                                        bot.welcome_audio = file_path
-                                else:
-                                    logger.warning("⚠️  Grupo de logs não configurado, salvando localmente")
-                                    # Fallback: salva localmente se não tiver grupo configurado
-                                    filename = secure_filename(file.filename)
-                                    filename = f"bot_{bot.id}_audio_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{filename}"
-                                    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-                                    file_path = os.path.join(UPLOAD_FOLDER, filename)
-                                    file.save(file_path)
-                                    bot.welcome_audio = file_path
-                                    
-                            finally:
-                                # Limpa arquivo temporário
-                                media_service.cleanup_temp_file(temp_path)
-                        else:
-                            flash(f'Erro na validação do áudio: {validation.get("error", "Arquivo inválido")}', 'error')
-                            
-                    except Exception as e:
-                        logger.error(f"❌ Erro ao processar áudio: {e}")
-                        flash('Erro ao processar áudio. Tente novamente.', 'error')
+            # Processa uploads de imagem e áudio de boas-vindas (store local + Telegram)
+            process_welcome_uploads(bot)
             
             db.session.commit()
+            user_stats.invalidate(bot.user_id)
+            
+            # Aplica a edição ao bot em execução (troca de snapshot; reinício só se o token mudou)
+            from ...services.telegram_bot_manager import bot_manager
+            bot_manager.submit_reload(bot.id)
+            if media_upload_pending(bot):
+                job_queue.enqueue('media_upload', current_user.id, bot.id, 'Aguardando envio das mídias')
             
             flash('Bot atualizado com sucesso!', 'success')
             logger.info(f"Bot {bot.bot_name} (ID: {bot.id}) atualizado pelo usuário {current_user.email}")
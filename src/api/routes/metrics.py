@@ -0,0 +1,61 @@
+from flask import Blueprint, Response, current_app, request
+from sqlalchemy import func
+from ...models.fulfillment import FulfillmentOutbox
+from ...models.webhook_event import WebhookEvent
+from ...database.models import db
+from ...services.telegram_bot_manager import bot_manager
+from ...services.bot_reconciler import bot_reconciler
+from ...services.heartbeat_registry import heartbeat_registry
+from ...services.payment_reconciler import payment_reconciler
+from ...utils.metrics import metrics
+import hmac
+
+metrics_bp = Blueprint('metrics', __name__)
+
+def _running_applications():
+    for bot_id, bot_token in list(bot_manager.bot_tokens.items()):
+        application = bot_manager.active_bots.get(bot_token)
+        if application is not None:
+            yield bot_id, application
+
+def _update_queue_depth():
+    return [({'bot_id': bot_id}, application.update_queue.qsize()) for bot_id, application in _running_applications()]
+
+def _send_queue_depth():
+    return [
+        ({'bot_id': bot_id}, getattr(application.bot.rate_limiter, 'waiting', 0))
+        for bot_id, application in _running_applications()
+    ]
+
+def _durable_queue_depth():
+    """Itens pendentes nas filas gravadas no banco (webhooks da PushinPay e entregas de acesso)"""
+    webhooks = db.session.query(func.count(WebhookEvent.id)).filter(WebhookEvent.state == 'pending').scalar()
+    outbox = db.session.query(func.count(FulfillmentOutbox.id)).filter(FulfillmentOutbox.status == 'pending').scalar()
+    return [({'queue': 'webhook_events'}, webhooks or 0), ({'queue': 'fulfillment_outbox'}, outbox or 0)]
+
+# Valores lidos na hora da coleta (filas e estado dos serviços deste processo)
+metrics.add_collector('botmanager_bots_running', 'Bots com Application em execução neste processo', (),
+                      lambda: [({}, len(bot_manager.active_bots))])
+metrics.add_collector('botmanager_update_queue_depth', 'Updates aguardando processamento por bot', ('bot_id',),
+                      _update_queue_depth)
+metrics.add_collector('botmanager_send_queue_depth', 'Envios aguardando o agendador por bot', ('bot_id',),
+                      _send_queue_depth)
+metrics.add_collector('botmanager_queue_depth', 'Itens pendentes nas filas persistidas', ('queue',),
+                      _durable_queue_depth)
+metrics.add_collector('botmanager_payments_tracked', 'Pagamentos pendentes acompanhados pelo reconciliador', (),
+                      lambda: [({}, payment_reconciler.tracked_count)])
+metrics.add_collector('botmanager_bot_reconcile_pending', 'Bots alterados aguardando reconciliação', (),
+                      lambda: [({}, bot_reconciler.pending_count)])
+metrics.add_collector('botmanager_heartbeat_pending', 'Estados de bots aguardando gravação no banco', (),
+                      lambda: [({}, heartbeat_registry.get_stats()['pending'])])
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Métricas do processo no formato de exposição de texto do Prometheus"""
+    token = current_app.config.get('METRICS_TOKEN')
+    if token:
+        provided = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(provided, f'Bearer {token}'):
+            return Response('Não autorizado\n', status=401, mimetype='text/plain')
+    
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
@@ -10,15 +10,36 @@ from .utils.config import load_config
 # Importa blueprints das rotas
 from .api.routes.auth import auth_bp
 from .api.routes.bots import bots_bp
-from .api.routes.webhooks import webhook_bp
+from .api.routes.webhooks import webhook_bp, telegram_webhook_bp
+from .api.routes.metrics import metrics_bp
+from .api.routes.analytics import analytics_bp
 
 # Importa serviços
+from .supervisor import check_update_mode
 from .services.bot_runner import bot_manager_service
+from .services.bot_runtime import bot_runtime
 from .services.telegram_bot_manager import bot_manager
-import asyncio
-import threading
+from .services.payment_reconciler import payment_reconciler
+from .services.fulfillment_service import fulfillment_worker
+from .services.webhook_consumer import webhook_consumer
+from .services.media_health import media_health
+from .services.media_store import media_store
+from .services.heartbeat_registry import heartbeat_registry
+from .services.payment_archiver import payment_archiver
+from .services.analytics import analytics
+from .services.user_stats import user_stats as user_stats_service
 
-def create_app():
+def create_app(start_bots: bool = None, consume_webhooks: bool = False):
+    """
+    Cria a aplicação Flask
+    
+    Args:
+        start_bots: Se este processo hospeda os bots Telegram. Por padrão, hospeda
+            apenas quando BOT_WORKERS não está definido (sem supervisor de workers)
+        consume_webhooks: Se este processo aplica a fila de webhooks da PushinPay. Ligado
+            só nos pontos de entrada web (python -m src.app e src.wsgi); scripts e workers
+            do supervisor, que não recebem HTTP, ficam de fora
+    """
     app = Flask(__name__)
     
     # Configurações da aplicação
@@ -39,14 +60,21 @@ def create_app():
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'images'), exist_ok=True)
     os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'audio'), exist_ok=True)
+    media_store.configure(app.config['MEDIA_STORE_DIR'])
     
     # Inicializa banco de dados
     init_db(app)
     
+    # Estado de execução dos bots nos templates (memória deste processo ou último flush no banco)
+    app.jinja_env.globals['bot_running'] = heartbeat_registry.bot_running
+    
     # Registra blueprints
     app.register_blueprint(auth_bp)
     app.register_blueprint(bots_bp)
     app.register_blueprint(webhook_bp)
+    app.register_blueprint(telegram_webhook_bp)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(analytics_bp)
     
     # Rotas principais
     @app.route('/')
@@ -61,15 +89,16 @@ def create_app():
     def dashboard():
         """Dashboard principal do usuário"""
         # Estatísticas do usuário
+        stats = user_stats_service.get(current_user.id)
         user_stats = {
-            'total_bots': len(current_user.bots),
-            'active_bots': current_user.get_active_bots_count(),
-            'can_add_more': current_user.can_add_bot(),
-            'remaining_slots': 30 - current_user.get_active_bots_count()
+            'total_bots': stats.total_bots,
+            'active_bots': stats.active_bots,
+            'can_add_more': stats.can_add_bot,
+            'remaining_slots': stats.remaining_slots
         }
         
-        # Bots recentes
-        recent_bots = current_user.bots[:5]  # Últimos 5 bots
+        # Bots recentes (só as colunas exibidas)
+        recent_bots = user_stats_service.list_bots(current_user.id, limit=5)
         
         return render_template('dashboard.html', 
                              user_stats=user_stats, 
@@ -84,40 +113,41 @@ def create_app():
     def shutdown_handler():
         """Handler para shutdown graceful da aplicação"""
         print("Shutting down bot manager...")
+        webhook_consumer.stop()
         bot_manager_service.shutdown()
     
     atexit.register(shutdown_handler)
     
-    # Inicia bots Telegram em thread separada
-    def start_telegram_bots():
-        """Inicia todos os bots Telegram ativos e mantém rodando"""
-        with app.app_context():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
-            async def run_bots():
-                await bot_manager.start_all_active_bots()
-                # Mantém o loop rodando indefinidamente
-                while True:
-                    await asyncio.sleep(1)
-            
-            try:
-                loop.run_until_complete(run_bots())
-            except KeyboardInterrupt:
-                print("Bot thread interrompida")
-            except Exception as e:
-                print(f"Erro na thread do bot: {e}")
-            finally:
-                loop.close()
-    
-    # Thread para rodar os bots Telegram
-    bot_thread = threading.Thread(target=start_telegram_bots, daemon=True)
-    bot_thread.start()
+    # Inicia o loop compartilhado que hospeda todos os bots Telegram deste processo
+    if start_bots is None:
+        start_bots = int(os.environ.get('BOT_WORKERS', '0')) == 0
+        if not start_bots:
+            # Processo web do supervisor: não recebe updates de bots que não hospeda
+            check_update_mode(app.config['TELEGRAM_UPDATE_MODE'])
+    bot_manager.hosting = start_bots
+    
+    bot_runtime.start(app)
+    # Eventos do funil chegam dos bots e das confirmações via webhook/painel
+    # (scripts de manutenção não hospedam bots nem recebem HTTP: sem escritor)
+    if start_bots or consume_webhooks:
+        analytics.start()
+    if start_bots:
+        bot_runtime.submit(bot_manager.start_all_active_bots())
+        bot_manager_service.start_monitoring()
+        payment_reconciler.start()
+        fulfillment_worker.start()
+        media_health.start()
+        heartbeat_registry.start()
+        payment_archiver.start()
+    
+    # Consumidores da fila de webhooks da PushinPay (processos que recebem HTTP)
+    if consume_webhooks:
+        webhook_consumer.start(app)
     
     return app
 
 if __name__ == '__main__':
-    app = create_app()
+    app = create_app(consume_webhooks=True)
     
     try:
         print("🚀 Iniciando Telegram Bot Manager...")
@@ -20,6 +20,13 @@ def init_db(app):
         from ..models.client import User
         from ..models.bot import TelegramBot
         from ..models.payment import Payment
+        from ..models.payment_qr_code import PaymentQRCode
+        from ..models.payment_history import PaymentHistory
+        from ..models.analytics_rollup import AnalyticsRollup
+        from ..models.fulfillment import FulfillmentOutbox
+        from ..models.webhook_event import WebhookEvent
+        from ..models.media_asset import MediaAsset
+        from ..models.background_job import BackgroundJob
         
         # Cria todas as tabelas
         db.create_all()
@@ -0,0 +1,26 @@
+from ..database.models import db
+
+class AnalyticsRollup(db.Model):
+    """Totais do funil de um bot por plano em uma hora ou dia (UTC), mantidos incrementalmente"""
+    __tablename__ = 'analytics_rollups'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    period = db.Column(db.String(5), nullable=False)  # hour, day
+    bucket = db.Column(db.DateTime, nullable=False)  # início da hora/dia
+    bot_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)  # dono do bot (filtro das consultas)
+    plan = db.Column(db.String(100), nullable=False, default='')  # '' para eventos sem plano (/start)
+    
+    # Funil: /start -> PIX gerado -> pago
+    starts = db.Column(db.Integer, nullable=False, default=0)
+    pix_generated = db.Column(db.Integer, nullable=False, default=0)
+    payments = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.UniqueConstraint('period', 'bucket', 'bot_id', 'plan', name='uq_analytics_rollups_key'),
+        db.Index('ix_analytics_rollups_user_period_bucket', 'user_id', 'period', 'bucket'),
+    )
+    
+    def __repr__(self):
+        return f"AnalyticsRollup(period={self.period}, bucket={self.bucket}, bot_id={self.bot_id}, plan={self.plan})"
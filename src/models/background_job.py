@@ -0,0 +1,43 @@
+from datetime import datetime
+from ..database.models import db
+
+class BackgroundJob(db.Model):
+    """Tarefa em segundo plano disparada pelo painel (início do bot, upload de mídia) e seu progresso"""
+    __tablename__ = 'background_jobs'
+    
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex, exposto em /bots/jobs/<id>
+    kind = db.Column(db.String(50), nullable=False)  # start_bot, media_upload
+    bot_id = db.Column(db.Integer, db.ForeignKey('telegram_bots.id'), nullable=True, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    
+    # Progresso
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    progress = db.Column(db.Integer, nullable=False, default=0)  # 0-100
+    message = db.Column(db.String(255), nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    @property
+    def is_finished(self) -> bool:
+        return self.status in ('done', 'failed')
+    
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'bot_id': self.bot_id,
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+    
+    def __repr__(self):
+        return f"BackgroundJob(id={self.id}, kind={self.kind}, status={self.status})"
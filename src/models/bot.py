@@ -1,6 +1,10 @@
 from datetime import datetime
+from sqlalchemy import event, inspect
 from ..database.models import db
 
+# Colunas de estado de execução: mudá-las não é mudança de configuração (não avança updated_at)
+RUNTIME_COLUMNS = ('is_running', 'last_activity', 'updated_at')
+
 class TelegramBot(db.Model):
     __tablename__ = 'telegram_bots'
     
@@ -35,6 +39,7 @@ class TelegramBot(db.Model):
     is_active = db.Column(db.Boolean, default=True)  # Bot está ativo quando criado
     is_running = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # última mudança de configuração
     last_activity = db.Column(db.DateTime, nullable=True)
     
     # Foreign Key para usuário
@@ -60,10 +65,16 @@ class TelegramBot(db.Model):
             return True
         return False
     
-    def get_status(self) -> str:
-        if not self.is_active:
+    def get_status(self, running: bool = None) -> str:
+        """Status para exibição (`running` vem do registro de execução quando disponível)"""
+        return self.status_label(self.is_active, self.is_running if running is None else running)
+    
+    @staticmethod
+    def status_label(is_active: bool, running: bool) -> str:
+        """Status para exibição a partir das colunas (usado também nas consultas projetadas)"""
+        if not is_active:
             return "Inativo"
-        return "Rodando" if self.is_running else "Parado"
+        return "Rodando" if running else "Parado"
     
     def get_pix_values(self) -> list:
         """Retorna lista de valores PIX configurados"""
@@ -184,4 +195,13 @@ class TelegramBot(db.Model):
         }
     
     def __repr__(self):
-        return f"TelegramBot(username={self.bot_username}, active={self.is_active})"
\ No newline at end of file
+        return f"TelegramBot(username={self.bot_username}, active={self.is_active})"
+
+@event.listens_for(TelegramBot, 'before_update')
+def _touch_updated_at(mapper, connection, target):
+    """Avança updated_at quando alguma coluna de configuração muda (o reconciliador segue essa coluna)"""
+    state = inspect(target)
+    for prop in mapper.column_attrs:
+        if prop.key not in RUNTIME_COLUMNS and state.attrs[prop.key].history.has_changes():
+            target.updated_at = datetime.utcnow()
+            return
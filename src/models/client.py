@@ -24,10 +24,16 @@ class User(UserMixin, db.Model):
         return check_password_hash(self.password_hash, password)
     
     def get_active_bots_count(self):
-        return len([bot for bot in self.bots if bot.is_active])
+        from ..services.user_stats import user_stats
+        return user_stats.get(self.id).active_bots
+    
+    def get_total_bots_count(self):
+        from ..services.user_stats import user_stats
+        return user_stats.get(self.id).total_bots
     
     def can_add_bot(self):
-        return self.get_active_bots_count() < 30
+        from ..services.user_stats import user_stats
+        return user_stats.get(self.id).can_add_bot
     
     def __repr__(self):
         return f"User(username={self.username}, email={self.email})"
\ No newline at end of file
@@ -0,0 +1,28 @@
+from datetime import datetime
+from ..database.models import db
+
+class FulfillmentOutbox(db.Model):
+    """Liberação de acesso pendente de um pagamento aprovado (uma por pagamento)"""
+    __tablename__ = 'fulfillment_outbox'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    payment_id = db.Column(db.Integer, db.ForeignKey('payments.id'), unique=True, nullable=False)
+    bot_id = db.Column(db.Integer, db.ForeignKey('telegram_bots.id'), nullable=False, index=True)
+    status = db.Column(db.String(20), default='pending', nullable=False)  # pending, processing, done, failed
+    
+    # Controle de tentativas
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(db.Text, nullable=True)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    locked_at = db.Column(db.DateTime, nullable=True)  # quando um worker assumiu o item
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime, nullable=True)
+    
+    __table_args__ = (
+        db.Index('ix_fulfillment_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+    
+    def __repr__(self):
+        return f"FulfillmentOutbox(payment_id={self.payment_id}, status={self.status}, attempts={self.attempts})"
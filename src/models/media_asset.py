@@ -0,0 +1,23 @@
+from datetime import datetime
+from ..database.models import db
+
+class MediaAsset(db.Model):
+    """file_id do Telegram de um conteúdo do store local (SHA-256) para um bot (file_ids são por bot)"""
+    __tablename__ = 'media_assets'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), nullable=False)
+    bot_id = db.Column(db.Integer, db.ForeignKey('telegram_bots.id'), nullable=False, index=True)
+    media_type = db.Column(db.String(20), nullable=False)  # photo, audio
+    file_id = db.Column(db.String(255), nullable=False)
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('sha256', 'bot_id', name='uq_media_assets_sha256_bot'),
+    )
+    
+    def __repr__(self):
+        return f"MediaAsset(sha256={self.sha256[:12]}, bot_id={self.bot_id}, media_type={self.media_type})"
@@ -1,6 +1,9 @@
 from datetime import datetime
 from ..database.models import db
 
+# Status finais de pagamento aprovado ('approved' nos bots, 'completed' via webhook/painel)
+PAID_STATUSES = ('approved', 'completed')
+
 class Payment(db.Model):
     __tablename__ = 'payments'
     
@@ -9,11 +12,13 @@ class Payment(db.Model):
     amount = db.Column(db.Float, nullable=False)  # Valor escolhido pelo cliente final
     status = db.Column(db.String(50), default='pending')  # pending, completed, failed, expired
     
-    # Informações do cliente final serão capturadas via webhook
+    # Cliente final (usuário do Telegram que gerou o PIX)
+    telegram_user_id = db.Column(db.BigInteger, nullable=True)
+    telegram_username = db.Column(db.String(255), nullable=True)
     
     # Dados do PIX
-    pix_key = db.Column(db.String(255), nullable=True)
-    pix_qr_code = db.Column(db.Text, nullable=True)  # Base64 da imagem QR
+    pix_key = db.Column(db.String(255), nullable=True)  # código copia e cola (EMV); o QR é gerado a partir dele
+    plan_name = db.Column(db.String(100), nullable=True)  # plano escolhido (relatórios por plano)
     
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -24,6 +29,16 @@ class Payment(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     bot_id = db.Column(db.Integer, db.ForeignKey('telegram_bots.id'), nullable=False)
     
+    __table_args__ = (
+        # Pagamentos de um bot por status (painel e verificação de pagamento pendente)
+        db.Index('ix_payments_bot_status', 'bot_id', 'status'),
+        # Só os pendentes, por vencimento (carga da reconciliação e varredura de expirados)
+        db.Index('ix_payments_pending_expires', 'expires_at',
+                 postgresql_where=db.text("status = 'pending'"), sqlite_where=db.text("status = 'pending'")),
+        # Relatórios por dono do bot ao longo do tempo
+        db.Index('ix_payments_user_created', 'user_id', 'created_at'),
+    )
+    
     def process_payment(self):
         """Processa o pagamento do cliente final"""
         self.status = "completed"
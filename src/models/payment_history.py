@@ -0,0 +1,37 @@
+from datetime import datetime
+from ..database.models import db
+
+class PaymentHistory(db.Model):
+    """Pagamento encerrado arquivado fora de payments (mesmas colunas e mesmo id do original)"""
+    __tablename__ = 'payments_history'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # id original em payments
+    pix_code = db.Column(db.String(255), nullable=False, index=True)
+    amount = db.Column(db.Float, nullable=False)
+    status = db.Column(db.String(50), nullable=False)
+    
+    # Cliente final
+    telegram_user_id = db.Column(db.BigInteger, nullable=True)
+    telegram_username = db.Column(db.String(255), nullable=True)
+    
+    # Dados do PIX
+    pix_key = db.Column(db.String(255), nullable=True)
+    plan_name = db.Column(db.String(100), nullable=True)
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, nullable=True)
+    paid_at = db.Column(db.DateTime, nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=True)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    # Sem chaves estrangeiras: o histórico sobrevive à remoção do bot ou do usuário
+    user_id = db.Column(db.Integer, nullable=False)
+    bot_id = db.Column(db.Integer, nullable=False)
+    
+    __table_args__ = (
+        db.Index('ix_payments_history_user_created', 'user_id', 'created_at'),
+        db.Index('ix_payments_history_bot_created', 'bot_id', 'created_at'),
+    )
+    
+    def __repr__(self):
+        return f"PaymentHistory(pix_code={self.pix_code}, amount={self.amount}, status={self.status})"
@@ -0,0 +1,17 @@
+from datetime import datetime
+from ..database.models import db
+
+class PaymentQRCode(db.Model):
+    """PNG do QR Code de um pagamento PIX, guardado fora de payments e removido após expires_at"""
+    __tablename__ = 'payment_qr_codes'
+    
+    payment_id = db.Column(db.Integer, db.ForeignKey('payments.id', ondelete='CASCADE'), primary_key=True)
+    png = db.Column(db.LargeBinary, nullable=False)  # imagem pronta para envio (já com margem)
+    source = db.Column(db.String(10), nullable=False)  # provider, local
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)  # expurgado depois disso
+    
+    def __repr__(self):
+        return f"PaymentQRCode(payment_id={self.payment_id}, source={self.source}, bytes={len(self.png or b'')})"
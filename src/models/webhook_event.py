@@ -0,0 +1,36 @@
+import json
+from datetime import datetime
+from ..database.models import db
+
+class WebhookEvent(db.Model):
+    """Evento de webhook recebido e ainda a aplicar (fila durável da rota /webhook/pushinpay)"""
+    __tablename__ = 'webhook_events'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    source = db.Column(db.String(50), nullable=False, default='pushinpay')
+    transaction_id = db.Column(db.String(255), nullable=False, index=True)  # ID da transação (pix_code)
+    status = db.Column(db.String(50), nullable=True)  # Status informado pelo provedor
+    payload = db.Column(db.Text, nullable=False)
+    
+    # Processamento pelo consumidor
+    state = db.Column(db.String(20), nullable=False, default='pending')  # pending, processing, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text, nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    
+    # Timestamps
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime, nullable=True)
+    
+    __table_args__ = (
+        db.Index('ix_webhook_events_state_id', 'state', 'id'),
+    )
+    
+    def get_payload(self) -> dict:
+        try:
+            return json.loads(self.payload)
+        except (TypeError, ValueError):
+            return {}
+    
+    def __repr__(self):
+        return f"WebhookEvent(transaction_id={self.transaction_id}, status={self.status}, state={self.state})"
@@ -0,0 +1,274 @@
+"""
+Analytics de receita e conversão dos bots (/start -> PIX gerado -> pago)
+Os eventos do funil são somados em memória por (hora/dia, bot, plano) e gravados a cada
+ANALYTICS_FLUSH_INTERVAL segundos como incrementos em analytics_rollups (upsert em lote,
+fora do loop). As consultas do painel leem só os rollups; rebuild_rollups() recalcula
+PIX e pagamentos a partir de payments e payments_history
+"""
+
+import asyncio
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from flask import current_app
+from sqlalchemy import func, literal, select, text, union_all
+from ..database.models import db
+from ..models.analytics_rollup import AnalyticsRollup
+from ..models.payment import Payment, PAID_STATUSES
+from ..models.payment_history import PaymentHistory
+from .bot_runtime import bot_runtime
+from ..utils.logger import logger
+
+PERIODS = ('hour', 'day')
+COUNTERS = ('starts', 'pix_generated', 'payments', 'revenue')
+
+# Incrementa os contadores da linha (Postgres e SQLite 3.24+)
+UPSERT_SQL = text(
+    "INSERT INTO analytics_rollups (period, bucket, bot_id, user_id, plan, starts, pix_generated, payments, revenue) "
+    "VALUES (:period, :bucket, :bot_id, :user_id, :plan, :starts, :pix_generated, :payments, :revenue) "
+    "ON CONFLICT (period, bucket, bot_id, plan) DO UPDATE SET "
+    "starts = analytics_rollups.starts + excluded.starts, "
+    "pix_generated = analytics_rollups.pix_generated + excluded.pix_generated, "
+    "payments = analytics_rollups.payments + excluded.payments, "
+    "revenue = analytics_rollups.revenue + excluded.revenue"
+)
+
+# Substitui PIX e pagamentos da linha, preservando os /start (que não estão em payments)
+REBUILD_SQL = text(
+    "INSERT INTO analytics_rollups (period, bucket, bot_id, user_id, plan, starts, pix_generated, payments, revenue) "
+    "VALUES (:period, :bucket, :bot_id, :user_id, :plan, 0, :pix_generated, :payments, :revenue) "
+    "ON CONFLICT (period, bucket, bot_id, plan) DO UPDATE SET "
+    "pix_generated = excluded.pix_generated, payments = excluded.payments, revenue = excluded.revenue"
+)
+
+RollupKey = Tuple[str, datetime, int, str]  # (period, bucket, bot_id, plan)
+
+def bucket_start(moment: datetime, period: str) -> datetime:
+    """Início da hora ou do dia (UTC) que contém `moment`"""
+    moment = moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0) if period == 'day' else moment
+
+def _truncate(dialect: str, column, period: str):
+    """Expressão SQL que trunca `column` para a hora/dia"""
+    if dialect == 'postgresql':
+        return func.date_trunc(period, column)
+    return func.strftime('%Y-%m-%d 00:00:00' if period == 'day' else '%Y-%m-%d %H:00:00', column)
+
+def _as_datetime(value) -> datetime:
+    return value if isinstance(value, datetime) else datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+
+class AnalyticsRecorder:
+    """Acumula os eventos do funil e grava os incrementos nos rollups em lote"""
+
+    def __init__(self):
+        # Eventos chegam do loop dos bots e das threads do Flask/webhooks
+        self._lock = threading.Lock()
+        self._pending: Dict[RollupKey, list] = {}  # chave -> [user_id, starts, pix, pagamentos, receita]
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {'flushes': 0, 'rows': 0, 'errors': 0}
+
+    def start(self):
+        """Agenda o escritor no loop compartilhado (thread-safe)"""
+        if self._task is not None and not self._task.done():
+            return
+        bot_runtime.submit(self._run())
+
+    async def stop(self):
+        """Encerra o escritor gravando o que ainda estiver pendente (chamar de dentro do loop)"""
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        await self.flush(in_executor=False)
+
+    def record_start(self, bot_id: int, user_id: int):
+        """/start recebido por um bot"""
+        self._add(bot_id, user_id, '', datetime.utcnow(), (1, 0, 0, 0.0))
+
+    def record_pix(self, bot_id: int, user_id: int, plan: Optional[str]):
+        """PIX gerado para um plano"""
+        self._add(bot_id, user_id, plan or '', datetime.utcnow(), (0, 1, 0, 0.0))
+
+    def record_payment(self, bot_id: int, user_id: int, plan: Optional[str], amount: float,
+                       paid_at: Optional[datetime] = None):
+        """Pagamento aprovado (receita contada na hora do pagamento)"""
+        self._add(bot_id, user_id, plan or '', paid_at or datetime.utcnow(), (0, 0, 1, float(amount or 0)))
+
+    def _add(self, bot_id: int, user_id: int, plan: str, moment: datetime, deltas: Tuple):
+        with self._lock:
+            for period in PERIODS:
+                key = (period, bucket_start(moment, period), bot_id, plan)
+                entry = self._pending.get(key)
+                if entry is None:
+                    entry = self._pending[key] = [user_id, 0, 0, 0, 0.0]
+                for i, delta in enumerate(deltas, start=1):
+                    entry[i] += delta
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    async def _run(self):
+        self._task = asyncio.current_task()
+        interval = current_app.config['ANALYTICS_FLUSH_INTERVAL']
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+    async def flush(self, in_executor: bool = True) -> int:
+        """Grava os incrementos acumulados (por padrão em uma thread, sem bloquear o loop)"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        rows = [
+            dict(zip(('period', 'bucket', 'bot_id', 'plan'), key), user_id=entry[0],
+                 **dict(zip(COUNTERS, entry[1:])))
+            for key, entry in pending.items()
+        ]
+        engine = db.engine
+        try:
+            if in_executor:
+                await asyncio.get_running_loop().run_in_executor(None, self._write, engine, rows)
+            else:
+                self._write(engine, rows)
+        except Exception as e:
+            # Devolve os incrementos para a próxima tentativa
+            with self._lock:
+                for key, entry in pending.items():
+                    current = self._pending.setdefault(key, [entry[0], 0, 0, 0, 0.0])
+                    for i in range(1, len(entry)):
+                        current[i] += entry[i]
+            self.stats['errors'] += 1
+            logger.warning(f"⚠️  Erro ao gravar {len(rows)} rollup(s) de analytics: {e}")
+            return 0
+
+        self.stats['flushes'] += 1
+        self.stats['rows'] += len(rows)
+        return len(rows)
+
+    @staticmethod
+    def _write(engine, rows: List[dict]):
+        with engine.begin() as conn:
+            conn.execute(UPSERT_SQL, rows)
+
+    def get_stats(self) -> dict:
+        return {**self.stats, 'pending': self.pending_count}
+
+def rebuild_rollups(engine, since: Optional[datetime] = None) -> int:
+    """
+    Recalcula PIX gerados, pagamentos e receita dos rollups a partir de payments e
+    payments_history (agregação no banco, uma transação). Os /start não são alterados
+
+    Args:
+        since: recalcula só a partir desta data (None = todo o histórico)
+
+    Returns:
+        Quantidade de linhas de rollup gravadas
+    """
+    written = 0
+    with engine.begin() as conn:
+        dialect = conn.dialect.name
+        for period in PERIODS:
+            start = bucket_start(since, period) if since else None
+            reset = AnalyticsRollup.__table__.update().where(AnalyticsRollup.period == period)
+            if start:
+                reset = reset.where(AnalyticsRollup.bucket >= start)
+            conn.execute(reset.values(pix_generated=0, payments=0, revenue=0))
+
+            totals: Dict[RollupKey, dict] = {}
+            for row in conn.execute(_aggregate_query(dialect, period, start)):
+                key = (period, _as_datetime(row.bucket), row.bot_id, row.plan or '')
+                entry = totals.setdefault(key, {'user_id': row.user_id, 'pix_generated': 0, 'payments': 0, 'revenue': 0.0})
+                entry['pix_generated'] += row.pix_generated or 0
+                entry['payments'] += row.payments or 0
+                entry['revenue'] += float(row.revenue or 0)
+
+            rows = [dict(zip(('period', 'bucket', 'bot_id', 'plan'), key), **entry) for key, entry in totals.items()]
+            if rows:
+                conn.execute(REBUILD_SQL, rows)
+            written += len(rows)
+    return written
+
+def _aggregate_query(dialect: str, period: str, start: Optional[datetime]):
+    """PIX gerados (por created_at) e pagamentos (por paid_at) agrupados por hora/dia, bot e plano"""
+    parts = []
+    for table in (Payment.__table__, PaymentHistory.__table__):
+        generated = _truncate(dialect, table.c.created_at, period)
+        paid = _truncate(dialect, table.c.paid_at, period)
+
+        pix = select([
+            generated.label('bucket'), table.c.bot_id, table.c.user_id, table.c.plan_name.label('plan'),
+            func.count().label('pix_generated'), literal(0).label('payments'), literal(0.0).label('revenue')
+        ]).where(table.c.created_at.isnot(None))
+        sales = select([
+            paid.label('bucket'), table.c.bot_id, table.c.user_id, table.c.plan_name.label('plan'),
+            literal(0).label('pix_generated'), func.count().label('payments'), func.sum(table.c.amount).label('revenue')
+        ]).where(table.c.paid_at.isnot(None), table.c.status.in_(PAID_STATUSES))
+        if start:
+            pix = pix.where(table.c.created_at >= start)
+            sales = sales.where(table.c.paid_at >= start)
+
+        parts.append(pix.group_by(generated, table.c.bot_id, table.c.user_id, table.c.plan_name))
+        parts.append(sales.group_by(paid, table.c.bot_id, table.c.user_id, table.c.plan_name))
+    return union_all(*parts)
+
+def _rollup_query(user_id: int, period: str, start: datetime, end: datetime, bot_id: Optional[int] = None):
+    query = db.session.query(AnalyticsRollup).filter(
+        AnalyticsRollup.user_id == user_id,
+        AnalyticsRollup.period == period,
+        AnalyticsRollup.bucket >= bucket_start(start, period),
+        AnalyticsRollup.bucket < end
+    )
+    if bot_id is not None:
+        query = query.filter(AnalyticsRollup.bot_id == bot_id)
+    return query
+
+def _sums():
+    return [func.sum(getattr(AnalyticsRollup, name)).label(name) for name in COUNTERS]
+
+def _totals(row) -> dict:
+    return {
+        'starts': int(row.starts or 0),
+        'pix_generated': int(row.pix_generated or 0),
+        'payments': int(row.payments or 0),
+        'revenue': round(float(row.revenue or 0), 2),
+    }
+
+def _rate(part: int, whole: int) -> Optional[float]:
+    return round(part / whole, 4) if whole else None
+
+def funnel(user_id: int, start: datetime, end: datetime, bot_id: Optional[int] = None) -> dict:
+    """Totais e conversão /start -> PIX -> pago no período (rollups diários)"""
+    row = _rollup_query(user_id, 'day', start, end, bot_id).with_entities(*_sums()).one()
+    totals = _totals(row)
+    return {
+        **totals,
+        'conversion': {
+            'start_to_pix': _rate(totals['pix_generated'], totals['starts']),
+            'pix_to_paid': _rate(totals['payments'], totals['pix_generated']),
+            'start_to_paid': _rate(totals['payments'], totals['starts']),
+        }
+    }
+
+def timeseries(user_id: int, period: str, start: datetime, end: datetime, bot_id: Optional[int] = None) -> List[dict]:
+    """Totais por hora ou por dia"""
+    rows = _rollup_query(user_id, period, start, end, bot_id).with_entities(
+        AnalyticsRollup.bucket, *_sums()
+    ).group_by(AnalyticsRollup.bucket).order_by(AnalyticsRollup.bucket).all()
+    return [{'bucket': row.bucket.isoformat(), **_totals(row)} for row in rows]
+
+def breakdown(user_id: int, by: str, start: datetime, end: datetime, bot_id: Optional[int] = None) -> List[dict]:
+    """Totais por bot ou por plano no período (rollups diários), maior receita primeiro"""
+    column = AnalyticsRollup.bot_id if by == 'bot' else AnalyticsRollup.plan
+    query = _rollup_query(user_id, 'day', start, end, bot_id)
+    if by == 'plan':
+        # Linhas sem plano só carregam os /start
+        query = query.filter(AnalyticsRollup.plan != '')
+    rows = query.with_entities(column.label('key'), *_sums()).group_by(column).all()
+    result = [{by: row.key, **_totals(row)} for row in rows]
+    return sorted(result, key=lambda item: item['revenue'], reverse=True)
+
+# Instância global do registrador
+analytics = AnalyticsRecorder()
@@ -0,0 +1,207 @@
+"""
+Snapshots imutáveis da configuração dos bots usados pelos handlers do Telegram
+Montados uma vez a partir do banco (junto com a resposta do /start já pronta)
+e trocados atomicamente quando o bot é editado
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from ..models.bot import TelegramBot
+from ..utils.logger import logger
+
+# Planos exibidos quando o bot não tem valores PIX configurados
+DEFAULT_PLAN_VALUES = [19.90, 39.90, 99.90]
+DEFAULT_PLAN_NAMES = ["🌟VIP SEMANAL🌟", "💎PREMIUM MENSAL💎", "👑ELITE ANUAL👑"]
+DEFAULT_WELCOME_MESSAGE = "Olá! Bem-vindo ao meu bot!"
+
+# Tamanho máximo de legenda de mídia aceito pelo Telegram
+CAPTION_LIMIT = 1024
+
+@dataclass(frozen=True)
+class PlanOption:
+    """Plano oferecido pelo bot (já com valor convertido e nome resolvido)"""
+    __slots__ = ('index', 'name', 'value', 'duration')
+
+    index: int
+    name: str
+    value: float
+    duration: Optional[str]
+
+@dataclass(frozen=True)
+class WelcomeMedia:
+    """Mídia de boas-vindas enviada antes da mensagem ('photo' ou 'audio')"""
+    __slots__ = ('kind', 'file_id', 'path')
+
+    kind: str
+    file_id: Optional[str]
+    path: Optional[str]
+
+@dataclass(frozen=True)
+class WelcomeBundle:
+    """Resposta do /start pré-montada: texto, teclado dos planos e mídias na ordem de envio"""
+    __slots__ = ('text', 'reply_markup', 'media')
+
+    text: str
+    reply_markup: InlineKeyboardMarkup
+    media: Tuple[WelcomeMedia, ...]
+
+    @classmethod
+    def build(cls, bot_id: int, text: str, plans: Tuple[PlanOption, ...], media: Tuple[WelcomeMedia, ...]) -> 'WelcomeBundle':
+        """Monta o teclado uma única vez (os objetos do telegram são imutáveis e podem ser reutilizados)"""
+        keyboard = [
+            [
+                InlineKeyboardButton(
+                    f"{plan.name} - R$ {plan.value:.2f}",
+                    callback_data=f"pix_{plan.value}_{bot_id}_{plan.index}"
+                )
+            ]
+            for plan in plans
+        ]
+        return cls(text=text, reply_markup=InlineKeyboardMarkup(keyboard), media=media)
+
+    def get_media(self, kind: str) -> Optional[WelcomeMedia]:
+        for media in self.media:
+            if media.kind == kind:
+                return media
+        return None
+
+    @property
+    def caption_fits(self) -> bool:
+        """Se o texto cabe como legenda da imagem (uma única mensagem com foto, texto e botões)"""
+        return len(self.text) <= CAPTION_LIMIT
+
+@dataclass(frozen=True)
+class BotConfigSnapshot:
+    """Configuração imutável de um bot, sem dependência da sessão do SQLAlchemy"""
+    __slots__ = (
+        'bot_id', 'user_id', 'bot_token', 'bot_username', 'welcome_message', 'plans',
+        'vip_group_id', 'log_group_id', 'welcome_image_file_id', 'welcome_image_path',
+        'welcome_audio_file_id', 'welcome_audio_path', 'pushinpay_token', 'welcome'
+    )
+
+    bot_id: int
+    user_id: int
+    bot_token: str
+    bot_username: Optional[str]
+    welcome_message: str
+    plans: Tuple[PlanOption, ...]
+    vip_group_id: Optional[str]
+    log_group_id: Optional[str]
+    welcome_image_file_id: Optional[str]
+    welcome_image_path: Optional[str]
+    welcome_audio_file_id: Optional[str]
+    welcome_audio_path: Optional[str]
+    pushinpay_token: Optional[str]
+    welcome: WelcomeBundle
+
+    @classmethod
+    def from_model(cls, bot: TelegramBot) -> 'BotConfigSnapshot':
+        """Monta o snapshot a partir do modelo (e do dono, para o token PushinPay)"""
+        pix_values = bot.get_pix_values()
+        plan_names = bot.get_plan_names()
+        plan_durations = bot.get_plan_durations()
+
+        if pix_values:
+            plans = tuple(
+                PlanOption(
+                    index=i,
+                    name=plan_names[i] if i < len(plan_names) else f"Plano {i+1}",
+                    value=float(value),
+                    duration=plan_durations[i] if i < len(plan_durations) else None
+                )
+                for i, value in enumerate(pix_values)
+            )
+        else:
+            plans = tuple(
+                PlanOption(index=i, name=DEFAULT_PLAN_NAMES[i], value=value, duration=None)
+                for i, value in enumerate(DEFAULT_PLAN_VALUES)
+            )
+
+        welcome_message = bot.welcome_message or DEFAULT_WELCOME_MESSAGE
+        vip_group_id = bot.get_vip_group_id()
+        log_group_id = bot.get_log_group_id()
+
+        # Mídias iniciais só são enviadas se ambos os grupos estiverem configurados
+        media = []
+        if vip_group_id and log_group_id:
+            if bot.welcome_image_file_id or bot.welcome_image:
+                media.append(WelcomeMedia('photo', bot.welcome_image_file_id, bot.welcome_image))
+            if bot.welcome_audio_file_id or bot.welcome_audio:
+                media.append(WelcomeMedia('audio', bot.welcome_audio_file_id, bot.welcome_audio))
+
+        owner = bot.owner
+        return cls(
+            bot_id=bot.id,
+            user_id=bot.user_id,
+            bot_token=bot.bot_token,
+            bot_username=bot.bot_username,
+            welcome_message=welcome_message,
+            plans=plans,
+            vip_group_id=vip_group_id,
+            log_group_id=log_group_id,
+            welcome_image_file_id=bot.welcome_image_file_id,
+            welcome_image_path=bot.welcome_image,
+            welcome_audio_file_id=bot.welcome_audio_file_id,
+            welcome_audio_path=bot.welcome_audio,
+            pushinpay_token=owner.pushinpay_token if owner else None,
+            welcome=WelcomeBundle.build(bot.id, welcome_message, plans, tuple(media))
+        )
+
+    def has_vip_group(self) -> bool:
+        return bool(self.vip_group_id)
+
+    def has_log_group(self) -> bool:
+        return bool(self.log_group_id)
+
+    def get_plan(self, index: int) -> Optional[PlanOption]:
+        """Retorna o plano pelo índice do botão, se existir"""
+        if 0 <= index < len(self.plans):
+            return self.plans[index]
+        return None
+
+class BotConfigCache:
+    """Cache em memória (por processo) dos snapshots de configuração dos bots"""
+
+    def __init__(self):
+        self._snapshots: Dict[int, BotConfigSnapshot] = {}  # bot_id -> snapshot
+
+    def get(self, bot_id: int) -> Optional[BotConfigSnapshot]:
+        return self._snapshots.get(bot_id)
+
+    def put(self, snapshot: BotConfigSnapshot):
+        """Troca o snapshot do bot (atribuição atômica; leitores veem o antigo ou o novo)"""
+        self._snapshots[snapshot.bot_id] = snapshot
+
+    def refresh(self, bot: TelegramBot) -> BotConfigSnapshot:
+        """Monta e publica um novo snapshot a partir do modelo"""
+        snapshot = BotConfigSnapshot.from_model(bot)
+        self.put(snapshot)
+        return snapshot
+
+    def refresh_owner(self, user) -> int:
+        """Atualiza os snapshots em cache dos bots de um usuário (ex.: token PushinPay alterado)"""
+        refreshed = 0
+        for bot in user.bots:
+            if bot.id in self._snapshots:
+                self.refresh(bot)
+                refreshed += 1
+        return refreshed
+
+    def invalidate(self, bot_id: int):
+        self._snapshots.pop(bot_id, None)
+
+    def load(self, bot_id: int) -> Optional[BotConfigSnapshot]:
+        """Retorna o snapshot em cache ou o monta a partir do banco"""
+        snapshot = self._snapshots.get(bot_id)
+        if snapshot:
+            return snapshot
+
+        bot = TelegramBot.query.get(bot_id)
+        if not bot:
+            logger.error(f"❌ Bot {bot_id} não encontrado para montar configuração")
+            return None
+        return self.refresh(bot)
+
+# Instância global do cache
+bot_config_cache = BotConfigCache()
@@ -0,0 +1,348 @@
+"""
+Reconciliação dos bots deste processo com o banco, guiada por mudanças
+Em vez de varrer a tabela inteira a cada ciclo, só os bots alterados são reprocessados:
+- Postgres: um trigger em telegram_bots faz NOTIFY com o ID do bot e o loop recebe via LISTEN
+- Demais bancos: uma consulta indexada por updated_at acima da marca d'água a cada poucos segundos
+Uma comparação completa desejado x em execução (só IDs) roda em intervalo longo como rede de segurança
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Set
+from flask import current_app
+from sqlalchemy import func, text
+from ..models.bot import TelegramBot
+from ..database.models import db
+from .bot_runtime import bot_runtime
+from .telegram_bot_manager import bot_manager
+from ..utils.logger import logger
+
+NOTIFY_CHANNEL = 'telegram_bots_changed'
+RESTART_DELAY = 30  # segundos antes de reiniciar um bot cujo runner parou
+HIGH_WATER_OVERLAP = timedelta(seconds=2)  # folga para commits que terminam fora de ordem
+RECONCILE_BATCH = 500  # IDs por consulta IN (limite de parâmetros do SQLite)
+
+# Trigger do Postgres: avisa inserções, remoções e mudanças de configuração (updated_at avançou)
+NOTIFY_TRIGGER_SQL = f"""
+CREATE OR REPLACE FUNCTION notify_telegram_bot_change() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('{NOTIFY_CHANNEL}', OLD.id::text);
+        RETURN OLD;
+    END IF;
+    IF TG_OP = 'UPDATE' AND NEW.updated_at IS NOT DISTINCT FROM OLD.updated_at THEN
+        RETURN NEW;
+    END IF;
+    PERFORM pg_notify('{NOTIFY_CHANNEL}', NEW.id::text);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+DROP TRIGGER IF EXISTS telegram_bots_notify ON telegram_bots;
+CREATE TRIGGER telegram_bots_notify
+    AFTER INSERT OR UPDATE OR DELETE ON telegram_bots
+    FOR EACH ROW EXECUTE PROCEDURE notify_telegram_bot_change();
+"""
+
+class BotReconciler:
+    """Mantém os bots em execução iguais aos bots ativos do banco, processando só o que mudou"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dirty: Set[int] = set()
+        self._listen_conn = None  # conexão psycopg2 dedicada ao LISTEN
+        self._high_water: Optional[datetime] = None
+        self._seen: Dict[int, datetime] = {}  # bot_id -> updated_at já processado dentro da folga
+        self._full_pending = True
+        self._next_full = 0.0
+        self.stats = {
+            'mode': None,
+            'events': 0,
+            'reconciled': 0,
+            'started': 0,
+            'stopped': 0,
+            'restarted': 0,
+            'reloaded': 0,
+            'full_scans': 0,
+            'last_reconcile_at': None,
+            'last_reconcile_ms': None,
+            'last_full_diff': None,
+        }
+
+    def start(self):
+        """Agenda o reconciliador no loop compartilhado"""
+        if self._task is not None and not self._task.done():
+            return
+        bot_runtime.submit(self._run())
+
+    async def stop(self):
+        """Encerra o reconciliador e a conexão de LISTEN (chamar de dentro do loop)"""
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        self._close_listener()
+
+    def mark_dirty(self, bot_id: int, delay: float = 0):
+        """Marca o bot para reconciliação (chamar de dentro do loop)"""
+        if delay > 0:
+            asyncio.get_running_loop().call_later(delay, self.mark_dirty, bot_id)
+            return
+        self._dirty.add(bot_id)
+        self.stats['events'] += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def notify(self, bot_id: int):
+        """Marca o bot para reconciliação a partir de outra thread (ex.: rotas Flask)"""
+        if bot_runtime.is_running:
+            bot_runtime.call_soon(self.mark_dirty, bot_id)
+
+    @property
+    def pending_count(self) -> int:
+        """Bots marcados e ainda não reconciliados"""
+        return len(self._dirty)
+
+    @property
+    def is_postgres(self) -> bool:
+        return db.engine.dialect.name == 'postgresql'
+
+    async def _run(self):
+        self._task = asyncio.current_task()
+        self._wakeup = asyncio.Event()
+        # A primeira comparação completa espera o boot em lote: sem ela, criaria runners
+        # para os mesmos bots que start_all_active_bots ainda está iniciando
+        await bot_manager.wait_startup()
+        config = current_app.config
+        poll_interval = config['BOT_RECONCILE_POLL_INTERVAL']
+        full_interval = config['BOT_RECONCILE_FULL_INTERVAL']
+
+        self.stats['mode'] = 'high_water_mark'
+        self._high_water = db.session.query(func.max(TelegramBot.updated_at)).scalar()
+        db.session.commit()
+
+        while True:
+            try:
+                if not self._listening and self.is_postgres and time.monotonic() >= self._next_full:
+                    # Sem LISTEN (início ou conexão perdida): tenta de novo junto da comparação completa
+                    self._start_listener()
+                if not self._listening:
+                    self._collect_changes()
+
+                if self._full_pending or time.monotonic() >= self._next_full:
+                    await self.reconcile_all()
+                    self._next_full = time.monotonic() + full_interval
+                elif self._dirty:
+                    bot_ids, self._dirty = self._dirty, set()
+                    await self.reconcile(bot_ids)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"❌ Erro na reconciliação dos bots: {e}")
+
+            timeout = max(0.0, self._next_full - time.monotonic())
+            if not self._listening:
+                timeout = min(timeout, poll_interval)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    # Fontes de mudança
+
+    @property
+    def _listening(self) -> bool:
+        return self._listen_conn is not None
+
+    def _start_listener(self) -> bool:
+        """Instala o trigger e abre o LISTEN no Postgres (em caso de falha segue na marca d'água)"""
+        raw = None
+        try:
+            # Serializa a instalação do trigger entre workers que sobem juntos
+            db.session.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {'name': NOTIFY_CHANNEL})
+            db.session.execute(text(NOTIFY_TRIGGER_SQL))
+            db.session.commit()
+
+            # Conexão própria, fora do pool, em autocommit e observada pelo loop (custo zero ocioso)
+            raw = db.engine.raw_connection()
+            raw.detach()
+            conn = raw.connection
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+            asyncio.get_running_loop().add_reader(conn.fileno(), self._on_notify)
+            self._listen_conn = conn
+            self.stats['mode'] = 'listen_notify'
+            logger.info(f"👂 Reconciliação dos bots via LISTEN {NOTIFY_CHANNEL}")
+            return True
+        except Exception as e:
+            db.session.rollback()
+            if raw is not None:
+                raw.close()
+            logger.warning(f"⚠️  LISTEN/NOTIFY indisponível, usando consulta por updated_at: {e}")
+            return False
+
+    def _close_listener(self):
+        conn, self._listen_conn = self._listen_conn, None
+        if conn is None:
+            return
+        self.stats['mode'] = 'high_water_mark'
+        try:
+            asyncio.get_running_loop().remove_reader(conn.fileno())
+        except Exception:
+            pass
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _on_notify(self):
+        """Lê as notificações pendentes da conexão de LISTEN (callback do loop)"""
+        conn = self._listen_conn
+        try:
+            conn.poll()
+        except Exception as e:
+            logger.warning(f"⚠️  Conexão de LISTEN perdida: {e}")
+            self._close_listener()
+            self._next_full = 0.0  # reconecta e compara tudo: notificações podem ter se perdido
+            self._wakeup.set()
+            return
+
+        while conn.notifies:
+            notification = conn.notifies.pop(0)
+            try:
+                self.mark_dirty(int(notification.payload))
+            except ValueError:
+                continue
+
+    def _collect_changes(self):
+        """Marca os bots com updated_at acima da marca d'água (consulta indexada, vazia quando ocioso)"""
+        query = db.session.query(TelegramBot.id, TelegramBot.updated_at)
+        if self._high_water is not None:
+            query = query.filter(TelegramBot.updated_at > self._high_water - HIGH_WATER_OVERLAP)
+        else:
+            query = query.filter(TelegramBot.updated_at.isnot(None))
+        rows = query.all()
+        db.session.commit()
+
+        seen = {}
+        for bot_id, updated_at in rows:
+            seen[bot_id] = updated_at
+            if self._seen.get(bot_id) != updated_at:
+                self.mark_dirty(bot_id)
+            if self._high_water is None or updated_at > self._high_water:
+                self._high_water = updated_at
+        # Só os bots dentro da folga podem reaparecer na próxima consulta
+        self._seen = seen
+
+    # Desejado x em execução
+
+    def _service(self):
+        from .bot_runner import bot_manager_service
+        return bot_manager_service
+
+    def diff(self) -> dict:
+        """Compara os bots que deveriam rodar neste processo com os que estão rodando"""
+        service = self._service()
+        desired = {
+            bot_id for (bot_id,) in db.session.query(TelegramBot.id).filter(TelegramBot.is_active.is_(True))
+            if bot_manager.owns_bot(bot_id)
+        }
+        runners = dict(service.active_bots)
+        actual = set(runners) | set(bot_manager.bot_tokens)
+        dead = {bot_id for bot_id, runner in runners.items() if not runner.is_running}
+        return {
+            'desired': desired,
+            'actual': actual,
+            'to_start': (desired - set(runners)) | (dead & desired),
+            'to_stop': actual - desired,
+        }
+
+    async def reconcile_all(self):
+        """Comparação completa (só IDs): inicia o que falta, para o que sobra e reinicia runners parados"""
+        diff = self.diff()
+        db.session.commit()
+        self._full_pending = False
+        bot_ids, self._dirty = self._dirty, set()
+        self.stats['full_scans'] += 1
+        self.stats['last_full_diff'] = {
+            'desired': len(diff['desired']),
+            'actual': len(diff['actual']),
+            'to_start': len(diff['to_start']),
+            'to_stop': len(diff['to_stop']),
+        }
+        await self.reconcile(bot_ids | diff['to_start'] | diff['to_stop'])
+
+    async def reconcile(self, bot_ids: Iterable[int]):
+        """Aplica a configuração do banco aos bots informados"""
+        bot_ids = sorted(bot_ids)
+        if not bot_ids:
+            return
+
+        started = time.monotonic()
+        for offset in range(0, len(bot_ids), RECONCILE_BATCH):
+            batch = bot_ids[offset:offset + RECONCILE_BATCH]
+            bots = {
+                bot.id: bot
+                for bot in TelegramBot.query.populate_existing().filter(TelegramBot.id.in_(batch))
+            }
+            for bot_id in batch:
+                try:
+                    await self._apply(bot_id, bots.get(bot_id))
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"❌ Erro ao reconciliar bot {bot_id}: {e}")
+
+        self.stats['reconciled'] += len(bot_ids)
+        self.stats['last_reconcile_at'] = datetime.utcnow().isoformat()
+        self.stats['last_reconcile_ms'] = round((time.monotonic() - started) * 1000, 1)
+
+    async def _apply(self, bot_id: int, bot_config: Optional[TelegramBot]):
+        service = self._service()
+        runner = service.active_bots.get(bot_id)
+        desired = bot_config is not None and bot_config.is_active and bot_manager.owns_bot(bot_id)
+
+        if not desired:
+            if runner is not None or bot_manager.get_application(bot_id):
+                self.stats['stopped'] += 1
+            if runner is not None:
+                await service.stop_bot(bot_id)
+            # Para a Application restante e atualiza/descarta o snapshot
+            await bot_manager.reload_bot(bot_id)
+            return
+
+        if runner is None:
+            if service.start_bot(bot_config):
+                self.stats['started'] += 1
+        elif not runner.is_running:
+            logger.warning(f"Bot {bot_config.bot_username} parou, reiniciando...")
+            await service.stop_bot(bot_id)
+            if service.start_bot(bot_config):
+                self.stats['restarted'] += 1
+        else:
+            # Bot rodando e alterado: troca o snapshot (ou o token) sem reiniciar
+            await bot_manager.reload_bot(bot_id)
+            self.stats['reloaded'] += 1
+
+    def get_stats(self) -> dict:
+        """Métricas do reconciliador e a diferença atual desejado x em execução"""
+        diff = self.diff()
+        return {
+            **self.stats,
+            'running': self._task is not None and not self._task.done(),
+            'pending': self.pending_count,
+            'high_water': self._high_water.isoformat() if self._high_water else None,
+            'desired': len(diff['desired']),
+            'actual': len(diff['actual']),
+            'to_start': sorted(diff['to_start'])[:50],
+            'to_stop': sorted(diff['to_stop'])[:50],
+        }
+
+# Instância global do reconciliador
+bot_reconciler = BotReconciler()
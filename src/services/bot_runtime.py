@@ -0,0 +1,148 @@
+"""
+Loop asyncio compartilhado que hospeda todos os bots Telegram do processo
+Rotas Flask e serviços síncronos agendam corrotinas nele via submit()
+"""
+
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, Optional
+from ..utils.logger import logger
+
+class BotRuntime:
+    """Loop de eventos único (por processo) que possui todas as Applications"""
+
+    def __init__(self):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._app = None
+        self._thread: Optional[threading.Thread] = None
+        self._context: Optional[contextvars.Context] = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def is_running(self) -> bool:
+        """Indica se o loop compartilhado está ativo"""
+        return self.loop is not None and self.loop.is_running()
+
+    def in_loop_thread(self) -> bool:
+        """Indica se o código atual está executando dentro do loop compartilhado"""
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def start(self, app, timeout: float = 10):
+        """
+        Inicia o loop compartilhado em uma thread dedicada
+
+        Args:
+            app: Aplicação Flask cujo app_context fica ativo durante todo o loop
+            timeout: Tempo máximo de espera até o loop estar pronto
+        """
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+
+            self._app = app
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._run, name='bot-runtime', daemon=True)
+            self._thread.start()
+
+        if not self._ready.wait(timeout):
+            logger.error("❌ Loop compartilhado dos bots não iniciou a tempo")
+
+    def _run(self):
+        """Executa o loop até stop() ser chamado"""
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        loop.set_exception_handler(self._handle_loop_exception)
+
+        # Um único app_context para toda a vida do loop: as tarefas herdam uma cópia
+        # deste contexto, então nenhuma delas faz push/pop (e remove a sessão) das outras
+        with self._app.app_context():
+            self._context = contextvars.copy_context()
+            self.loop = loop
+            loop.call_soon(self._ready.set)
+
+            try:
+                logger.info("🔁 Loop compartilhado dos bots iniciado")
+                loop.run_forever()
+            except Exception as e:
+                logger.error(f"❌ Erro no loop compartilhado dos bots: {e}")
+            finally:
+                try:
+                    pending = asyncio.all_tasks(loop)
+                    for task in pending:
+                        task.cancel()
+                    loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+                    loop.run_until_complete(loop.shutdown_asyncgens())
+                finally:
+                    self.loop = None
+                    loop.close()
+                    logger.info("⏹️  Loop compartilhado dos bots encerrado")
+
+    def _handle_loop_exception(self, loop, context: dict):
+        """Registra exceções não tratadas de tarefas sem derrubar o loop"""
+        exception = context.get('exception')
+        logger.error(f"❌ Erro não tratado no loop dos bots: {exception or context.get('message')}")
+
+    def submit(self, coro: Coroutine) -> Future:
+        """
+        Agenda uma corrotina no loop compartilhado (thread-safe)
+
+        Args:
+            coro: Corrotina a executar
+
+        Returns:
+            concurrent.futures.Future com o resultado da corrotina
+        """
+        if not self.is_running:
+            coro.close()
+            raise RuntimeError("Loop compartilhado dos bots não está rodando")
+
+        future: Future = Future()
+        self.loop.call_soon_threadsafe(self._schedule, coro, future, context=self._context)
+        return future
+
+    def _schedule(self, coro: Coroutine, future: Future):
+        """Cria a tarefa dentro do loop e encadeia seu resultado ao Future do chamador"""
+        if not future.set_running_or_notify_cancel():
+            coro.close()
+            return
+
+        task = self.loop.create_task(coro)
+
+        def _copy_result(done_task: asyncio.Task):
+            if done_task.cancelled():
+                future.cancel()
+            elif done_task.exception() is not None:
+                future.set_exception(done_task.exception())
+            else:
+                future.set_result(done_task.result())
+
+        task.add_done_callback(_copy_result)
+
+    def call_soon(self, callback, *args):
+        """Agenda uma função síncrona no loop compartilhado (thread-safe)"""
+        if not self.is_running:
+            raise RuntimeError("Loop compartilhado dos bots não está rodando")
+        self.loop.call_soon_threadsafe(callback, *args, context=self._context)
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Agenda uma corrotina e aguarda seu resultado (não usar de dentro do loop)"""
+        if self.in_loop_thread():
+            coro.close()
+            raise RuntimeError("run() não pode ser chamado de dentro do loop compartilhado")
+        return self.submit(coro).result(timeout)
+
+    def stop(self, timeout: float = 10):
+        """Para o loop compartilhado e aguarda a thread terminar"""
+        loop = self.loop
+        if loop is None or not loop.is_running():
+            return
+
+        loop.call_soon_threadsafe(loop.stop)
+        if self._thread and not self.in_loop_thread():
+            self._thread.join(timeout)
+
+# Instância global do loop compartilhado
+bot_runtime = BotRuntime()
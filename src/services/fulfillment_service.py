@@ -0,0 +1,195 @@
+"""
+Liberação de acesso dos pagamentos aprovados (convite VIP, notificação e confirmação)
+A aprovação é uma transição atômica pending -> aprovado que grava, na mesma
+transação, um item no outbox; o worker no loop compartilhado drena o outbox,
+então cada pagamento é liberado uma única vez, venha de onde vier a confirmação
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+from flask import current_app
+from sqlalchemy import and_, or_
+from ..models.fulfillment import FulfillmentOutbox
+from ..models.payment import Payment
+from ..database.models import db
+from .analytics import analytics
+from .bot_runtime import bot_runtime
+from ..utils.logger import logger
+
+def confirm_payment(payment_id: int, status: str = 'approved') -> bool:
+    """
+    Marca o pagamento como pago apenas se ainda estiver pendente (compare-and-set)
+    e enfileira sua liberação no outbox na mesma transação
+
+    Args:
+        payment_id: ID do pagamento
+        status: Status final ('approved' nos bots, 'completed' via webhook/painel)
+
+    Returns:
+        True somente para quem efetivamente aprovou o pagamento
+    """
+    try:
+        updated = Payment.query.filter_by(id=payment_id, status='pending').update(
+            {'status': status, 'paid_at': datetime.utcnow()},
+            synchronize_session=False
+        )
+        if updated != 1:
+            # Já aprovado/expirado por outro caminho: encerra a transação sem mudanças
+            db.session.commit()
+            return False
+
+        payment = db.session.query(
+            Payment.bot_id, Payment.user_id, Payment.plan_name, Payment.amount, Payment.paid_at
+        ).filter_by(id=payment_id).one()
+        db.session.add(FulfillmentOutbox(payment_id=payment_id, bot_id=payment.bot_id))
+        db.session.commit()
+
+    except Exception:
+        db.session.rollback()
+        raise
+
+    # Mesmo paid_at gravado no pagamento: o rollup ao vivo e o rebuild_rollups caem no mesmo bucket
+    analytics.record_payment(payment.bot_id, payment.user_id, payment.plan_name, payment.amount, payment.paid_at)
+    logger.info(f"✅ Pagamento {payment_id} aprovado ({status}), liberação enfileirada")
+    fulfillment_worker.notify()
+    return True
+
+class FulfillmentWorker:
+    """Drena o outbox de liberações dos bots que rodam neste processo"""
+
+    def __init__(self):
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Agenda o worker no loop compartilhado (thread-safe)"""
+        bot_runtime.submit(self._run())
+
+    async def stop(self):
+        """Encerra o worker (chamar de dentro do loop)"""
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    def notify(self):
+        """Acorda o worker para drenar o outbox agora (thread-safe)"""
+        if self._wakeup is not None and bot_runtime.is_running:
+            bot_runtime.call_soon(self._wakeup.set)
+
+    async def _run(self):
+        """Laço principal: drena o outbox quando notificado ou a cada FULFILLMENT_POLL_INTERVAL"""
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.current_task()
+        self._wakeup = asyncio.Event()
+        logger.info("📦 Worker de liberação de pagamentos iniciado")
+
+        config = current_app.config
+        try:
+            while True:
+                self._wakeup.clear()
+                try:
+                    processed = await self.drain()
+                except Exception as e:
+                    logger.error(f"❌ Erro ao drenar outbox de liberações: {e}")
+                    db.session.rollback()
+                    processed = 0
+
+                # Lote cheio: provavelmente há mais itens esperando
+                if processed >= config['FULFILLMENT_BATCH_SIZE']:
+                    continue
+
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), config['FULFILLMENT_POLL_INTERVAL'])
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._wakeup = None
+            logger.info("⏹️  Worker de liberação de pagamentos encerrado")
+
+    async def drain(self) -> int:
+        """Assume e processa um lote de itens do outbox; retorna quantos foram assumidos"""
+        from .telegram_bot_manager import bot_manager
+
+        # Só dá para liberar pelos bots em execução aqui (os demais ficam para o worker dono)
+        running_bot_ids = list(bot_manager.bot_tokens.keys())
+        if not running_bot_ids:
+            return 0
+
+        config = current_app.config
+        now = datetime.utcnow()
+        stale_before = now - timedelta(seconds=config['FULFILLMENT_LOCK_TIMEOUT'])
+
+        candidates = FulfillmentOutbox.query.with_entities(FulfillmentOutbox.id).filter(
+            FulfillmentOutbox.bot_id.in_(running_bot_ids),
+            self._claimable(now, stale_before)
+        ).order_by(FulfillmentOutbox.id).limit(config['FULFILLMENT_BATCH_SIZE']).all()
+
+        claimed = [outbox_id for (outbox_id,) in candidates if self._claim(outbox_id, now, stale_before)]
+        if claimed:
+            await asyncio.gather(*(self._process(outbox_id) for outbox_id in claimed))
+        return len(claimed)
+
+    @staticmethod
+    def _claimable(now: datetime, stale_before: datetime):
+        """Itens pendentes já vencidos ou em processamento abandonado (worker caiu)"""
+        return or_(
+            and_(FulfillmentOutbox.status == 'pending', FulfillmentOutbox.next_attempt_at <= now),
+            and_(FulfillmentOutbox.status == 'processing', FulfillmentOutbox.locked_at < stale_before)
+        )
+
+    def _claim(self, outbox_id: int, now: datetime, stale_before: datetime) -> bool:
+        """Assume o item com compare-and-set (outro processo pode ter assumido antes)"""
+        updated = FulfillmentOutbox.query.filter(
+            FulfillmentOutbox.id == outbox_id,
+            self._claimable(now, stale_before)
+        ).update({'status': 'processing', 'locked_at': now}, synchronize_session=False)
+        db.session.commit()
+        return updated == 1
+
+    async def _process(self, outbox_id: int):
+        """Libera o acesso do pagamento e registra o resultado no outbox"""
+        from .telegram_bot_manager import bot_manager
+
+        item = FulfillmentOutbox.query.populate_existing().get(outbox_id)
+        payment = Payment.query.populate_existing().get(item.payment_id)
+
+        if payment is None or payment.telegram_user_id is None:
+            self._finish(item, 'failed', 'pagamento sem cliente do Telegram')
+            return
+
+        try:
+            delivered = await bot_manager.fulfill_payment(payment)
+            error = None if delivered else 'bot não está rodando neste processo'
+        except Exception as e:
+            delivered, error = False, str(e)
+
+        if delivered:
+            self._finish(item, 'done')
+            return
+
+        item.attempts += 1
+        if item.attempts >= current_app.config['FULFILLMENT_MAX_ATTEMPTS']:
+            logger.error(f"❌ Liberação do pagamento {payment.id} desistiu após {item.attempts} tentativas: {error}")
+            self._finish(item, 'failed', error)
+            return
+
+        delay = min(5 * (2 ** item.attempts), 300)
+        logger.warning(f"⚠️  Liberação do pagamento {payment.id} falhou ({error}), nova tentativa em {delay}s")
+        item.status = 'pending'
+        item.last_error = error
+        item.locked_at = None
+        item.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+        db.session.commit()
+
+    def _finish(self, item: FulfillmentOutbox, status: str, error: str = None):
+        item.status = status
+        item.last_error = error
+        item.processed_at = datetime.utcnow()
+        item.locked_at = None
+        db.session.commit()
+
+# Instância global do worker
+fulfillment_worker = FulfillmentWorker()
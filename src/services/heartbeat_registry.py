@@ -0,0 +1,141 @@
+"""
+Registro em memória do estado de execução dos bots (is_running e last_activity)
+Os runners e o gerenciador só atualizam o registro; um único escritor grava tudo no banco
+a cada HEARTBEAT_FLUSH_INTERVAL segundos em um UPDATE em lote, fora do loop dos bots.
+O painel lê daqui o estado dos bots deste processo e usa o banco para os demais
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from flask import current_app
+from sqlalchemy import text
+from ..database.models import db
+from .bot_runtime import bot_runtime
+from ..utils.logger import logger
+
+FLUSH_BATCH = 1000  # bots por UPDATE (limite de parâmetros por comando)
+
+class HeartbeatRegistry:
+    """Estado de execução dos bots deste processo, gravado no banco em lote"""
+
+    def __init__(self):
+        self._state: Dict[int, Tuple[bool, datetime]] = {}  # bot_id -> (is_running, last_activity)
+        self._pending = set()  # bots com estado ainda não gravado
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {'flushes': 0, 'rows': 0, 'errors': 0, 'last_flush_ms': None}
+
+    def start(self):
+        """Agenda o escritor no loop compartilhado"""
+        if self._task is not None and not self._task.done():
+            return
+        bot_runtime.submit(self._run())
+
+    async def stop(self):
+        """Encerra o escritor gravando o que ainda estiver pendente (chamar de dentro do loop)"""
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        # No encerramento o executor padrão pode já estar fechado: grava direto
+        await self.flush(in_executor=False)
+
+    def beat(self, bot_id: int):
+        """Registra atividade de um bot em execução (só memória)"""
+        self._state[bot_id] = (True, datetime.utcnow())
+        self._pending.add(bot_id)
+
+    def set_running(self, bot_id: int, running: bool):
+        """Registra início ou parada do bot (gravado no próximo flush)"""
+        last_activity = datetime.utcnow() if running else self.last_activity(bot_id)
+        self._state[bot_id] = (running, last_activity)
+        self._pending.add(bot_id)
+
+    def is_running(self, bot_id: int, default: bool = False) -> bool:
+        state = self._state.get(bot_id)
+        return state[0] if state else default
+
+    def last_activity(self, bot_id: int, default: Optional[datetime] = None) -> Optional[datetime]:
+        state = self._state.get(bot_id)
+        return state[1] if state else default
+
+    def bot_running(self, bot) -> bool:
+        """Estado atual do bot para o painel: memória se o bot roda aqui, senão a última gravação no banco"""
+        return self.is_running(bot.id, default=bool(bot.is_running))
+
+    async def _run(self):
+        self._task = asyncio.current_task()
+        interval = current_app.config['HEARTBEAT_FLUSH_INTERVAL']
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+    async def flush(self, in_executor: bool = True) -> int:
+        """Grava os estados pendentes em lote (por padrão em uma thread, sem bloquear o loop)"""
+        if not self._pending:
+            return 0
+
+        bot_ids, self._pending = self._pending, set()
+        rows = [(bot_id,) + self._state[bot_id] for bot_id in bot_ids if bot_id in self._state]
+        engine = db.engine
+        started = asyncio.get_running_loop().time()
+        try:
+            if in_executor:
+                await asyncio.get_running_loop().run_in_executor(None, self._write, engine, rows)
+            else:
+                self._write(engine, rows)
+        except Exception as e:
+            # Tenta de novo no próximo ciclo (estados mais novos continuam no registro)
+            self._pending |= bot_ids
+            self.stats['errors'] += 1
+            logger.warning(f"⚠️  Erro ao gravar estado de {len(rows)} bot(s): {e}")
+            return 0
+
+        # Bots parados já gravados saem do registro: o banco passa a ser a fonte
+        for bot_id, _, _ in rows:
+            state = self._state.get(bot_id)
+            if state and not state[0] and bot_id not in self._pending:
+                del self._state[bot_id]
+
+        self.stats['flushes'] += 1
+        self.stats['rows'] += len(rows)
+        self.stats['last_flush_ms'] = round((asyncio.get_running_loop().time() - started) * 1000, 1)
+        return len(rows)
+
+    @staticmethod
+    def _write(engine, rows: List[Tuple[int, bool, Optional[datetime]]]):
+        """Executa o UPDATE em lote em uma única transação"""
+        with engine.begin() as conn:
+            if conn.dialect.name == 'postgresql':
+                for offset in range(0, len(rows), FLUSH_BATCH):
+                    batch = rows[offset:offset + FLUSH_BATCH]
+                    values = []
+                    params = {}
+                    for i, (bot_id, running, last_activity) in enumerate(batch):
+                        values.append(f"(CAST(:id{i} AS INTEGER), CAST(:running{i} AS BOOLEAN), CAST(:activity{i} AS TIMESTAMP))")
+                        params.update({f'id{i}': bot_id, f'running{i}': running, f'activity{i}': last_activity})
+                    conn.execute(text(
+                        "UPDATE telegram_bots AS t SET is_running = v.is_running, "
+                        "last_activity = COALESCE(v.last_activity, t.last_activity) "
+                        f"FROM (VALUES {', '.join(values)}) AS v(id, is_running, last_activity) "
+                        "WHERE t.id = v.id"
+                    ), params)
+            else:
+                # Sem UPDATE ... FROM portável: um único comando executado para todas as linhas
+                conn.execute(text(
+                    "UPDATE telegram_bots SET is_running = :running, "
+                    "last_activity = COALESCE(:activity, last_activity) WHERE id = :id"
+                ), [
+                    {'id': bot_id, 'running': running, 'activity': last_activity}
+                    for bot_id, running, last_activity in rows
+                ])
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            'tracked': len(self._state),
+            'pending': len(self._pending),
+        }
+
+# Instância global do registro
+heartbeat_registry = HeartbeatRegistry()
@@ -0,0 +1,116 @@
+"""
+Fila de tarefas em segundo plano disparadas pelo painel (início de bot e upload de mídia)
+A rota só grava a tarefa e responde com o ID; a execução acontece no loop compartilhado
+e o progresso fica na tabela background_jobs, consultada em /bots/jobs/<id>
+"""
+
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional
+from flask import current_app
+from ..models.background_job import BackgroundJob
+from ..database.models import db
+from .bot_runtime import bot_runtime
+from ..utils.logger import logger
+
+async def _start_bot_job(job: BackgroundJob, progress: Callable[[int, str], None]) -> str:
+    from .telegram_bot_manager import bot_manager
+
+    if not bot_manager.owns_bot(job.bot_id):
+        return 'Bot será iniciado pelo worker responsável'
+
+    progress(10, 'Conectando ao Telegram')
+    if not await bot_manager.start_bot_by_id(job.bot_id):
+        error = bot_manager.start_errors.get(job.bot_id, 'falha ao iniciar')
+        raise RuntimeError(f'Não foi possível iniciar o bot: {error}')
+    return 'Bot iniciado'
+
+async def _media_upload_job(job: BackgroundJob, progress: Callable[[int, str], None]) -> str:
+    from .media_health import media_health
+
+    uploaded = await media_health.upload_missing(job.bot_id, progress)
+    return f'{uploaded} mídia(s) enviada(s) ao Telegram' if uploaded else 'Nenhuma mídia pendente de envio'
+
+# Tipo da tarefa -> corrotina que a executa (recebe a tarefa e a função de progresso)
+JOB_HANDLERS: Dict[str, Callable[[BackgroundJob, Callable[[int, str], None]], Awaitable[str]]] = {
+    'start_bot': _start_bot_job,
+    'media_upload': _media_upload_job,
+}
+
+class JobQueue:
+    """Enfileira tarefas no loop compartilhado e registra seu andamento no banco"""
+
+    def enqueue(self, kind: str, user_id: int, bot_id: Optional[int] = None, message: str = None) -> BackgroundJob:
+        """
+        Cria a tarefa (commit imediato) e agenda sua execução; chamar das rotas Flask
+
+        Returns:
+            A tarefa criada (o ID vai para a resposta da rota)
+        """
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f'Tipo de tarefa desconhecido: {kind}')
+
+        job = BackgroundJob(id=uuid.uuid4().hex, kind=kind, user_id=user_id, bot_id=bot_id, message=message)
+        db.session.add(job)
+        db.session.commit()
+
+        try:
+            bot_runtime.submit(self._execute(job.id))
+        except RuntimeError as e:
+            job.status = 'failed'
+            job.error = str(e)
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            logger.error(f"❌ Não foi possível agendar a tarefa {job.id} ({kind}): {e}")
+
+        return job
+
+    def get(self, job_id: str) -> Optional[BackgroundJob]:
+        return BackgroundJob.query.get(job_id)
+
+    async def _execute(self, job_id: str):
+        """Executa a tarefa no loop compartilhado, gravando início, progresso e resultado"""
+        job = BackgroundJob.query.populate_existing().get(job_id)
+        if job is None:
+            return
+
+        job.status = 'running'
+        job.started_at = datetime.utcnow()
+        db.session.commit()
+
+        def progress(percent: int, message: str):
+            job.progress = max(0, min(100, percent))
+            job.message = message
+            db.session.commit()
+
+        try:
+            result = await JOB_HANDLERS[job.kind](job, progress)
+            job.status = 'done'
+            job.progress = 100
+            job.message = result
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"❌ Tarefa {job.id} ({job.kind}) do bot {job.bot_id} falhou: {e}")
+            job.status = 'failed'
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+
+        self._purge_old()
+
+    def _purge_old(self):
+        """Remove tarefas concluídas há mais de BACKGROUND_JOB_RETENTION_HOURS"""
+        cutoff = datetime.utcnow() - timedelta(hours=current_app.config['BACKGROUND_JOB_RETENTION_HOURS'])
+        try:
+            BackgroundJob.query.filter(
+                BackgroundJob.finished_at.isnot(None),
+                BackgroundJob.finished_at < cutoff
+            ).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"⚠️  Erro ao limpar tarefas antigas: {e}")
+
+# Instância global da fila
+job_queue = JobQueue()
@@ -0,0 +1,317 @@
+"""
+Verificação periódica das mídias de boas-vindas dos bots hospedados neste processo
+Valida os file_ids salvos (getFile), reenvia do store local quando ficam inválidos
+e baixa para o store as mídias que só existem no Telegram, mantendo o /start
+sempre no caminho barato de envio por file_id
+"""
+
+import asyncio
+import random
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional, Set
+from flask import current_app
+from telegram import Bot
+from ..models.bot import TelegramBot
+from ..database.models import db
+from .bot_config_cache import bot_config_cache, BotConfigSnapshot
+from .bot_runtime import bot_runtime
+from .media_store import media_store
+from .telegram_media_service import TelegramMediaService
+from ..utils.logger import logger
+
+# Colunas (file_id, arquivo local) de cada tipo de mídia de boas-vindas
+WELCOME_MEDIA_COLUMNS = {
+    'photo': ('welcome_image_file_id', 'welcome_image'),
+    'audio': ('welcome_audio_file_id', 'welcome_audio'),
+}
+
+# Extensão usada ao baixar mídia do Telegram sem extensão conhecida
+DEFAULT_EXTENSIONS = {'photo': 'jpg', 'audio': 'mp3'}
+
+MAX_DOWNLOAD_SIZE = 20 * 1024 * 1024  # limite de download do getFile
+POLL_INTERVAL = 60  # segundos entre varreduras por bots com verificação vencida
+
+def replace_file_id(bot_id: int, kind: str, old_file_id: Optional[str], new_file_id: str,
+                    path: Optional[str] = None) -> bool:
+    """
+    Troca o file_id da mídia do bot apenas se ainda for `old_file_id` (compare-and-set),
+    registra o file_id do conteúdo (`path` no store) e publica o novo snapshot
+
+    Returns:
+        False se a mídia foi alterada nesse meio tempo
+    """
+    file_id_column, _ = WELCOME_MEDIA_COLUMNS[kind]
+    column = getattr(TelegramBot, file_id_column)
+    try:
+        updated = TelegramBot.query.filter(
+            TelegramBot.id == bot_id,
+            column == old_file_id if old_file_id else column.is_(None)
+        ).update({file_id_column: new_file_id, 'updated_at': datetime.utcnow()}, synchronize_session=False)
+        sha256 = media_store.sha_of(path)
+        if updated and sha256:
+            media_store.remember_file_id(sha256, bot_id, kind, new_file_id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    if updated:
+        bot_config_cache.refresh(TelegramBot.query.populate_existing().get(bot_id))
+        logger.info(f"🔧 file_id de {kind} do bot {bot_id} reparado ({old_file_id or 'sem file_id'} -> {new_file_id})")
+    return bool(updated)
+
+class MediaHealthService:
+    """Verifica e corrige as mídias de boas-vindas dos bots rodando neste processo"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._checked_at: Dict[int, float] = {}  # bot_id -> time.monotonic() da última verificação
+        self._requested: Set[int] = set()
+        self._locks: Dict[int, asyncio.Lock] = {}
+        self.stats = {'checked': 0, 'invalid': 0, 'reuploaded': 0, 'cached': 0}
+
+    def start(self):
+        """Agenda o serviço no loop compartilhado (thread-safe)"""
+        bot_runtime.submit(self._run())
+
+    async def stop(self):
+        """Encerra o serviço (chamar de dentro do loop)"""
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    def check_soon(self, bot_id: int):
+        """Pede a verificação das mídias do bot na próxima rodada (thread-safe)"""
+        if bot_runtime.is_running:
+            bot_runtime.call_soon(self._request_check, bot_id)
+
+    @staticmethod
+    def needs_upload(snapshot: BotConfigSnapshot) -> bool:
+        """Se o bot tem mídia só no store local (sem file_id), ou seja, precisa de upload"""
+        return bool(
+            (snapshot.welcome_image_path and not snapshot.welcome_image_file_id)
+            or (snapshot.welcome_audio_path and not snapshot.welcome_audio_file_id)
+        )
+
+    def _request_check(self, bot_id: int):
+        self._requested.add(bot_id)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        """Laço principal: verifica os bots cuja última verificação passou de MEDIA_HEALTH_INTERVAL"""
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.current_task()
+        self._wakeup = asyncio.Event()
+        logger.info("🩺 Verificação de mídias de boas-vindas iniciada")
+
+        try:
+            while True:
+                self._wakeup.clear()
+                try:
+                    await self.check_due()
+                except Exception as e:
+                    logger.error(f"❌ Erro na verificação de mídias: {e}")
+                    db.session.rollback()
+
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._wakeup = None
+            logger.info("⏹️  Verificação de mídias de boas-vindas encerrada")
+
+    async def check_due(self) -> int:
+        """Verifica os bots com verificação vencida ou pedida; retorna quantos foram verificados"""
+        from .telegram_bot_manager import bot_manager
+
+        config = current_app.config
+        now = time.monotonic()
+        running = set(bot_manager.bot_tokens.keys())
+
+        # Esquece bots que saíram deste processo
+        for bot_id in list(self._checked_at):
+            if bot_id not in running:
+                del self._checked_at[bot_id]
+                lock = self._locks.get(bot_id)
+                if lock is not None and not lock.locked():
+                    del self._locks[bot_id]
+
+        interval = config['MEDIA_HEALTH_INTERVAL']
+        for bot_id in running:
+            if bot_id not in self._checked_at:
+                snapshot = bot_config_cache.get(bot_id)
+                if snapshot is not None and self.needs_upload(snapshot):
+                    self._requested.add(bot_id)
+                # Bots recém-iniciados: espalha a primeira verificação ao longo do intervalo
+                self._checked_at[bot_id] = now - random.uniform(0, interval)
+
+        due = [
+            bot_id for bot_id in running
+            if bot_id in self._requested or now - self._checked_at[bot_id] >= interval
+        ]
+        self._requested.difference_update(due)
+        if not due:
+            return 0
+
+        semaphore = asyncio.Semaphore(config['MEDIA_HEALTH_CONCURRENCY'])
+
+        async def check_one(bot_id: int):
+            async with semaphore:
+                try:
+                    await self.check_bot(bot_id)
+                except Exception as e:
+                    logger.error(f"❌ Erro ao verificar mídias do bot {bot_id}: {e}")
+                    db.session.rollback()
+                finally:
+                    self._checked_at[bot_id] = time.monotonic()
+
+        await asyncio.gather(*(check_one(bot_id) for bot_id in due))
+        return len(due)
+
+    def _lock_for(self, bot_id: int) -> asyncio.Lock:
+        """Lock por bot: verificação periódica e upload pedido pelo painel não enviam a mesma mídia duas vezes"""
+        lock = self._locks.get(bot_id)
+        if lock is None:
+            lock = self._locks[bot_id] = asyncio.Lock()
+        return lock
+
+    @staticmethod
+    def _media_of(snapshot: BotConfigSnapshot):
+        return (
+            ('photo', snapshot.welcome_image_file_id, snapshot.welcome_image_path),
+            ('audio', snapshot.welcome_audio_file_id, snapshot.welcome_audio_path),
+        )
+
+    async def check_bot(self, bot_id: int):
+        """Valida (e corrige) a imagem e o áudio de boas-vindas de um bot"""
+        from .telegram_bot_manager import bot_manager
+
+        async with self._lock_for(bot_id):
+            application = bot_manager.get_application(bot_id)
+            snapshot = bot_config_cache.get(bot_id)
+            if application is None or snapshot is None:
+                return
+
+            service = TelegramMediaService(snapshot.bot_token, bot=application.bot)
+            for kind, file_id, path in self._media_of(snapshot):
+                if file_id or path:
+                    await self._check_media(service, snapshot, kind, file_id, path)
+
+    async def upload_missing(self, bot_id: int, on_progress: Optional[Callable[[int, str], None]] = None) -> int:
+        """
+        Envia ao Telegram as mídias do bot que só existem no store local (sem file_id)
+        Usa o bot em execução neste processo ou, se ele não roda aqui, uma conexão avulsa
+
+        Returns:
+            Quantas mídias receberam file_id
+        """
+        from .telegram_bot_manager import bot_manager
+
+        async with self._lock_for(bot_id):
+            bot = TelegramBot.query.populate_existing().get(bot_id)
+            if bot is None:
+                return 0
+            snapshot = BotConfigSnapshot.from_model(bot)
+            pending = [(kind, path) for kind, file_id, path in self._media_of(snapshot) if path and not file_id]
+            if not pending:
+                return 0
+            if not snapshot.log_group_id:
+                logger.warning(f"⚠️  Bot {bot_id} sem grupo de logs: mídia fica apenas no arquivo local")
+                return 0
+
+            application = bot_manager.get_application(bot_id)
+            if application is not None:
+                return await self._upload_all(TelegramMediaService(snapshot.bot_token, bot=application.bot), snapshot, pending, on_progress)
+
+            async with Bot(token=snapshot.bot_token, base_url=current_app.config['TELEGRAM_API_URL']) as standalone:
+                return await self._upload_all(TelegramMediaService(snapshot.bot_token, bot=standalone), snapshot, pending, on_progress)
+
+    async def _upload_all(self, service: TelegramMediaService, snapshot: BotConfigSnapshot, pending, on_progress) -> int:
+        uploaded = 0
+        for position, (kind, path) in enumerate(pending, start=1):
+            if await self._upload(service, snapshot, kind, None, path):
+                uploaded += 1
+            if on_progress:
+                on_progress(int(100 * position / len(pending)), f"{kind} enviado ({position}/{len(pending)})")
+        return uploaded
+
+    async def _check_media(self, service: TelegramMediaService, snapshot: BotConfigSnapshot,
+                           kind: str, file_id: Optional[str], path: Optional[str]):
+        has_local = media_store.has(path)
+
+        if file_id:
+            self.stats['checked'] += 1
+            info = await service.get_media_info(file_id)
+            if info['valid'] is None:
+                # Erro transitório: tenta de novo na próxima rodada
+                return
+            if info['valid']:
+                if not has_local:
+                    await self._cache_locally(service, snapshot.bot_id, kind, file_id, path, info)
+                return
+
+            self.stats['invalid'] += 1
+            logger.warning(f"⚠️  file_id de {kind} do bot {snapshot.bot_id} inválido: {info.get('error')}")
+            sha256 = media_store.sha_of(path)
+            if sha256:
+                media_store.forget_file_id(sha256, snapshot.bot_id, file_id)
+                db.session.commit()
+
+        # file_id inválido ou ausente: reenvia a partir da cópia local
+        if not has_local:
+            logger.error(f"❌ Mídia {kind} do bot {snapshot.bot_id} sem cópia local para reenvio")
+            return
+        await self._upload(service, snapshot, kind, file_id, path)
+
+    async def _upload(self, service: TelegramMediaService, snapshot: BotConfigSnapshot,
+                      kind: str, old_file_id: Optional[str], path: str) -> bool:
+        """Envia a cópia local ao grupo de logs e troca o file_id do bot (compare-and-set)"""
+        if not snapshot.log_group_id:
+            return False
+
+        new_file_id = await service.upload_media_to_telegram(path, snapshot.log_group_id, snapshot.bot_id, kind)
+        if new_file_id and replace_file_id(snapshot.bot_id, kind, old_file_id, new_file_id, path):
+            self.stats['reuploaded'] += 1
+            return True
+        return False
+
+    async def _cache_locally(self, service: TelegramMediaService, bot_id: int, kind: str,
+                             file_id: str, old_path: Optional[str], info: dict):
+        """Baixa a mídia que só existe no Telegram para o store (origem de futuros reenvios)"""
+        if not info.get('file_path') or (info.get('file_size') or 0) > MAX_DOWNLOAD_SIZE:
+            return
+
+        data = await service.download_media(file_id)
+        if not data:
+            return
+
+        extension = media_store.extension_of(info['file_path']) or DEFAULT_EXTENSIONS[kind]
+        stored = await asyncio.get_running_loop().run_in_executor(None, media_store.store_bytes, data, extension)
+
+        file_id_column, path_column = WELCOME_MEDIA_COLUMNS[kind]
+        column = getattr(TelegramBot, path_column)
+        updated = TelegramBot.query.filter(
+            TelegramBot.id == bot_id,
+            getattr(TelegramBot, file_id_column) == file_id,
+            column == old_path if old_path else column.is_(None)
+        ).update({path_column: stored.path}, synchronize_session=False)
+        if updated:
+            media_store.remember_file_id(stored.sha256, bot_id, kind, file_id)
+        db.session.commit()
+
+        if updated:
+            bot_config_cache.refresh(TelegramBot.query.populate_existing().get(bot_id))
+            self.stats['cached'] += 1
+            logger.info(f"💾 Cópia local da mídia {kind} do bot {bot_id} salva em {stored.path}")
+
+    def get_stats(self) -> dict:
+        return dict(self.stats, tracked_bots=len(self._checked_at))
+
+# Instância global do serviço
+media_health = MediaHealthService()
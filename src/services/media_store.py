@@ -0,0 +1,150 @@
+"""
+Armazenamento local das mídias de boas-vindas endereçado por conteúdo (SHA-256)
+Cada conteúdo é gravado uma única vez em <MEDIA_STORE_DIR>/<hash[:2]>/<hash>.<ext>
+e serve de origem para reenviar a mídia quando o file_id do Telegram fica inválido;
+a tabela media_assets guarda o file_id de cada conteúdo por bot, então reenviar o
+mesmo arquivo vira uma consulta em vez de um novo upload
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+from dataclasses import dataclass
+from typing import Optional
+from ..models.media_asset import MediaAsset
+from ..database.models import db
+from ..utils.logger import logger
+
+CHUNK_SIZE = 64 * 1024  # leitura em blocos: memória constante para qualquer tamanho
+SHA256_NAME = re.compile(r'^([0-9a-f]{64})(\.|$)')
+
+class MediaRejected(ValueError):
+    """Conteúdo recusado pelo store (vazio ou maior que o limite)"""
+
+@dataclass(frozen=True)
+class StoredMedia:
+    """Mídia gravada no store: hash do conteúdo, caminho local e tamanho em bytes"""
+    sha256: str
+    path: str
+    size: int
+
+class MediaStore:
+    """Store de arquivos imutáveis: o nome é o hash do conteúdo, então cópias iguais se deduplicam"""
+
+    def __init__(self, root: str = 'uploads/media'):
+        self.root = root
+
+    def configure(self, root: str):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def path_for(self, sha256: str, extension: str) -> str:
+        extension = extension.lower().lstrip('.')
+        filename = f"{sha256}.{extension}" if extension else sha256
+        return os.path.join(self.root, sha256[:2], filename)
+
+    def has(self, path: Optional[str]) -> bool:
+        return bool(path) and os.path.isfile(path)
+
+    def store_file(self, source_path: str, extension: str) -> StoredMedia:
+        """Copia um arquivo local para o store (calcula o hash durante a cópia)"""
+        with open(source_path, 'rb') as source:
+            return self.store_stream(source, extension)
+
+    def store_bytes(self, data: bytes, extension: str) -> StoredMedia:
+        """Grava conteúdo já em memória (ex.: arquivo baixado do Telegram)"""
+        sha256 = hashlib.sha256(data).hexdigest()
+        path = self.path_for(sha256, extension)
+        if not self.has(path):
+            self._write_atomic(path, lambda out: out.write(data))
+        return StoredMedia(sha256, path, len(data))
+
+    def store_stream(self, stream, extension: str, max_size: Optional[int] = None) -> StoredMedia:
+        """
+        Grava um stream no store em uma única passada, calculando o hash ao mesmo tempo
+        (memória limitada a um bloco; o arquivo temporário já é o destino final, só renomeado)
+
+        Raises:
+            MediaRejected: se o stream estiver vazio ou passar de `max_size` bytes
+        """
+        digest = hashlib.sha256()
+        size = 0
+        os.makedirs(self.root, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.root, prefix='.incoming_')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if max_size is not None and size > max_size:
+                        raise MediaRejected(f'Arquivo muito grande. Máximo: {max_size // (1024 * 1024)}MB')
+                    digest.update(chunk)
+                    out.write(chunk)
+
+            if size == 0:
+                raise MediaRejected('Arquivo está vazio')
+
+            sha256 = digest.hexdigest()
+            path = self.path_for(sha256, extension)
+            if self.has(path):
+                # Conteúdo já armazenado: descarta a cópia recebida
+                os.unlink(temp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(temp_path, path)
+                logger.info(f"💾 Mídia armazenada: {path} ({size} bytes)")
+            return StoredMedia(sha256, path, size)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+    def _write_atomic(self, path: str, write):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.incoming_')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                write(out)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+    @staticmethod
+    def sha_of(path: Optional[str]) -> Optional[str]:
+        """Hash do conteúdo a partir do caminho no store (None para arquivos fora do store)"""
+        if not path:
+            return None
+        match = SHA256_NAME.match(os.path.basename(path))
+        return match.group(1) if match else None
+
+    # file_ids já obtidos para cada conteúdo (um por bot: file_ids não valem entre bots)
+
+    def lookup_file_id(self, sha256: str, bot_id: int) -> Optional[str]:
+        return db.session.query(MediaAsset.file_id).filter_by(sha256=sha256, bot_id=bot_id).scalar()
+
+    def remember_file_id(self, sha256: str, bot_id: int, media_type: str, file_id: str):
+        """Registra o file_id do conteúdo para o bot (sem commit: entra na transação de quem chama)"""
+        asset = MediaAsset.query.filter_by(sha256=sha256, bot_id=bot_id).first()
+        if asset:
+            asset.file_id = file_id
+            asset.media_type = media_type
+        else:
+            db.session.add(MediaAsset(sha256=sha256, bot_id=bot_id, media_type=media_type, file_id=file_id))
+
+    def forget_file_id(self, sha256: str, bot_id: int, file_id: str):
+        """Remove um file_id que o Telegram deixou de aceitar (sem commit)"""
+        MediaAsset.query.filter_by(sha256=sha256, bot_id=bot_id, file_id=file_id).delete(synchronize_session=False)
+
+    @staticmethod
+    def extension_of(path_or_name: Optional[str]) -> str:
+        if not path_or_name or '.' not in os.path.basename(path_or_name):
+            return ''
+        return path_or_name.rsplit('.', 1)[1].lower()
+
+# Instância global do store
+media_store = MediaStore()
@@ -0,0 +1,130 @@
+"""
+Arquivamento dos pagamentos encerrados
+Pagamentos pagos, expirados ou com falha há mais de PAYMENT_ARCHIVE_AFTER_DAYS saem de
+payments para payments_history em lotes, em uma thread fora do loop dos bots, mantendo
+a tabela quente pequena (só o que ainda pode mudar de status)
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+from flask import current_app
+from sqlalchemy import and_, case, exists, literal, or_, select
+from ..database.models import db
+from ..models.fulfillment import FulfillmentOutbox
+from ..models.payment import Payment, PAID_STATUSES
+from ..models.payment_history import PaymentHistory
+from ..models.payment_qr_code import PaymentQRCode
+from .bot_runtime import bot_runtime
+from ..utils.logger import logger
+
+# Status que não mudam mais (pendentes entram só depois de vencidos)
+ARCHIVE_STATUSES = PAID_STATUSES + ('expired', 'failed')
+# Liberações já resolvidas: o item do outbox sai junto com o pagamento
+OUTBOX_FINISHED = ('done', 'failed')
+
+def archive_batch(engine, cutoff: datetime, limit: int) -> int:
+    """
+    Move até `limit` pagamentos encerrados criados antes de `cutoff` para payments_history
+    (uma transação por lote; executado fora do loop)
+
+    Returns:
+        Quantidade de pagamentos arquivados
+    """
+    payments = Payment.__table__
+    history = PaymentHistory.__table__
+    outbox = FulfillmentOutbox.__table__
+    qr_codes = PaymentQRCode.__table__
+    columns = [column.name for column in payments.columns]
+
+    with engine.begin() as conn:
+        ids = [row[0] for row in conn.execute(
+            select([payments.c.id]).where(and_(
+                payments.c.created_at < cutoff,
+                or_(
+                    payments.c.status.in_(ARCHIVE_STATUSES),
+                    and_(payments.c.status == 'pending', payments.c.expires_at < cutoff)
+                ),
+                # Liberação ainda em andamento mantém o pagamento na tabela quente
+                ~exists().where(and_(
+                    outbox.c.payment_id == payments.c.id,
+                    outbox.c.status.notin_(OUTBOX_FINISHED)
+                ))
+            )).order_by(payments.c.id).limit(limit).with_for_update(skip_locked=True)
+        )]
+        if not ids:
+            return 0
+
+        # Pendentes vencidos vão para o histórico como 'expired'
+        values = [
+            case([(payments.c.status == 'pending', 'expired')], else_=payments.c.status) if name == 'status'
+            else payments.c[name]
+            for name in columns
+        ]
+        conn.execute(history.insert().from_select(
+            columns + ['archived_at'],
+            select(values + [literal(datetime.utcnow(), db.DateTime)]).where(payments.c.id.in_(ids))
+        ))
+        conn.execute(outbox.delete().where(outbox.c.payment_id.in_(ids)))
+        conn.execute(qr_codes.delete().where(qr_codes.c.payment_id.in_(ids)))
+        conn.execute(payments.delete().where(payments.c.id.in_(ids)))
+    return len(ids)
+
+class PaymentArchiver:
+    """Arquiva periodicamente os pagamentos encerrados (a cada PAYMENT_ARCHIVE_INTERVAL segundos)"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {'runs': 0, 'archived': 0, 'errors': 0, 'last_run': None}
+
+    def start(self):
+        """Agenda o arquivamento no loop compartilhado (thread-safe)"""
+        bot_runtime.submit(self._run())
+
+    async def stop(self):
+        """Encerra o arquivamento (chamar de dentro do loop)"""
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _run(self):
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.current_task()
+        interval = current_app.config['PAYMENT_ARCHIVE_INTERVAL']
+        while True:
+            await asyncio.sleep(interval)
+            await self.archive()
+
+    async def archive(self) -> int:
+        """Arquiva em lotes até não restar pagamento elegível"""
+        config = current_app.config
+        cutoff = datetime.utcnow() - timedelta(days=config['PAYMENT_ARCHIVE_AFTER_DAYS'])
+        batch_size = config['PAYMENT_ARCHIVE_BATCH_SIZE']
+        engine = db.engine
+        loop = asyncio.get_running_loop()
+
+        total = 0
+        try:
+            while True:
+                archived = await loop.run_in_executor(None, archive_batch, engine, cutoff, batch_size)
+                total += archived
+                if archived < batch_size:
+                    break
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.warning(f"⚠️  Erro ao arquivar pagamentos: {e}")
+
+        self.stats['runs'] += 1
+        self.stats['archived'] += total
+        self.stats['last_run'] = datetime.utcnow().isoformat()
+        if total:
+            logger.info(f"🗄️  {total} pagamentos encerrados movidos para o histórico")
+        return total
+
+    def get_stats(self) -> dict:
+        return dict(self.stats)
+
+# Instância global do arquivador
+payment_archiver = PaymentArchiver()
@@ -0,0 +1,254 @@
+"""
+Reconciliação de pagamentos PIX pendentes em segundo plano
+Mantém os pagamentos pendentes em um heap ordenado pela próxima verificação,
+consulta a PushinPay em lotes com backoff exponencial, expira os vencidos e
+libera o acesso do cliente assim que o pagamento é confirmado
+"""
+
+import asyncio
+import heapq
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from flask import current_app
+from ..models.payment import Payment
+from ..database.models import db
+from .bot_config_cache import bot_config_cache
+from .fulfillment_service import confirm_payment
+from .pushinpay_client import pushinpay_client
+from .telegram_bot_manager import bot_manager
+from ..utils.logger import logger
+
+# Status da PushinPay que encerram a cobrança sem pagamento
+PUSHINPAY_FAILED_STATUSES = {'canceled', 'cancelled', 'expired', 'failed'}
+
+class TrackedPayment:
+    """Estado de reconciliação de um pagamento pendente"""
+    __slots__ = ('payment_id', 'bot_id', 'pix_code', 'expires_at', 'attempts', 'next_check', 'last_checked', 'inflight')
+
+    def __init__(self, payment: Payment):
+        self.payment_id = payment.id
+        self.bot_id = payment.bot_id
+        self.pix_code = payment.pix_code
+        self.expires_at = payment.expires_at
+        self.attempts = 0
+        self.next_check = 0.0  # time.monotonic() da próxima verificação
+        self.last_checked: Optional[float] = None
+        self.inflight: Optional[asyncio.Future] = None
+
+class PaymentReconciler:
+    """Agendador de verificação dos pagamentos pendentes dos bots hospedados neste processo"""
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int]] = []  # (próxima verificação, payment_id)
+        self._entries: Dict[int, TrackedPayment] = {}  # payment_id -> estado
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Agenda o reconciliador no loop compartilhado (thread-safe)"""
+        from .bot_runtime import bot_runtime
+        bot_runtime.submit(self._run())
+
+    async def stop(self):
+        """Encerra o reconciliador (chamar de dentro do loop)"""
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    def track(self, payment: Payment):
+        """Passa a reconciliar um pagamento pendente (chamar de dentro do loop)"""
+        if payment.status != 'pending' or payment.id in self._entries:
+            return
+        entry = self._entries[payment.id] = TrackedPayment(payment)
+        self._schedule(entry, current_app.config['PAYMENT_RECONCILE_INITIAL_DELAY'])
+
+    @property
+    def tracked_count(self) -> int:
+        """Pagamentos pendentes acompanhados neste processo"""
+        return len(self._entries)
+
+    def untrack(self, payment_id: int):
+        """Para de reconciliar o pagamento (as entradas no heap ficam obsoletas e são ignoradas)"""
+        self._entries.pop(payment_id, None)
+
+    def load_pending(self) -> int:
+        """Carrega do banco os pagamentos pendentes dos bots hospedados neste processo"""
+        pending = Payment.query.filter(
+            Payment.status == 'pending',
+            (Payment.expires_at.is_(None)) | (Payment.expires_at > datetime.utcnow())
+        ).all()
+
+        loaded = 0
+        for payment in pending:
+            if bot_manager.owns_bot(payment.bot_id) and payment.id not in self._entries:
+                self.track(payment)
+                loaded += 1
+
+        if loaded:
+            logger.info(f"💳 {loaded} pagamentos pendentes em reconciliação")
+        return loaded
+
+    def _schedule(self, entry: TrackedPayment, delay: float):
+        entry.next_check = time.monotonic() + delay
+        heapq.heappush(self._heap, (entry.next_check, entry.payment_id))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _backoff(self, entry: TrackedPayment) -> float:
+        """Intervalo até a próxima verificação: dobra a cada tentativa até o máximo"""
+        config = current_app.config
+        delay = config['PAYMENT_RECONCILE_INITIAL_DELAY'] * (2 ** entry.attempts)
+        return min(delay, config['PAYMENT_RECONCILE_MAX_DELAY'])
+
+    async def _run(self):
+        """Laço principal: verifica em lote os pagamentos cuja hora chegou"""
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.current_task()
+        self._wakeup = asyncio.Event()
+        self.load_pending()
+        logger.info("💳 Reconciliação de pagamentos iniciada")
+
+        try:
+            while True:
+                due = self._pop_due(current_app.config['PAYMENT_RECONCILE_BATCH_SIZE'])
+                if due:
+                    await asyncio.gather(*(self._check(entry) for entry in due), return_exceptions=True)
+                    continue
+
+                timeout = max(0.0, self._heap[0][0] - time.monotonic()) if self._heap else None
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._wakeup = None
+            logger.info("⏹️  Reconciliação de pagamentos encerrada")
+
+    def _pop_due(self, limit: int) -> List[TrackedPayment]:
+        """Retira do heap até `limit` pagamentos com verificação vencida"""
+        now = time.monotonic()
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < limit:
+            next_check, payment_id = heapq.heappop(self._heap)
+            entry = self._entries.get(payment_id)
+            # Entrada obsoleta: pagamento removido ou reagendado depois de entrar no heap
+            if entry is None or entry.next_check != next_check:
+                continue
+            due.append(entry)
+        return due
+
+    async def check_now(self, payment_id: int) -> str:
+        """
+        Verificação pedida pelo cliente (botão "Verificar Pagamento")
+        Compartilha a consulta em andamento e não consulta a PushinPay de novo
+        antes de PAYMENT_VERIFY_MIN_INTERVAL
+
+        Returns:
+            Status resultante: 'approved', 'pending', 'expired', 'failed' ou 'not_found'
+        """
+        entry = self._entries.get(payment_id)
+        if entry is None:
+            payment = Payment.query.populate_existing().get(payment_id)
+            if not payment:
+                return 'not_found'
+            if payment.status != 'pending':
+                return payment.status
+            self.track(payment)
+            entry = self._entries[payment_id]
+
+        if entry.inflight is None and entry.last_checked is not None:
+            if time.monotonic() - entry.last_checked < current_app.config['PAYMENT_VERIFY_MIN_INTERVAL']:
+                return 'pending'
+
+        return await self._check(entry)
+
+    async def _check(self, entry: TrackedPayment) -> str:
+        """Executa (ou aguarda a já em andamento) verificação do pagamento"""
+        if entry.inflight is None:
+            entry.inflight = asyncio.ensure_future(self._verify(entry))
+            entry.inflight.add_done_callback(lambda _: setattr(entry, 'inflight', None))
+        return await asyncio.shield(entry.inflight)
+
+    async def _verify(self, entry: TrackedPayment) -> str:
+        """Consulta a PushinPay e aplica o resultado (aprovação, expiração ou novo agendamento)"""
+        try:
+            if not bot_manager.owns_bot(entry.bot_id):
+                # Bot passou para outro worker, que reconcilia os pagamentos dele
+                self.untrack(entry.payment_id)
+                return 'pending'
+
+            if entry.expires_at and datetime.utcnow() >= entry.expires_at:
+                return self._close(entry, 'expired')
+
+            bot_config = bot_config_cache.get(entry.bot_id)
+            if bot_config is None or not bot_config.pushinpay_token:
+                # Bot ainda iniciando (ou sem token PushinPay): tenta mais tarde
+                self._reschedule(entry)
+                return 'pending'
+
+            entry.last_checked = time.monotonic()
+            status = await pushinpay_client.check_payment_status(bot_config.pushinpay_token, entry.pix_code)
+
+            if status.paid:
+                return await self._approve(entry)
+
+            if status.success and status.status in PUSHINPAY_FAILED_STATUSES:
+                return self._close(entry, 'failed')
+
+            if not status.success:
+                logger.warning(f"⚠️  Falha ao consultar pagamento {entry.payment_id}: {status.error}")
+
+            self._reschedule(entry)
+            return 'pending'
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao reconciliar pagamento {entry.payment_id}: {e}")
+            db.session.rollback()
+            self._reschedule(entry)
+            return 'pending'
+
+    def _reschedule(self, entry: TrackedPayment):
+        if entry.payment_id not in self._entries:
+            return
+        delay = self._backoff(entry)
+        entry.attempts += 1
+        self._schedule(entry, delay)
+
+    def _close(self, entry: TrackedPayment, status: str) -> str:
+        """Encerra um pagamento pendente sem aprovação ('expired' ou 'failed')"""
+        self.untrack(entry.payment_id)
+
+        payment = Payment.query.populate_existing().get(entry.payment_id)
+        if payment and payment.status == 'pending':
+            payment.status = status
+            db.session.commit()
+            logger.info(f"⌛ Pagamento {payment.pix_code} encerrado como '{status}'")
+            return status
+        return payment.status if payment else 'not_found'
+
+    async def _approve(self, entry: TrackedPayment) -> str:
+        """Aprova o pagamento (a liberação do acesso fica com o worker do outbox)"""
+        self.untrack(entry.payment_id)
+
+        if confirm_payment(entry.payment_id, 'approved'):
+            logger.info(f"✅ Pagamento {entry.pix_code} confirmado pela reconciliação")
+            return 'approved'
+
+        # Já confirmado por outro caminho (webhook da PushinPay)
+        payment = Payment.query.populate_existing().get(entry.payment_id)
+        return payment.status if payment else 'not_found'
+
+    def get_stats(self) -> dict:
+        """Resumo do estado da reconciliação"""
+        return {
+            'tracked': len(self._entries),
+            'heap_size': len(self._heap),
+            'running': self._task is not None and not self._task.done()
+        }
+
+# Instância global do reconciliador
+payment_reconciler = PaymentReconciler()
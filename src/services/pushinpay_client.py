@@ -0,0 +1,204 @@
+"""
+Cliente assíncrono da API PushinPay usado pelos handlers dos bots
+Roda no loop compartilhado: sessão HTTP com keep-alive, prazo por chamada e
+concorrência limitada por token de lojista
+"""
+
+import asyncio
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+import httpx
+from flask import current_app
+from .pushinpay_service import pushinpay_service
+from ..utils.logger import logger
+from ..utils.metrics import instrument_call
+
+@dataclass
+class PixCharge:
+    """Resultado da criação de uma cobrança PIX"""
+    success: bool
+    pix_code: Optional[str] = None
+    amount: float = 0.0
+    qr_code: str = ''  # imagem base64 (data:image/png;base64,...)
+    pix_copy_paste: str = ''  # código PIX copia e cola (EMV)
+    payment_id: Optional[str] = None
+    expires_at: Optional[datetime] = None
+    status: Optional[str] = None
+    mock: bool = False
+    error: Optional[str] = None
+    data: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_api(cls, api_data: dict, amount: float) -> 'PixCharge':
+        return cls(
+            success=True,
+            pix_code=api_data.get('id', str(uuid.uuid4())[:8]),
+            amount=amount,
+            qr_code=api_data.get('qr_code_base64', ''),
+            pix_copy_paste=api_data.get('qr_code', ''),
+            payment_id=api_data.get('id'),
+            expires_at=datetime.utcnow() + timedelta(hours=24),
+            status=api_data.get('status', 'created'),
+            data=api_data
+        )
+
+    @classmethod
+    def mock_charge(cls, amount: float, description: str) -> 'PixCharge':
+        """PIX simulado (mesmo formato do serviço síncrono) para desenvolvimento"""
+        mock = pushinpay_service._create_mock_pix_payment(amount, description)
+        return cls(
+            success=True,
+            pix_code=mock['pix_code'],
+            amount=amount,
+            qr_code=mock['qr_code'],
+            pix_copy_paste=mock['pix_copy_paste'],
+            payment_id=mock['payment_id'],
+            expires_at=mock['expires_at'],
+            status=mock['status'],
+            mock=True,
+            data=mock['pushinpay_data']
+        )
+
+@dataclass
+class PaymentStatus:
+    """Resultado da consulta de status de um pagamento"""
+    success: bool
+    status: Optional[str] = None
+    paid: bool = False
+    error: Optional[str] = None
+    data: dict = field(default_factory=dict)
+
+class AsyncPushinPayClient:
+    """Cliente PushinPay não bloqueante (uma instância por processo, usada no loop compartilhado)"""
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}  # token -> limite de chamadas simultâneas
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Cria a sessão HTTP com pool de conexões na primeira chamada (dentro do loop)"""
+        if self._client is None or self._client.is_closed:
+            config = current_app.config
+            self._client = httpx.AsyncClient(
+                base_url=config['PUSHINPAY_API_URL'],
+                timeout=httpx.Timeout(config['PUSHINPAY_TIMEOUT']),
+                limits=httpx.Limits(
+                    max_connections=config['PUSHINPAY_MAX_CONNECTIONS'],
+                    max_keepalive_connections=config['PUSHINPAY_MAX_CONNECTIONS'],
+                    keepalive_expiry=60
+                ),
+                headers={'Content-Type': 'application/json'}
+            )
+        return self._client
+
+    def _semaphore_for(self, token: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(token)
+        if semaphore is None:
+            semaphore = self._semaphores[token] = asyncio.Semaphore(
+                current_app.config['PUSHINPAY_MAX_CONCURRENCY_PER_TOKEN']
+            )
+        return semaphore
+
+    async def _request(self, token: str, method: str, path: str, **kwargs) -> httpx.Response:
+        """Executa a requisição respeitando o limite do token e o prazo total da chamada"""
+        client = self._get_client()
+        deadline = current_app.config['PUSHINPAY_TIMEOUT']
+        async with self._semaphore_for(token):
+            return await asyncio.wait_for(
+                client.request(method, path, headers={'Authorization': token}, **kwargs),
+                deadline
+            )
+
+    @instrument_call('pushinpay', 'create_pix')
+    async def create_pix_payment(self, user_pushinpay_token: str, amount: float,
+                                 telegram_user_id: str = None, description: str = None) -> PixCharge:
+        """
+        Cria um pagamento PIX via PushinPay API para cliente final
+
+        Args:
+            user_pushinpay_token: Token Bearer da PushinPay do dono do bot
+            amount: Valor do PIX
+            telegram_user_id: ID do usuário do Telegram
+            description: Descrição do pagamento
+        """
+        if not description:
+            description = "Pagamento via Bot Telegram"
+
+        payload = {
+            "value": int(round(amount * 100)),  # Valor total em centavos
+            "webhook_url": current_app.config['PUSHINPAY_WEBHOOK_URL'],
+            "description": description,
+            "split_rules": [
+                {
+                    "value": 70,  # 0,7cents para a plataforma
+                    "account_id": pushinpay_service.split_account
+                }
+            ]
+        }
+
+        try:
+            response = await self._request(user_pushinpay_token, 'POST', '/pix/cashIn', json=payload)
+
+            if response.status_code in (200, 201):
+                try:
+                    return PixCharge.from_api(response.json(), amount)
+                except ValueError as json_error:
+                    return PixCharge(success=False, amount=amount, error=f'Resposta inválida da API: {json_error}')
+
+            logger.error(f"💥 PushinPay respondeu {response.status_code} ao criar PIX: {response.text[:500]}")
+            error = f'Erro na API PushinPay: {response.status_code}'
+
+        except (asyncio.TimeoutError, httpx.TimeoutException):
+            logger.error(f"⏱️  PushinPay não respondeu em {current_app.config['PUSHINPAY_TIMEOUT']}s ao criar PIX")
+            error = 'Tempo esgotado ao gerar PIX'
+
+        except httpx.HTTPError as e:
+            logger.error(f"🌐 Erro de conexão com PushinPay: {e}")
+            error = f'Erro de conexão: {e}'
+
+        if current_app.config['PUSHINPAY_MOCK_ON_ERROR']:
+            # Para desenvolvimento, usa PIX simulado em caso de erro
+            logger.warning("🔄 Usando PIX simulado devido a erro na PushinPay")
+            return PixCharge.mock_charge(amount, description)
+
+        return PixCharge(success=False, amount=amount, error=error)
+
+    @instrument_call('pushinpay', 'check_status')
+    async def check_payment_status(self, user_pushinpay_token: str, payment_id: str) -> PaymentStatus:
+        """
+        Verifica status de um pagamento na PushinPay
+
+        Args:
+            user_pushinpay_token: Token Bearer da PushinPay do dono do bot
+            payment_id: ID do pagamento na PushinPay
+        """
+        try:
+            response = await self._request(user_pushinpay_token, 'GET', f'/pix/transactions/{payment_id}')
+
+            if response.status_code == 200:
+                data = response.json()
+                return PaymentStatus(
+                    success=True,
+                    status=data.get('status', 'pending'),
+                    paid=data.get('status') == 'paid',
+                    data=data
+                )
+
+            return PaymentStatus(success=False, error=f'Erro ao consultar pagamento: {response.status_code}')
+
+        except (asyncio.TimeoutError, httpx.TimeoutException):
+            return PaymentStatus(success=False, error='Tempo esgotado ao consultar pagamento')
+
+        except (httpx.HTTPError, ValueError) as e:
+            return PaymentStatus(success=False, error=f'Erro ao consultar pagamento: {e}')
+
+    async def aclose(self):
+        """Fecha a sessão HTTP (chamado no encerramento do loop)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+# Instância global do cliente
+pushinpay_client = AsyncPushinPayClient()
@@ -2,6 +2,7 @@ import requests
 import uuid
 from datetime import datetime, timedelta
 from decimal import Decimal
+from ..utils.metrics import instrument_call
 
 class PushinPayService:
     """Serviço             response = requests.get(
@@ -20,6 +21,7 @@ class PushinPayService:
         self.api_base_url = "https://api.pushinpay.com.br/api"
         self.split_account = "9E4B259F-DB6D-419E-8D78-7216BF642856"  # Conta para receber comissão
     
+    @instrument_call('pushinpay', 'create_pix_sync')
     def create_pix_payment(self, user_pushinpay_token: str, amount: float, telegram_user_id: str = None, description: str = None) -> dict:
         """
         Cria um pagamento PIX via PushinPay API para cliente final
@@ -184,6 +186,7 @@ class PushinPayService:
             }
         }
     
+    @instrument_call('pushinpay', 'check_status_sync')
     def check_payment_status(self, user_pushinpay_token: str, payment_id: str) -> dict:
         """
         Verifica status de um pagamento na PushinPay
@@ -227,6 +230,7 @@ class PushinPayService:
                 'error': f'Erro ao consultar pagamento: {str(e)}'
             }
     
+    @instrument_call('pushinpay', 'validate_token')
     def validate_pushinpay_token(self, token: str) -> dict:
         """
         Valida se o token da PushinPay é válido
@@ -0,0 +1,212 @@
+"""
+Renderização dos QR Codes PIX fora do loop dos bots
+A imagem da PushinPay recebe a margem branca em uma thread do pool; se ela faltar ou for
+pequena demais para leitura (ex.: PIX simulado), o QR é gerado localmente a partir do código
+EMV (copia e cola). O PNG pronto fica em cache pelo pagamento e, depois do primeiro envio,
+a mesma imagem é reenviada pelo file_id do Telegram.
+O PNG também fica na tabela payment_qr_codes (fora de payments) até o PIX expirar; sem ele,
+o QR é gerado de novo a partir do EMV guardado em Payment.pix_key
+"""
+
+import asyncio
+import base64
+import hashlib
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from io import BytesIO
+from typing import Optional, Tuple
+import qrcode
+from flask import current_app
+from PIL import Image, ImageOps
+from sqlalchemy.exc import IntegrityError
+from telegram.error import BadRequest
+from ..database.models import db
+from ..models.payment_qr_code import PaymentQRCode
+from ..utils.logger import logger
+from ..utils.metrics import metrics
+
+QR_PADDING = 20  # margem branca (px) ao redor da imagem da PushinPay
+MIN_QR_SIZE = 100  # imagens menores que isso não são legíveis: gera a partir do EMV
+QR_BOX_SIZE = 8  # pixels por módulo no QR gerado localmente (a borda de 4 módulos já é a margem)
+QR_STORE_TTL = timedelta(hours=24)  # validade no store quando o pagamento não tem expires_at
+PURGE_INTERVAL = 3600  # segundos entre limpezas dos QR Codes expirados
+
+QR_RENDER_LATENCY = metrics.histogram(
+    'botmanager_qr_render_duration_seconds', 'Renderização do QR Code PIX (thread pool)', ('source',))
+
+def pad_qr_image(data_uri: str) -> Optional[bytes]:
+    """Decodifica a imagem base64 da PushinPay e aplica a margem branca (None se inválida ou pequena)"""
+    base64_data = data_uri.split(',', 1)[1] if ',' in data_uri else data_uri
+    image = Image.open(BytesIO(base64.b64decode(base64_data)))
+    if min(image.size) < MIN_QR_SIZE:
+        return None
+    padded = ImageOps.expand(image, border=QR_PADDING, fill='white')
+    output = BytesIO()
+    padded.save(output, format='PNG')
+    return output.getvalue()
+
+def generate_qr_png(emv: str) -> bytes:
+    """Gera o QR Code a partir do código PIX copia e cola"""
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, box_size=QR_BOX_SIZE, border=4)
+    qr.add_data(emv)
+    qr.make(fit=True)
+    output = BytesIO()
+    qr.make_image(fill_color='black', back_color='white').save(output, format='PNG')
+    return output.getvalue()
+
+def render_qr_png(qr_image: Optional[str], emv: Optional[str]) -> Tuple[Optional[bytes], str]:
+    """
+    Produz o PNG do QR (executado no pool de threads)
+    Padding da imagem da PushinPay é ~15x mais rápido que gerar o QR, então ela tem preferência
+
+    Returns:
+        (png, origem) com origem 'provider', 'local' ou 'none'
+    """
+    if qr_image:
+        try:
+            png = pad_qr_image(qr_image)
+            if png:
+                return png, 'provider'
+        except Exception as e:
+            logger.warning(f"⚠️  Imagem do QR Code inválida, gerando a partir do EMV: {e}")
+    if emv:
+        return generate_qr_png(emv), 'local'
+    return None, 'none'
+
+def load_or_render(engine, payment_id: int, emv: Optional[str], qr_image: Optional[str],
+                   expires_at: Optional[datetime]) -> Tuple[Optional[bytes], str]:
+    """
+    PNG do pagamento: lido do store ou renderizado e gravado nele (executado no pool de threads)
+
+    Returns:
+        (png, origem) com origem 'store', 'provider', 'local' ou 'none'
+    """
+    table = PaymentQRCode.__table__
+    try:
+        with engine.connect() as conn:
+            png = conn.execute(
+                db.select([table.c.png]).where(table.c.payment_id == payment_id)
+            ).scalar()
+        if png is not None:
+            return bytes(png), 'store'
+    except Exception as e:
+        logger.warning(f"⚠️  Erro ao ler QR Code do pagamento {payment_id}: {e}")
+
+    png, source = render_qr_png(qr_image, emv)
+    if png is None:
+        return None, source
+
+    try:
+        with engine.begin() as conn:
+            conn.execute(table.insert().values(
+                payment_id=payment_id,
+                png=png,
+                source=source,
+                created_at=datetime.utcnow(),
+                expires_at=expires_at or datetime.utcnow() + QR_STORE_TTL
+            ))
+    except IntegrityError:
+        # Outra thread/processo gravou o mesmo pagamento primeiro
+        pass
+    except Exception as e:
+        logger.warning(f"⚠️  Erro ao guardar QR Code do pagamento {payment_id}: {e}")
+    return png, source
+
+def purge_expired(engine) -> int:
+    """Remove do store os QR Codes de pagamentos já expirados"""
+    table = PaymentQRCode.__table__
+    try:
+        with engine.begin() as conn:
+            deleted = conn.execute(table.delete().where(table.c.expires_at < datetime.utcnow())).rowcount
+    except Exception as e:
+        logger.warning(f"⚠️  Erro ao limpar QR Codes expirados: {e}")
+        return 0
+    if deleted:
+        logger.info(f"🧹 {deleted} QR Codes expirados removidos")
+    return deleted
+
+class QRRenderer:
+    """Pool de renderização, cache de PNG por pagamento e file_ids já enviados por bot"""
+
+    def __init__(self):
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._png_cache: 'OrderedDict[int, bytes]' = OrderedDict()  # payment_id -> PNG
+        self._file_ids: 'OrderedDict[Tuple[int, str], str]' = OrderedDict()  # (bot_id, sha256) -> file_id
+        self._last_purge = 0.0
+        self.stats = {'cache_hits': 0, 'store_hits': 0, 'rendered': 0, 'generated': 0, 'file_id_reused': 0}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=current_app.config['QR_RENDER_WORKERS'],
+                thread_name_prefix='qr-render'
+            )
+        return self._executor
+
+    def _remember(self, cache: OrderedDict, key, value):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > current_app.config['QR_CACHE_SIZE']:
+            cache.popitem(last=False)
+
+    async def render(self, payment_id: int, emv: Optional[str], qr_image: Optional[str] = None,
+                     expires_at: Optional[datetime] = None) -> Optional[bytes]:
+        """
+        PNG do QR do pagamento (cache, store ou renderização no pool de threads; o loop só aguarda)
+        Sem `qr_image` (ex.: reenvio de um pagamento antigo) o QR é gerado a partir do EMV
+        """
+        png = self._png_cache.get(payment_id)
+        if png is not None:
+            self._png_cache.move_to_end(payment_id)
+            self.stats['cache_hits'] += 1
+            return png
+
+        loop = asyncio.get_running_loop()
+        engine = db.engine
+        started = time.perf_counter()
+        png, source = await loop.run_in_executor(
+            self._get_executor(), load_or_render, engine, payment_id, emv, qr_image, expires_at
+        )
+        QR_RENDER_LATENCY.observe(time.perf_counter() - started, source=source)
+        self._maybe_purge(loop, engine)
+        if png is None:
+            return None
+
+        self.stats[{'store': 'store_hits', 'provider': 'rendered'}.get(source, 'generated')] += 1
+        self._remember(self._png_cache, payment_id, png)
+        return png
+
+    def _maybe_purge(self, loop: asyncio.AbstractEventLoop, engine):
+        """Agenda a limpeza do store no pool (no máximo uma vez por PURGE_INTERVAL)"""
+        if time.monotonic() - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = time.monotonic()
+        loop.run_in_executor(self._get_executor(), purge_expired, engine)
+
+    async def send_photo(self, bot, bot_id: int, chat_id: int, png: bytes, **kwargs):
+        """Envia o QR reaproveitando o file_id quando o bot já enviou a mesma imagem"""
+        digest = hashlib.sha256(png).hexdigest()
+        file_id = self._file_ids.get((bot_id, digest))
+        if file_id:
+            try:
+                message = await bot.send_photo(chat_id=chat_id, photo=file_id, **kwargs)
+                self.stats['file_id_reused'] += 1
+                return message
+            except BadRequest:
+                self._file_ids.pop((bot_id, digest), None)
+
+        message = await bot.send_photo(chat_id=chat_id, photo=png, filename='pix.png', **kwargs)
+        if message.photo:
+            self._remember(self._file_ids, (bot_id, digest), message.photo[-1].file_id)
+        return message
+
+    def shutdown(self):
+        """Encerra o pool de threads"""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+# Instância global do renderizador
+qr_renderer = QRRenderer()
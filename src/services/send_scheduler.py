@@ -0,0 +1,223 @@
+"""
+Agendador de envios para a API do Telegram (um por bot)
+Plugado como rate limiter da Application: todo request do bot passa por aqui,
+respeitando os limites do Telegram (global por bot, por chat privado e por grupo),
+com classes de prioridade e nova tentativa automática em caso de RetryAfter (429):
+o 429 de um envio pausa só o chat de destino; sem chat, pausa o bot inteiro
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Tuple, Union
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+from ..utils.logger import logger
+from ..utils.metrics import TELEGRAM_LATENCY, TELEGRAM_WAIT, TELEGRAM_ERRORS
+
+# Classes de prioridade (menor sai primeiro), via rate_limit_args={'priority': ...}
+PRIORITY_PAYMENT = 0  # confirmação de pagamento e convite VIP
+PRIORITY_DEFAULT = 1  # respostas aos comandos e botões
+PRIORITY_LOG = 2  # notificações para o grupo de logs
+
+# Endpoints que entregam mensagens e contam nos limites do Telegram
+MESSAGE_ENDPOINT_PREFIXES = ('send', 'copy', 'forward', 'edit')
+
+IDLE_BUCKET_SECONDS = 300  # remove baldes de chats parados há mais tempo que isso
+
+class TokenBucket:
+    """Balde de tokens: `rate` tokens por segundo, acumulando até `capacity`"""
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated_at', 'paused_until', 'lock')
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0  # RetryAfter recebido para este chat
+        self.lock: Optional[asyncio.Lock] = None  # fila FIFO de envios ao mesmo chat
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self) -> float:
+        """Segundos até haver um token disponível e a pausa acabar (0 se já puder enviar)"""
+        self._refill()
+        pause = max(0.0, self.paused_until - self.updated_at)
+        if self.tokens >= 1:
+            return pause
+        return max(pause, (1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def consume(self):
+        self._refill()
+        self.tokens -= 1
+
+class SendScheduler(BaseRateLimiter[Dict[str, Any]]):
+    """Rate limiter de um bot: baldes por chat/grupo, balde global com prioridade e RetryAfter"""
+
+    def __init__(self, global_rate: float = 30, chat_rate: float = 1, chat_burst: float = 3,
+                 group_per_minute: float = 20, group_burst: float = 5, max_retries: int = 3,
+                 bot_id: Optional[int] = None):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_per_minute / 60
+        self.group_burst = group_burst
+        self.max_retries = max_retries
+        self.bot_label = str(bot_id) if bot_id is not None else ''  # label das métricas
+        self.waiting = 0  # requests aguardando a vez (profundidade da fila de envios)
+
+        self._chat_buckets: Dict[str, TokenBucket] = {}
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []  # (prioridade, ordem, future)
+        self._sequence = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._paused_until = 0.0  # pausa global após RetryAfter fora de um chat
+        self._last_cleanup = time.monotonic()
+
+    @classmethod
+    def from_config(cls, config, bot_id: Optional[int] = None) -> 'SendScheduler':
+        return cls(
+            global_rate=config['TELEGRAM_GLOBAL_RATE'],
+            chat_rate=config['TELEGRAM_CHAT_RATE'],
+            chat_burst=config['TELEGRAM_CHAT_BURST'],
+            group_per_minute=config['TELEGRAM_GROUP_RATE_PER_MINUTE'],
+            group_burst=config['TELEGRAM_GROUP_BURST'],
+            max_retries=config['TELEGRAM_SEND_MAX_RETRIES'],
+            bot_id=bot_id
+        )
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        if self._dispatcher is not None and not self._dispatcher.done():
+            self._dispatcher.cancel()
+        for _, _, future in self._waiters:
+            if not future.done():
+                future.cancel()
+        self._waiters.clear()
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Union[bool, Dict[str, Any], List[Dict[str, Any]]]]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[Dict[str, Any]],
+    ) -> Union[bool, Dict[str, Any], List[Dict[str, Any]]]:
+        """Aguarda a vez do request (chat e global) e o executa, repetindo após RetryAfter"""
+        priority = (rate_limit_args or {}).get('priority', PRIORITY_DEFAULT)
+        chat_id = data.get('chat_id')
+        # Só mensagens contam nos limites; getMe, answerCallbackQuery, convites etc. passam direto
+        limited = chat_id is not None and endpoint.startswith(MESSAGE_ENDPOINT_PREFIXES)
+
+        for attempt in range(self.max_retries + 1):
+            queued_at = time.perf_counter()
+            self.waiting += 1
+            try:
+                if limited:
+                    await self._acquire_chat(str(chat_id))
+                    await self._acquire_global(priority)
+                else:
+                    await self._wait_pause()
+            finally:
+                self.waiting -= 1
+
+            started = time.perf_counter()
+            TELEGRAM_WAIT.observe(started - queued_at, bot_id=self.bot_label)
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                TELEGRAM_ERRORS.inc(bot_id=self.bot_label, endpoint=endpoint, error='RetryAfter')
+                if attempt >= self.max_retries:
+                    raise
+                retry_after = float(e.retry_after)
+                logger.warning(f"🐢 Telegram pediu {retry_after:.0f}s de pausa ({endpoint} para {chat_id}), tentando novamente")
+                if limited:
+                    # Limite do chat: os demais chats do bot seguem enviando
+                    self._chat_bucket(str(chat_id)).pause(retry_after)
+                else:
+                    self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            except Exception as e:
+                TELEGRAM_ERRORS.inc(bot_id=self.bot_label, endpoint=endpoint, error=type(e).__name__)
+                raise
+            finally:
+                TELEGRAM_LATENCY.observe(time.perf_counter() - started, bot_id=self.bot_label, endpoint=endpoint)
+
+    async def _wait_pause(self):
+        pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+
+    def _chat_bucket(self, chat_id: str) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            # IDs negativos (ou @canal) são grupos/canais: limite por minuto
+            if chat_id.startswith('-') or chat_id.startswith('@'):
+                bucket = TokenBucket(self.group_rate, self.group_burst)
+            else:
+                bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            bucket.lock = asyncio.Lock()
+            self._chat_buckets[chat_id] = bucket
+            self._cleanup_buckets()
+        return bucket
+
+    def _cleanup_buckets(self):
+        """Descarta baldes de chats sem envios recentes (evita crescer sem limite)"""
+        now = time.monotonic()
+        if now - self._last_cleanup < IDLE_BUCKET_SECONDS:
+            return
+        self._last_cleanup = now
+        for chat_id, bucket in list(self._chat_buckets.items()):
+            if not bucket.lock.locked() and bucket.paused_until <= now and now - bucket.updated_at >= IDLE_BUCKET_SECONDS:
+                del self._chat_buckets[chat_id]
+
+    async def _acquire_chat(self, chat_id: str):
+        """Aguarda um token do chat (envios ao mesmo chat saem em ordem)"""
+        bucket = self._chat_bucket(chat_id)
+        async with bucket.lock:
+            while True:
+                delay = bucket.wait_time()
+                if delay <= 0:
+                    bucket.consume()
+                    return
+                await asyncio.sleep(delay)
+
+    async def _acquire_global(self, priority: int):
+        """Aguarda um token global do bot, atendendo primeiro as prioridades mais altas"""
+        if not self._waiters and self._paused_until <= time.monotonic() and self.global_bucket.wait_time() <= 0:
+            self.global_bucket.consume()
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+        await future
+
+    async def _dispatch(self):
+        """Libera os requests em espera conforme o balde global recarrega"""
+        while self._waiters:
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+                continue
+
+            delay = self.global_bucket.wait_time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                # Quem esperava foi cancelado
+                continue
+            self.global_bucket.consume()
+            future.set_result(None)
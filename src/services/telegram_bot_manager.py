@@ -1,40 +1,243 @@
 import asyncio
+import hashlib
+import hmac
 import logging
+import time
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputMediaPhoto
+from telegram.error import InvalidToken
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes, MessageHandler, filters
+from flask import current_app
 from ..models.bot import TelegramBot
 from ..models.payment import Payment
-from ..models.client import User
-from ..services.pushinpay_service import PushinPayService
+from ..services.pushinpay_client import pushinpay_client
+from ..services.bot_runtime import bot_runtime
+from ..services.bot_config_cache import bot_config_cache, BotConfigSnapshot, WelcomeMedia
+from ..services.media_health import media_health, replace_file_id
+from ..services.heartbeat_registry import heartbeat_registry
+from ..services.analytics import analytics
+from ..services.qr_renderer import qr_renderer
+from ..services.send_scheduler import SendScheduler, PRIORITY_PAYMENT, PRIORITY_LOG
 from ..database.models import db
 from ..utils.logger import logger
+from ..utils.hash_ring import HashRing
+from ..utils.metrics import instrument_handler, record_handler_error
 import json
 import uuid
 
+def webhook_secret(bot_token: str) -> str:
+    """Segredo do webhook do bot (usado na URL e no header X-Telegram-Bot-Api-Secret-Token)"""
+    key = current_app.config['SECRET_KEY'].encode('utf-8')
+    return hmac.new(key, bot_token.encode('utf-8'), hashlib.sha256).hexdigest()[:48]
+
 class TelegramBotManager:
     """Gerenciador de bots Telegram ativos"""
     
     def __init__(self):
         self.active_bots: Dict[str, Application] = {}  # bot_token -> Application
-        self.pushinpay_service = PushinPayService()
+        self.bot_tokens: Dict[int, str] = {}  # bot_id -> bot_token dos bots ativos
+        self._locks: Dict[str, asyncio.Lock] = {}  # bot_token -> Lock (start/stop serializados)
+        
+        # Hospedagem: o processo web não hospeda bots quando eles rodam nos workers do supervisor
+        self.hosting = True
+        self.ring: Optional[HashRing] = None  # anel de hash consistente entre workers
+        self.worker_id: Optional[str] = None
+        
+        self.start_errors: Dict[int, str] = {}  # bot_id -> último erro de inicialização
+        self.last_startup_report: Optional[dict] = None
+        # Limite de inicializações simultâneas (boot, runners e reconciliação) e fim do boot
+        self._startup_semaphore: Optional[asyncio.Semaphore] = None
+        self._startup_done: Optional[asyncio.Event] = None
+    
+    def set_shard(self, ring: Optional[HashRing], worker_id: Optional[str]):
+        """Restringe este processo aos bots atribuídos ao worker no anel"""
+        self.ring = ring
+        self.worker_id = worker_id
+    
+    def owns_bot(self, bot_id: int) -> bool:
+        """Indica se o bot deve rodar neste processo"""
+        if not self.hosting:
+            return False
+        if self.ring is None:
+            return True
+        return self.ring.get_node(bot_id) == self.worker_id
+    
+    async def apply_shard(self, ring: HashRing):
+        """Aplica uma nova composição de workers: para bots que saíram do shard e inicia os novos"""
+        self.ring = ring
+        
+        for bot_id, bot_token in list(self.bot_tokens.items()):
+            if not self.owns_bot(bot_id):
+                logger.info(f"🔀 Bot {bot_id} movido para outro worker, parando localmente")
+                await self.stop_bot(bot_token)
+        
+        await self.start_all_active_bots()
+        
+        # Pagamentos pendentes dos bots que passaram a rodar aqui
+        from .payment_reconciler import payment_reconciler
+        payment_reconciler.load_pending()
+    
+    def _lock_for(self, bot_token: str) -> asyncio.Lock:
+        """Retorna o lock do bot (criado dentro do loop compartilhado)"""
+        lock = self._locks.get(bot_token)
+        if lock is None:
+            lock = self._locks[bot_token] = asyncio.Lock()
+        return lock
+    
+    def submit_start(self, bot_id: int):
+        """Agenda o início de um bot no loop compartilhado (seguro para rotas Flask)"""
+        if not self.owns_bot(bot_id):
+            logger.info(f"Bot {bot_id} será iniciado pelo worker responsável")
+            return None
+        return bot_runtime.submit(self.start_bot_by_id(bot_id))
+    
+    def submit_stop(self, bot_id: int):
+        """Agenda a parada de um bot no loop compartilhado (seguro para rotas Flask)"""
+        return bot_runtime.submit(self.stop_bot_by_id(bot_id))
+    
+    def submit_reload(self, bot_id: int):
+        """Agenda o recarregamento de um bot no loop compartilhado (seguro para rotas Flask)"""
+        return bot_runtime.submit(self.reload_bot(bot_id))
     
-    async def start_bot(self, bot_config: TelegramBot) -> bool:
-        """Inicia um bot Telegram individual"""
+    def get_application(self, bot_id: int) -> Optional[Application]:
+        """Retorna a Application em execução do bot, se houver"""
+        bot_token = self.bot_tokens.get(bot_id)
+        return self.active_bots.get(bot_token) if bot_token else None
+    
+    @property
+    def uses_webhook(self) -> bool:
+        """Indica se os updates chegam via webhook em vez de long polling"""
+        return current_app.config.get('TELEGRAM_UPDATE_MODE') == 'webhook'
+    
+    async def _set_webhook(self, application: Application, bot_config: TelegramBot) -> bool:
+        """Registra o webhook do bot apontando para a rota /tg/<bot_id>/<secret>"""
+        base_url = (current_app.config.get('TELEGRAM_WEBHOOK_BASE_URL') or '').rstrip('/')
+        if not base_url:
+            logger.error("❌ TELEGRAM_WEBHOOK_BASE_URL não configurada para o modo webhook")
+            return False
+        
+        secret = webhook_secret(bot_config.bot_token)
+        try:
+            await application.bot.set_webhook(
+                url=f"{base_url}/tg/{bot_config.id}/{secret}",
+                secret_token=secret,
+                allowed_updates=['message', 'callback_query'],
+                drop_pending_updates=False
+            )
+            logger.info(f"🔗 Webhook registrado para bot {bot_config.bot_username}")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Erro ao registrar webhook do bot {bot_config.bot_username}: {e}")
+            return False
+    
+    async def start_bot_by_id(self, bot_id: int) -> bool:
+        """Carrega o bot do banco e o inicia"""
+        bot_config = TelegramBot.query.populate_existing().get(bot_id)
+        if not bot_config:
+            logger.error(f"❌ Bot {bot_id} não encontrado para iniciar")
+            return False
+        return await self.start_bot(bot_config)
+    
+    async def stop_bot_by_id(self, bot_id: int) -> bool:
+        """Para o bot pelo ID, usando o token com que ele foi iniciado"""
+        bot_token = self.bot_tokens.get(bot_id)
+        if not bot_token:
+            return True
+        return await self.stop_bot(bot_token)
+    
+    async def reload_bot(self, bot_id: int) -> bool:
+        """
+        Aplica a configuração atual do banco ao bot comparando com a que está em execução
+
+        - Mudança de conteúdo (mensagem, planos, grupos, mídias): só troca o snapshot em cache,
+          que os handlers leem a cada update; a Application segue rodando sem perder updates
+        - Mudança de token: inicia a Application do novo token e só então para a antiga
+        - Bot desativado ou atribuído a outro worker: para a Application local
+
+        Returns:
+            True se o bot ficou no estado esperado pela configuração
+        """
+        bot_config = TelegramBot.query.populate_existing().get(bot_id)
+        if not bot_config:
+            bot_config_cache.invalidate(bot_id)
+            return await self.stop_bot_by_id(bot_id)
+
+        running_token = self.bot_tokens.get(bot_id)
+
+        if not bot_config.is_active or not self.owns_bot(bot_id):
+            bot_config_cache.refresh(bot_config)
+            if running_token:
+                logger.info(f"⏹️  Bot {bot_config.bot_username} não deve rodar neste processo, parando")
+                return await self.stop_bot(running_token)
+            return True
+
+        if running_token is None:
+            return await self.start_bot(bot_config)
+
+        if running_token == bot_config.bot_token:
+            bot_config_cache.refresh(bot_config)
+            logger.info(f"♻️  Configuração do bot {bot_config.bot_username} recarregada sem reinício")
+            return True
+
+        return await self._swap_token(bot_config, running_token)
+
+    async def _swap_token(self, bot_config: TelegramBot, old_token: str) -> bool:
+        """Troca a Application do bot para o novo token (a antiga só para se a nova subir)"""
+        logger.info(f"🔑 Token do bot {bot_config.bot_username} alterado, trocando a Application")
+
+        # A nova Application assume bot_tokens[bot_id] ao iniciar; até lá a antiga segue atendendo
+        if not await self.start_bot(bot_config):
+            logger.error(f"❌ Novo token do bot {bot_config.bot_username} não iniciou; mantendo o token anterior")
+            return False
+
+        async with self._lock_for(old_token):
+            old_application = self.active_bots.get(old_token)
+            if old_application and self.uses_webhook:
+                # O token antigo deixa de receber updates nesta instância
+                try:
+                    await old_application.bot.delete_webhook()
+                except Exception as e:
+                    logger.warning(f"⚠️  Erro ao remover webhook do token anterior: {e}")
+            await self._stop_bot(old_token)
+
+        self._locks.pop(old_token, None)
+        return True
+    
+    async def start_bot(self, bot_config: TelegramBot, register_webhook: bool = True) -> bool:
+        """
+        Inicia um bot Telegram individual
+        
+        Args:
+            bot_config: Bot a iniciar
+            register_webhook: No modo webhook, registra o webhook após iniciar
+                (start_all_active_bots registra todos em lote)
+        """
+        async with self._lock_for(bot_config.bot_token):
+            return await self._start_bot(bot_config, register_webhook)
+    
+    async def _start_bot(self, bot_config: TelegramBot, register_webhook: bool = True) -> bool:
+        """Executa as tentativas de inicialização do bot (chamado com o lock do bot)"""
         max_retries = 3
         retry_delay = 5
         
+        if bot_config.bot_token in self.active_bots:
+            logger.info(f"Bot {bot_config.bot_username} já está rodando")
+            return True
+        
         for attempt in range(max_retries):
+            application = None
             try:
-                if bot_config.bot_token in self.active_bots:
-                    logger.info(f"Bot {bot_config.bot_username} já está rodando")
-                    return True
-                
                 logger.info(f"Tentativa {attempt + 1}/{max_retries} de iniciar bot {bot_config.bot_username}")
                 
-                # Cria aplicação do bot com configurações de conexão mais robustas
-                application = Application.builder().token(bot_config.bot_token).build()
+                # Cria aplicação do bot; todos os envios passam pelo agendador (limites do Telegram e 429)
+                application = (
+                    Application.builder()
+                    .token(bot_config.bot_token)
+                    .base_url(current_app.config['TELEGRAM_API_URL'])
+                    .rate_limiter(SendScheduler.from_config(current_app.config, bot_id=bot_config.id))
+                    .build()
+                )
                 
                 # Adiciona handlers
                 application.add_handler(CommandHandler("start", self._handle_start))
@@ -43,61 +246,73 @@ class TelegramBotManager:
                 # Handler para QUALQUER mensagem (teste)
                 application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self._handle_any_text))
                 
-                # Armazena configuração do bot no contexto da aplicação
-                application.bot_data['config'] = bot_config
+                # Handlers leem a configuração do snapshot em cache (sem ORM entre threads)
+                application.bot_data['bot_id'] = bot_config.id
+                bot_config_cache.refresh(bot_config)
                 
-                # Inicia o bot
+                # Inicia o bot (initialize já chama get_me e valida o token)
                 await application.initialize()
                 await application.start()
                 
-                # Teste de conectividade antes do polling
-                try:
-                    me = await application.bot.get_me()
-                    logger.info(f"✅ Bot conectado: @{me.username} - {me.first_name}")
-                except Exception as e:
-                    logger.error(f"❌ Erro ao conectar bot: {e}")
-                    if attempt == max_retries - 1:
-                        return False
-                    continue
-                
-                # Inicia polling em modo não-bloqueante
-                logger.info("🔄 Iniciando polling...")
-                print("🔄 Iniciando polling...")
+                me = application.bot
+                logger.info(f"✅ Bot conectado: @{me.username} - {me.first_name}")
                 
-                # Testa se consegue receber updates primeiro
-                try:
-                    updates = await application.bot.get_updates(limit=1, timeout=1)
-                    logger.info(f"✅ Teste de updates: {len(updates)} mensagens pendentes")
-                    print(f"✅ Teste de updates: {len(updates)} mensagens pendentes")
-                except Exception as update_error:
-                    logger.error(f"❌ Erro ao testar updates: {update_error}")
-                    print(f"❌ Erro ao testar updates: {update_error}")
-                
-                await application.updater.start_polling(
-                    poll_interval=1.0,
-                    timeout=20,
-                    bootstrap_retries=3,
-                    read_timeout=30,
-                    write_timeout=30,
-                    connect_timeout=30,
-                    drop_pending_updates=False  # Mudança: não descartar mensagens pendentes
-                )
+                if self.uses_webhook:
+                    # Modo webhook: updates chegam pela rota /tg/<bot_id>/<secret>, sem conexão aberta
+                    if register_webhook and not await self._set_webhook(application, bot_config):
+                        await self._discard_application(application)
+                        self.start_errors[bot_config.id] = "falha ao registrar webhook"
+                        return False
+                    
+                    logger.info(f"🔗 Bot {bot_config.bot_username} recebendo updates via webhook")
+                else:
+                    # Inicia polling em modo não-bloqueante
+                    await application.updater.start_polling(
+                        poll_interval=1.0,
+                        timeout=20,
+                        bootstrap_retries=3,
+                        read_timeout=30,
+                        write_timeout=30,
+                        connect_timeout=30,
+                        drop_pending_updates=False  # Mudança: não descartar mensagens pendentes
+                    )
+                    
+                    logger.info(f"🔄 Polling iniciado para bot {bot_config.bot_username}")
                 
-                logger.info(f"🔄 Polling iniciado para bot {bot_config.bot_username}")
                 logger.info(f"🎯 Bot está aguardando mensagens. Teste enviando /start para @{me.username}")
                 
                 # Armazena na lista de bots ativos
                 self.active_bots[bot_config.bot_token] = application
+                self.bot_tokens[bot_config.id] = bot_config.bot_token
+                self.start_errors.pop(bot_config.id, None)
+                
+                # Status de execução vai para o banco no próximo flush do registro
+                heartbeat_registry.set_running(bot_config.id, True)
                 
-                # Atualiza status no banco
-                bot_config.is_running = True
-                db.session.commit()
+                # Mídia de boas-vindas ainda sem file_id (upload fica fora da requisição HTTP)
+                snapshot = bot_config_cache.get(bot_config.id)
+                if snapshot and media_health.needs_upload(snapshot):
+                    media_health.check_soon(bot_config.id)
                 
                 logger.info(f"Bot {bot_config.bot_username} iniciado com sucesso")
                 return True
                 
+            except asyncio.CancelledError:
+                # Timeout de inicialização: libera a Application parcialmente iniciada
+                await self._discard_application(application)
+                raise
+                
+            except InvalidToken as e:
+                # Token inválido não melhora com novas tentativas
+                await self._discard_application(application)
+                logger.error(f"❌ Token inválido para bot {bot_config.bot_username}: {e}")
+                self.start_errors[bot_config.id] = f"token inválido: {e}"
+                return False
+                
             except Exception as e:
+                await self._discard_application(application)
                 logger.error(f"Tentativa {attempt + 1} falhou para bot {bot_config.bot_username}: {e}")
+                self.start_errors[bot_config.id] = str(e)
                 
                 if attempt < max_retries - 1:
                     logger.info(f"Aguardando {retry_delay}s antes da próxima tentativa...")
@@ -106,27 +321,45 @@ class TelegramBotManager:
                     logger.error(f"Todas as tentativas falharam para bot {bot_config.bot_username}")
                     return False
     
+    async def _discard_application(self, application: Optional[Application]):
+        """Libera os recursos de uma Application que não chegou a ser registrada"""
+        if application is None:
+            return
+        try:
+            if application.updater and application.updater.running:
+                await application.updater.stop()
+            if application.running:
+                await application.stop()
+            await application.shutdown()
+        except Exception as e:
+            logger.warning(f"⚠️  Erro ao descartar Application: {e}")
+    
     async def stop_bot(self, bot_token: str) -> bool:
         """Para um bot Telegram específico"""
+        async with self._lock_for(bot_token):
+            return await self._stop_bot(bot_token)
+    
+    async def _stop_bot(self, bot_token: str) -> bool:
+        """Encerra a Application do bot (chamado com o lock do bot)"""
         try:
             if bot_token not in self.active_bots:
                 return True
             
             application = self.active_bots[bot_token]
             
-            # Para o bot
-            await application.updater.stop()
+            # Para o bot (no modo webhook o updater não está rodando)
+            if application.updater and application.updater.running:
+                await application.updater.stop()
             await application.stop()
             await application.shutdown()
             
             # Remove da lista
             del self.active_bots[bot_token]
-            
-            # Atualiza status no banco
-            bot_config = TelegramBot.query.filter_by(bot_token=bot_token).first()
-            if bot_config:
-                bot_config.is_running = False
-                db.session.commit()
+            bot_id = application.bot_data['bot_id']
+            if self.bot_tokens.get(bot_id) == bot_token:
+                # Na troca de token o bot segue rodando com a nova Application
+                del self.bot_tokens[bot_id]
+                heartbeat_registry.set_running(bot_id, False)
             
             logger.info(f"Bot parado com sucesso")
             return True
@@ -135,155 +368,226 @@ class TelegramBotManager:
             logger.error(f"Erro ao parar bot: {e}")
             return False
     
+    def _startup_event(self) -> asyncio.Event:
+        if self._startup_done is None:
+            self._startup_done = asyncio.Event()
+        return self._startup_done
+    
+    async def wait_startup(self):
+        """Aguarda o fim da inicialização em lote (start_all_active_bots)"""
+        await self._startup_event().wait()
+    
+    async def start_bot_limited(self, bot_config: TelegramBot, register_webhook: bool = True) -> Tuple[bool, float]:
+        """
+        Inicia o bot dentro do limite BOT_STARTUP_CONCURRENCY e do prazo BOT_STARTUP_TIMEOUT
+        (caminho único de inicialização: boot em lote, runners e reconciliação)
+        
+        Returns:
+            (iniciou, segundos gastos depois de obter a vaga)
+        """
+        config = current_app.config
+        if self._startup_semaphore is None:
+            self._startup_semaphore = asyncio.Semaphore(config['BOT_STARTUP_CONCURRENCY'])
+        timeout = config['BOT_STARTUP_TIMEOUT']
+        
+        async with self._startup_semaphore:
+            began = time.monotonic()
+            try:
+                started = await asyncio.wait_for(self.start_bot(bot_config, register_webhook), timeout)
+            except asyncio.TimeoutError:
+                started = False
+                self.start_errors[bot_config.id] = f"timeout após {timeout:.0f}s"
+            return started, time.monotonic() - began
+    
     async def start_all_active_bots(self):
-        """Inicia todos os bots ativos do banco de dados"""
+        """Inicia todos os bots ativos do banco de dados com concorrência limitada"""
         try:
-            active_bots = TelegramBot.query.filter_by(is_active=True).all()
+            active_bots = [
+                bot_config for bot_config in TelegramBot.query.filter_by(is_active=True).all()
+                if self.owns_bot(bot_config.id)
+            ]
             
-            for bot_config in active_bots:
-                await self.start_bot(bot_config)
+            slow_seconds = current_app.config['BOT_STARTUP_SLOW_SECONDS']
+            report = {'started': [], 'failed': [], 'slow': []}
+            startup_began = time.monotonic()
+            
+            async def start_one(bot_config: TelegramBot):
+                bot_id, username = bot_config.id, bot_config.bot_username
+                started, seconds = await self.start_bot_limited(bot_config, register_webhook=False)
                 
-            logger.info(f"Iniciados {len(active_bots)} bots")
+                entry = {'bot_id': bot_id, 'username': username, 'seconds': round(seconds, 3)}
+                if started:
+                    report['started'].append(entry)
+                else:
+                    report['failed'].append(dict(entry, error=self.start_errors.get(bot_id, 'falha ao iniciar')))
+                if entry['seconds'] >= slow_seconds:
+                    report['slow'].append(entry)
+            
+            await asyncio.gather(*(start_one(bot_config) for bot_config in active_bots))
+            
+            if self.uses_webhook:
+                await self._register_webhooks(active_bots)
+            
+            report['total_seconds'] = round(time.monotonic() - startup_began, 3)
+            self.last_startup_report = report
+            self._log_startup_report(report)
             
         except Exception as e:
             logger.error(f"Erro ao iniciar bots: {e}")
+        finally:
+            # Libera a reconciliação, que só compara desejado x em execução depois do boot
+            self._startup_event().set()
+    
+    def _log_startup_report(self, report: dict):
+        """Registra o relatório de inicialização dos bots"""
+        logger.info(
+            f"Iniciados {len(report['started'])} bots em {report['total_seconds']:.1f}s "
+            f"({len(report['failed'])} falharam, {len(report['slow'])} lentos)"
+        )
+        for entry in report['failed']:
+            logger.error(f"❌ Bot {entry['username']} (ID {entry['bot_id']}) falhou em {entry['seconds']:.1f}s: {entry['error']}")
+        for entry in report['slow']:
+            logger.warning(f"🐢 Bot {entry['username']} (ID {entry['bot_id']}) levou {entry['seconds']:.1f}s para iniciar")
+    
+    async def _register_webhooks(self, bots: List[TelegramBot]):
+        """Registra em lote (concorrentemente) os webhooks dos bots em execução"""
+        pending = [
+            self._set_webhook(self.active_bots[bot_config.bot_token], bot_config)
+            for bot_config in bots
+            if bot_config.bot_token in self.active_bots
+        ]
+        results = await asyncio.gather(*pending, return_exceptions=True)
+        registered = sum(1 for result in results if result is True)
+        logger.info(f"🔗 Webhooks registrados: {registered}/{len(pending)}")
     
+    def feed_update(self, bot_id: int, update_data: dict) -> bool:
+        """
+        Entrega um update recebido via webhook à fila da Application do bot (thread-safe)
+        
+        Returns:
+            False se o bot não estiver rodando neste processo
+        """
+        application = self.get_application(bot_id)
+        if not application:
+            return False
+        
+        update = Update.de_json(update_data, application.bot)
+        bot_runtime.call_soon(application.update_queue.put_nowait, update)
+        return True
+    
+    async def stop_all_bots(self):
+        """Para todos os bots em execução neste processo"""
+        for bot_token in list(self.active_bots.keys()):
+            await self.stop_bot(bot_token)
+    
+    def _get_config(self, context: ContextTypes.DEFAULT_TYPE) -> Optional[BotConfigSnapshot]:
+        """Retorna o snapshot de configuração do bot que recebeu o update"""
+        bot_id = context.application.bot_data.get('bot_id')
+        return bot_config_cache.get(bot_id) if bot_id is not None else None
+    
+    @instrument_handler('start')
     async def _handle_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Handler para comando /start"""
+        """Handler para comando /start (usa o pacote de boas-vindas pré-montado do bot)"""
+        await self._send_start(update, context, 'start')
+    
+    async def _send_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE, handler: str):
+        """Envia o pacote de boas-vindas (sem instrumentação: `handler` é o label de quem chamou)"""
         try:
             user = update.effective_user
+            # No callback 'start' não há update.message: responde no chat da mensagem do botão
+            message = update.effective_message
             logger.info(f"🚀 Comando /start recebido de @{user.username or user.id}")
-            print(f"🚀 Comando /start recebido de @{user.username or user.id}")
             
             # Verifica se a configuração do bot está disponível
-            if 'config' not in context.application.bot_data:
+            bot_config = self._get_config(context)
+            if not bot_config:
                 logger.error("❌ Configuração do bot não encontrada no contexto!")
-                print("❌ Configuração do bot não encontrada no contexto!")
-                await update.message.reply_text("⚠️ Erro de configuração. Tente novamente.")
+                await message.reply_text("⚠️ Erro de configuração. Tente novamente.")
                 return
             
-            bot_config = context.application.bot_data['config']
-            
-            logger.info(f"Bot config encontrada: {bot_config.bot_username}")
-            print(f"Bot config encontrada: {bot_config.bot_username}")
-            
-            # Mensagem de boas-vindas
-            welcome_text = bot_config.welcome_message or "Olá! Bem-vindo ao meu bot!"
-            
-            # Cria botões com valores PIX e nomes dos planos
-            try:
-                pix_values = bot_config.get_pix_values()
-                plan_names = bot_config.get_plan_names()
-            except Exception as pix_error:
-                logger.error(f"❌ Erro ao obter valores PIX: {pix_error}")
-                pix_values = None
-                plan_names = None
-            
-            keyboard = []
-            
-            if pix_values:
-                # Cria botões para cada valor com nome do plano
-                for i, value in enumerate(pix_values):
-                    # Pega o nome do plano ou usa um padrão
-                    plan_name = plan_names[i] if plan_names and i < len(plan_names) else f"Plano {i+1}"
-                    
-                    callback_data = f"pix_{value}_{bot_config.id}_{i}"
-                    keyboard.append([
-                        InlineKeyboardButton(
-                            f"{plan_name} - R$ {value:.2f}",
-                            callback_data=callback_data
-                        )
-                    ])
-            else:
-                # Valores padrão se não configurado
-                default_values = [19.90, 39.90, 99.90]
-                default_names = ["🌟VIP SEMANAL🌟", "💎PREMIUM MENSAL💎", "👑ELITE ANUAL👑"]
-                
-                for i, value in enumerate(default_values):
-                    plan_name = default_names[i]
-                    callback_data = f"pix_{value}_{bot_config.id}_{i}"
-                    keyboard.append([
-                        InlineKeyboardButton(
-                            f"{plan_name} - R$ {value:.2f}",
-                            callback_data=callback_data
-                        )
-                    ])
-            
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            # Envia mídias iniciais na sequência correta APENAS se ambos os grupos estiverem configurados
-            can_send_media = bot_config.has_vip_group() and bot_config.has_log_group()
-            
-            if can_send_media:
-                # 1. Primeiro envia a imagem inicial se existir (via file_id ou caminho local)
-                if bot_config.welcome_image_file_id:
-                    try:
-                        await update.message.reply_photo(photo=bot_config.welcome_image_file_id)
-                        logger.info(f"✅ Imagem inicial enviada via file_id")
-                    except Exception as img_error:
-                        logger.error(f"❌ Erro ao enviar imagem via file_id: {img_error}")
-                        # Fallback para arquivo local se existir
-                        if bot_config.welcome_image:
-                            try:
-                                with open(bot_config.welcome_image, 'rb') as img_file:
-                                    await update.message.reply_photo(photo=img_file)
-                                logger.info(f"✅ Imagem inicial enviada via arquivo local")
-                            except Exception as local_img_error:
-                                logger.error(f"❌ Erro ao enviar imagem local: {local_img_error}")
-                elif bot_config.welcome_image:
-                    # Se não tem file_id mas tem arquivo local
-                    try:
-                        with open(bot_config.welcome_image, 'rb') as img_file:
-                            await update.message.reply_photo(photo=img_file)
-                        logger.info(f"✅ Imagem inicial enviada via arquivo local")
-                    except Exception as local_img_error:
-                        logger.error(f"❌ Erro ao enviar imagem local: {local_img_error}")
-                
-                # 2. Depois envia o áudio inicial se existir (via file_id ou caminho local)
-                if bot_config.welcome_audio_file_id:
-                    try:
-                        await update.message.reply_audio(audio=bot_config.welcome_audio_file_id)
-                        logger.info(f"✅ Áudio inicial enviado via file_id")
-                    except Exception as audio_error:
-                        logger.error(f"❌ Erro ao enviar áudio via file_id: {audio_error}")
-                        # Fallback para arquivo local se existir
-                        if bot_config.welcome_audio:
-                            try:
-                                with open(bot_config.welcome_audio, 'rb') as audio_file:
-                                    await update.message.reply_audio(audio=audio_file)
-                                logger.info(f"✅ Áudio inicial enviado via arquivo local")
-                            except Exception as local_audio_error:
-                                logger.error(f"❌ Erro ao enviar áudio local: {local_audio_error}")
-                elif bot_config.welcome_audio:
-                    # Se não tem file_id mas tem arquivo local
-                    try:
-                        with open(bot_config.welcome_audio, 'rb') as audio_file:
-                            await update.message.reply_audio(audio=audio_file)
-                        logger.info(f"✅ Áudio inicial enviado via arquivo local")
-                    except Exception as local_audio_error:
-                        logger.error(f"❌ Erro ao enviar áudio local: {local_audio_error}")
-            else:
-                logger.info(f"⚠️ Mídia não enviada - Grupos VIP e/ou Notificações não configurados para bot {bot_config.bot_username}")
-            
-            # 3. Por último envia a mensagem de boas-vindas com os botões
-            await update.message.reply_text(
-                welcome_text,
-                reply_markup=reply_markup
-            )
+            # Topo do funil: só o comando (o botão "Voltar ao Início" também cai aqui)
+            if update.message:
+                analytics.record_start(bot_config.bot_id, bot_config.user_id)
+            
+            welcome = bot_config.welcome
+            photo = welcome.get_media('photo')
+            audio = welcome.get_media('audio')
+            
+            async def send_main():
+                # Caminho mais curto: foto com o texto na legenda e os botões (uma única chamada)
+                if photo and welcome.caption_fits:
+                    if await self._send_welcome_media(
+                        message, bot_config.bot_id, photo,
+                        caption=welcome.text, reply_markup=welcome.reply_markup
+                    ):
+                        return
+                elif photo:
+                    # Texto longo demais para legenda: foto antes, mensagem com os botões por último
+                    await self._send_welcome_media(message, bot_config.bot_id, photo)
+                
+                await message.reply_text(welcome.text, reply_markup=welcome.reply_markup)
+            
+            # O áudio segue em paralelo com a mensagem principal (a ordem entre eles não importa)
+            sends = [send_main()]
+            if audio:
+                sends.append(self._send_welcome_media(message, bot_config.bot_id, audio))
+            await asyncio.gather(*sends)
             
             logger.info(f"✅ Resposta enviada com sucesso para @{user.username or user.id} no bot {bot_config.bot_username}")
             
         except Exception as e:
+            record_handler_error(context, handler)
             logger.error(f"❌ Erro no handler /start: {e}")
             try:
-                await update.message.reply_text("Desculpe, ocorreu um erro. Tente novamente.")
+                await message.reply_text("Desculpe, ocorreu um erro. Tente novamente.")
             except:
                 pass
+    
+    async def _send_welcome_media(self, message, bot_id: int, media: WelcomeMedia, **kwargs) -> bool:
+        """
+        Envia uma mídia de boas-vindas via file_id, com fallback para o arquivo local
+        Quando o fallback é usado, o file_id devolvido pelo Telegram substitui o quebrado
+        
+        Returns:
+            True se a mídia foi enviada
+        """
+        send = message.reply_photo if media.kind == 'photo' else message.reply_audio
+        label = "Imagem inicial enviada" if media.kind == 'photo' else "Áudio inicial enviado"
+        
+        if media.file_id:
+            try:
+                await send(media.file_id, **kwargs)
+                logger.info(f"✅ {label} via file_id")
+                return True
+            except Exception as file_id_error:
+                logger.error(f"❌ Erro ao enviar {media.kind} via file_id: {file_id_error}")
+        
+        if media.path:
+            try:
+                with open(media.path, 'rb') as media_file:
+                    sent = await send(media_file, **kwargs)
+                logger.info(f"✅ {label} via arquivo local")
+                self._repair_welcome_file_id(bot_id, media, sent)
+                return True
+            except Exception as local_error:
+                logger.error(f"❌ Erro ao enviar {media.kind} local: {local_error}")
+        
+        return False
+    
+    def _repair_welcome_file_id(self, bot_id: int, media: WelcomeMedia, sent):
+        """Grava o file_id obtido no reenvio do arquivo local para os próximos /start não reenviarem"""
+        try:
+            if media.kind == 'photo':
+                file_id = sent.photo[-1].file_id if sent and sent.photo else None
+            else:
+                file_id = sent.audio.file_id if sent and sent.audio else None
             
+            if file_id and file_id != media.file_id:
+                replace_file_id(bot_id, media.kind, media.file_id, file_id, media.path)
         except Exception as e:
-            logger.error(f"Erro no handler /start: {e}")
-            await update.message.reply_text("Desculpe, ocorreu um erro. Tente novamente.")
+            logger.error(f"❌ Erro ao reparar file_id de {media.kind} do bot {bot_id}: {e}")
     
+    @instrument_handler('callback')
     async def _handle_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handler para botões inline (valores PIX e verificação de pagamento)"""
         try:
@@ -313,34 +617,24 @@ class TelegramBotManager:
                 await query.edit_message_text("Erro: Dados inválidos")
                 return
             
-            value = float(callback_parts[1])
-            bot_id = int(callback_parts[2])
             plan_index = int(callback_parts[3]) if len(callback_parts) > 3 else 0
             
-            # Busca configuração do bot
-            bot_config = TelegramBot.query.get(bot_id)
+            # Configuração do bot vem do snapshot em cache (sem consultas ao banco)
+            bot_config = self._get_config(context)
             if not bot_config:
                 await query.edit_message_text("Erro: Bot não encontrado")
                 return
             
-            # Pega o nome do plano
-            plan_names = bot_config.get_plan_names()
-            plan_name = "Plano Especial"
-            
-            if plan_names and plan_index < len(plan_names):
-                plan_name = plan_names[plan_index]
+            # Valor e nome vêm do plano configurado; o valor do callback só vale para botões antigos
+            plan = bot_config.get_plan(plan_index)
+            if plan:
+                value = plan.value
+                plan_name = plan.name
             else:
-                # Nomes padrão
-                default_names = ["🌟VIP SEMANAL🌟", "💎PREMIUM MENSAL💎", "👑ELITE ANUAL👑"]
-                if plan_index < len(default_names):
-                    plan_name = default_names[plan_index]
+                value = float(callback_parts[1])
+                plan_name = "Plano Especial"
             
-            # Busca o dono do bot para pegar o token PushinPay
-            bot_owner = User.query.get(bot_config.user_id)
-
-            logger.info(f"TOKEN PUSHIN: {bot_owner.pushinpay_token}")
-
-            if not bot_owner or not bot_owner.pushinpay_token:
+            if not bot_config.pushinpay_token:
                 await query.edit_message_text("Erro: Sistema de pagamento indisponível")
                 return
             
@@ -348,32 +642,39 @@ class TelegramBotManager:
             user = update.effective_user
             description = f"Pagamento R$ {value:.2f} - Bot {bot_config.bot_username}"
             
-            pix_data = self.pushinpay_service.create_pix_payment(
-                user_pushinpay_token=bot_owner.pushinpay_token,
+            pix_data = await pushinpay_client.create_pix_payment(
+                user_pushinpay_token=bot_config.pushinpay_token,
                 amount=value,
                 telegram_user_id=str(user.id),
                 description=description
             )
             
-            if not pix_data.get('success'):
+            if not pix_data.success:
                 await query.edit_message_text(
-                    f"❌ Erro ao gerar PIX: {pix_data.get('error', 'Erro desconhecido')}"
+                    f"❌ Erro ao gerar PIX: {pix_data.error or 'Erro desconhecido'}"
                 )
                 return
             
             # Salva pagamento no banco
             payment = Payment(
-                pix_code=pix_data['pix_code'],
+                pix_code=pix_data.pix_code,
                 amount=value,
-                pix_key=pix_data.get('pix_copy_paste', ''),
-                pix_qr_code=pix_data.get('qr_code', ''),
-                expires_at=pix_data.get('expires_at'),
+                pix_key=pix_data.pix_copy_paste,
+                plan_name=plan_name,
+                expires_at=pix_data.expires_at,
                 user_id=bot_config.user_id,
-                bot_id=bot_config.id
+                bot_id=bot_config.bot_id,
+                telegram_user_id=user.id,
+                telegram_username=user.username
             )
             
             db.session.add(payment)
             db.session.commit()
+            analytics.record_pix(bot_config.bot_id, bot_config.user_id, plan_name)
+            
+            # A confirmação passa a ser verificada em segundo plano
+            from .payment_reconciler import payment_reconciler
+            payment_reconciler.track(payment)
             
             # Cria botões para o PIX
             keyboard = [
@@ -391,11 +692,12 @@ class TelegramBotManager:
 
 💠 Pague via Pix Copia e Cola (ou QR Code em alguns bancos):
 
-{pix_data.get('pix_copy_paste', 'PIX não disponível')}
+{pix_data.pix_copy_paste or 'PIX não disponível'}
 
 👆 Toque na chave PIX acima para copiá-la
 
-‼️ Após o pagamento, clique no botão abaixo para verificar o status:"""
+‼️ Após o pagamento, seu acesso é liberado automaticamente em alguns segundos.
+Se preferir, clique no botão abaixo para verificar o status:"""
             
             # Responde ao callback para confirmar a seleção
             await query.answer(f"Plano {plan_name} selecionado!")
@@ -403,35 +705,19 @@ class TelegramBotManager:
             # Envia nova mensagem com as informações do PIX
             user = update.effective_user
             
-            # Verifica se tem QR Code para enviar como imagem
-            qr_code_data = pix_data.get('qr_code', '')
+            # QR renderizado fora do loop (pool de threads) e guardado pelo pagamento até expirar
+            qr_png = await qr_renderer.render(
+                payment.id, payment.pix_key, qr_image=pix_data.qr_code, expires_at=payment.expires_at
+            )
             
-            if qr_code_data and qr_code_data.startswith('data:image/'):
+            if qr_png:
                 try:
-                    # Remove o prefixo data:image/png;base64, para obter apenas o base64
-                    import base64
-                    from io import BytesIO
-                    from PIL import Image, ImageOps
-                    
-                    base64_data = qr_code_data.split(',')[1] if ',' in qr_code_data else qr_code_data
-                    image_data = base64.b64decode(base64_data)
-                    
-                    # Abre a imagem original
-                    original_image = Image.open(BytesIO(image_data))
-                    
-                    # Adiciona padding branco ao redor do QR Code
-                    padding = 20  # 20 pixels de padding
-                    padded_image = ImageOps.expand(original_image, border=padding, fill='white')
-                    
-                    # Converte a imagem modificada de volta para bytes
-                    output_buffer = BytesIO()
-                    padded_image.save(output_buffer, format='PNG')
-                    output_buffer.seek(0)
-                    
                     # Envia nova mensagem com QR Code
-                    await context.bot.send_photo(
-                        chat_id=user.id,
-                        photo=output_buffer,
+                    await qr_renderer.send_photo(
+                        context.bot,
+                        bot_config.bot_id,
+                        user.id,
+                        qr_png,
                         caption=pix_message,
                         reply_markup=reply_markup
                     )
@@ -455,9 +741,11 @@ class TelegramBotManager:
             logger.info(f"PIX R$ {value:.2f} gerado para @{user.username if user.username else user.id} no bot {bot_config.bot_username}")
             
         except Exception as e:
+            record_handler_error(context, 'callback')
             logger.error(f"Erro no handler callback: {e}")
             await query.edit_message_text("❌ Erro ao processar solicitação. Tente novamente.")
     
+    @instrument_handler('text')
     async def _handle_any_text(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handler para qualquer mensagem de texto"""
         try:
@@ -468,18 +756,19 @@ class TelegramBotManager:
             await update.message.reply_text(f"Recebi sua mensagem: {message_text}")
             
         except Exception as e:
+            record_handler_error(context, 'text')
             logger.error(f"Erro no handler de texto: {e}")
     
     async def _handle_start_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Handler para callback 'start' - volta ao menu inicial"""
-        try:
-            # Simula um comando /start
-            await self._handle_start(update, context)
-        except Exception as e:
-            logger.error(f"Erro no handler start callback: {e}")
+        """Handler para callback 'start' - volta ao menu inicial (medido como 'callback' por _handle_callback)"""
+        await self._send_start(update, context, 'callback')
     
+    @instrument_handler('test_payment')
     async def _handle_test_payment(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handler para simular pagamento aprovado (APENAS PARA TESTES)"""
+        from .fulfillment_service import confirm_payment
+        from .payment_reconciler import payment_reconciler
+        
         try:
             query = update.callback_query
             user = update.effective_user
@@ -494,74 +783,42 @@ class TelegramBotManager:
                 return
             
             # Busca a configuração do bot
-            bot_config = TelegramBot.query.get(payment.bot_id)
-            if not bot_config:
+            bot_config = self._get_config(context)
+            if not bot_config or bot_config.bot_id != payment.bot_id:
                 await query.edit_message_text("❌ Configuração do bot não encontrada.")
                 return
             
             logger.info(f"🧪 TESTE: Simulando pagamento aprovado para @{user.username or user.id}")
             
-            # Simula pagamento aprovado
-            payment.status = 'approved'
-            payment.paid_at = datetime.utcnow()
-            db.session.commit()
-            
-            logger.info(f"✅ TESTE: Pagamento simulado! Adicionando @{user.username or user.id} aos grupos")
-            
-            # Adiciona o usuário ao grupo VIP
-            success_vip = await self._add_user_to_group(
-                context.bot, 
-                user.id, 
-                bot_config.get_vip_group_id(),
-                "VIP"
-            )
+            # Simula pagamento aprovado pelo mesmo caminho idempotente da confirmação real
+            payment_reconciler.untrack(payment_id)
+            if not confirm_payment(payment_id, 'approved'):
+                await query.answer("Este pagamento já foi processado.")
+                return
             
-            # Envia notificação para o grupo de logs
-            await self._send_log_notification(
-                context.bot,
-                bot_config.get_log_group_id(),
-                user,
-                payment.amount,
-                success_vip
-            )
+            # Responde ao callback (o convite e a confirmação chegam pelo worker de liberação)
+            await query.answer("Teste de pagamento executado!")
             
-            # Resposta ao usuário
-            if success_vip:
-                success_message = f"""🧪 **TESTE - PAGAMENTO SIMULADO!**
+            await context.bot.send_message(
+                chat_id=user.id,
+                text=f"""🧪 **TESTE - PAGAMENTO SIMULADO!**
 
 ✅ Pagamento foi simulado como aprovado.
 💰 Valor: R$ {payment.amount:.2f}
-👑 Você foi adicionado ao grupo VIP!
 
 🚀 Este é um teste - nenhum pagamento real foi processado."""
-            else:
-                success_message = f"""🧪 **TESTE - PAGAMENTO SIMULADO!**
-
-✅ Pagamento foi simulado como aprovado.
-💰 Valor: R$ {payment.amount:.2f}
-
-⚠️ Houve um problema ao adicionar você ao grupo automaticamente.
-(Verifique se os IDs dos grupos estão configurados corretamente)"""
-            
-            # Responde ao callback
-            await query.answer("Teste de pagamento executado!")
-            
-            # Envia nova mensagem de teste
-            keyboard = [[InlineKeyboardButton("🏠 Voltar ao Início", callback_data="start")]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await context.bot.send_message(
-                chat_id=user.id,
-                text=success_message,
-                reply_markup=reply_markup
             )
             
         except Exception as e:
+            record_handler_error(context, 'test_payment')
             logger.error(f"❌ Erro no teste de pagamento: {e}")
             await query.edit_message_text("❌ Erro ao simular pagamento. Tente novamente.")
     
+    @instrument_handler('payment_verification')
     async def _handle_payment_verification(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Handler para verificação de pagamento PIX"""
+        """Handler para verificação de pagamento PIX (consulta compartilhada com a reconciliação)"""
+        from .payment_reconciler import payment_reconciler
+        
         try:
             query = update.callback_query
             user = update.effective_user
@@ -569,99 +826,22 @@ class TelegramBotManager:
             # Extrai o ID do pagamento do callback data
             payment_id = int(query.data.split('_')[1])
             
-            # Busca o pagamento no banco
-            payment = Payment.query.get(payment_id)
-            if not payment:
-                await query.edit_message_text("❌ Pagamento não encontrado.")
-                return
-            
-            # Busca a configuração do bot
-            bot_config = TelegramBot.query.get(payment.bot_id)
-            if not bot_config:
-                await query.edit_message_text("❌ Configuração do bot não encontrada.")
-                return
-            
-            # Busca o dono do bot
-            bot_owner = User.query.get(bot_config.user_id)
-            if not bot_owner or not bot_owner.pushinpay_token:
-                await query.edit_message_text("❌ Sistema de pagamento indisponível.")
-                return
-            
-            # Verifica o status do pagamento
             logger.info(f"🔍 Verificando pagamento {payment_id} para @{user.username or user.id}")
             
-            # Verifica com a API do PushinPay
-            try:
-                pushin_service = PushinPayService()
-                
-                # Usa o pix_code como payment_id para verificar o status
-                payment_status = pushin_service.check_payment_status(
-                    bot_owner.pushinpay_token, 
-                    payment.pix_code
-                )
-                payment_verified = payment_status.get('paid', False)
-                
-                logger.info(f"📊 Status do pagamento {payment.pix_code}: {payment_status}")
-                
-            except Exception as api_error:
-                logger.error(f"❌ Erro ao verificar pagamento via API: {api_error}")
-                # Em caso de erro na API, considera como não pago
-                payment_verified = False
-            
-            if payment_verified:
-                # Pagamento aprovado! 
-                payment.status = 'approved'
-                payment.paid_at = datetime.utcnow()
-                db.session.commit()
-                
-                logger.info(f"✅ Pagamento aprovado! Adicionando @{user.username or user.id} aos grupos")
-                
-                # Adiciona o usuário ao grupo VIP
-                success_vip = await self._add_user_to_group(
-                    context.bot, 
-                    user.id, 
-                    bot_config.get_vip_group_id(),
-                    "VIP"
-                )
-                
-                # Envia notificação para o grupo de logs
-                await self._send_log_notification(
-                    context.bot,
-                    bot_config.get_log_group_id(),
-                    user,
-                    payment.amount,
-                    success_vip
-                )
-                
-                # Resposta ao usuário
-                if success_vip:
-                    success_message = f"""✅ **PAGAMENTO APROVADO!**
-
-🎉 Parabéns! Seu pagamento foi confirmado.
-💰 Valor: R$ {payment.amount:.2f}
-👑 Você foi adicionado ao grupo VIP!
-
-Aproveite o acesso exclusivo! 🚀"""
-                else:
-                    success_message = f"""✅ **PAGAMENTO APROVADO!**
-
-🎉 Parabéns! Seu pagamento foi confirmado.
-💰 Valor: R$ {payment.amount:.2f}
-
-⚠️ Houve um problema ao adicionar você ao grupo automaticamente.
-Entre em contato com o suporte."""
+            # A aprovação (convite VIP, notificação e mensagem ao cliente) é feita pela reconciliação
+            status = await payment_reconciler.check_now(payment_id)
+            
+            if status == 'not_found':
+                await query.edit_message_text("❌ Pagamento não encontrado.")
                 
-                # Responde ao callback
+            elif status in ('approved', 'completed'):
                 await query.answer("Pagamento aprovado!")
                 
-                # Envia nova mensagem de sucesso
+            elif status in ('expired', 'failed'):
                 keyboard = [[InlineKeyboardButton("🏠 Voltar ao Início", callback_data="start")]]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                
-                await context.bot.send_message(
-                    chat_id=user.id,
-                    text=success_message,
-                    reply_markup=reply_markup
+                await query.edit_message_text(
+                    "⌛ Este PIX expirou ou foi cancelado.\n\nGere um novo pagamento pelo menu inicial.",
+                    reply_markup=InlineKeyboardMarkup(keyboard)
                 )
                 
             else:
@@ -676,14 +856,77 @@ Entre em contato com o suporte."""
                 
                 await query.edit_message_text(
                     "⏳ Pagamento ainda não foi identificado.\n\n"
-                    "Aguarde alguns minutos após realizar o pagamento e tente novamente.",
+                    "Assim que for confirmado, seu acesso será liberado automaticamente.",
                     reply_markup=reply_markup
                 )
                 
         except Exception as e:
+            record_handler_error(context, 'payment_verification')
             logger.error(f"❌ Erro na verificação de pagamento: {e}")
             await query.edit_message_text("❌ Erro ao verificar pagamento. Tente novamente.")
     
+    async def fulfill_payment(self, payment: Payment) -> bool:
+        """
+        Libera o acesso de um pagamento aprovado: convite do grupo VIP,
+        notificação no grupo de logs e mensagem de confirmação ao cliente
+        
+        Returns:
+            False se o bot não estiver rodando neste processo ou o cliente for desconhecido
+        """
+        application = self.get_application(payment.bot_id)
+        bot_config = bot_config_cache.get(payment.bot_id)
+        if not application or not bot_config or not payment.telegram_user_id:
+            logger.warning(f"⚠️  Não foi possível liberar o acesso do pagamento {payment.id} neste processo")
+            return False
+        
+        bot = application.bot
+        chat_id = payment.telegram_user_id
+        logger.info(f"✅ Pagamento aprovado! Adicionando @{payment.telegram_username or chat_id} aos grupos")
+        
+        # Adiciona o usuário ao grupo VIP
+        success_vip = await self._add_user_to_group(bot, chat_id, bot_config.vip_group_id, "VIP")
+        
+        # Envia notificação para o grupo de logs
+        await self._send_log_notification(
+            bot,
+            bot_config.log_group_id,
+            chat_id,
+            payment.telegram_username,
+            payment.amount,
+            success_vip
+        )
+        
+        # Resposta ao usuário
+        if success_vip:
+            success_message = f"""✅ **PAGAMENTO APROVADO!**
+
+🎉 Parabéns! Seu pagamento foi confirmado.
+💰 Valor: R$ {payment.amount:.2f}
+👑 Você foi adicionado ao grupo VIP!
+
+Aproveite o acesso exclusivo! 🚀"""
+        else:
+            success_message = f"""✅ **PAGAMENTO APROVADO!**
+
+🎉 Parabéns! Seu pagamento foi confirmado.
+💰 Valor: R$ {payment.amount:.2f}
+
+⚠️ Houve um problema ao adicionar você ao grupo automaticamente.
+Entre em contato com o suporte."""
+        
+        keyboard = [[InlineKeyboardButton("🏠 Voltar ao Início", callback_data="start")]]
+        try:
+            await bot.send_message(
+                chat_id=chat_id,
+                text=success_message,
+                reply_markup=InlineKeyboardMarkup(keyboard),
+                rate_limit_args={'priority': PRIORITY_PAYMENT}
+            )
+        except Exception as e:
+            logger.error(f"❌ Erro ao enviar confirmação do pagamento {payment.id}: {e}")
+        
+        return True
+    
     async def _add_user_to_group(self, bot, user_id: int, group_id: str, group_type: str) -> bool:
         """Adiciona usuário a um grupo específico"""
         try:
@@ -706,7 +949,8 @@ Entre em contato com o suporte."""
                 text=f"🎊 **ACESSO LIBERADO!**\n\n"
                      f"👑 Clique no link abaixo para entrar no grupo VIP:\n\n"
                      f"{invite_link.invite_link}\n\n"
-                     f"🚀 Aproveite o conteúdo exclusivo!"
+                     f"🚀 Aproveite o conteúdo exclusivo!",
+                rate_limit_args={'priority': PRIORITY_PAYMENT}
             )
             
             logger.info(f"✅ Link de convite enviado para usuário {user_id}")
@@ -716,7 +960,7 @@ Entre em contato com o suporte."""
             logger.error(f"❌ Erro ao adicionar usuário {user_id} ao grupo {group_type}: {e}")
             return False
     
-    async def _send_log_notification(self, bot, log_group_id: str, user, amount: float, success: bool):
+    async def _send_log_notification(self, bot, log_group_id: str, user_id: int, username: Optional[str], amount: float, success: bool):
         """Envia notificação para o grupo de logs"""
         try:
             if not log_group_id:
@@ -730,7 +974,7 @@ Entre em contato com o suporte."""
             log_message = f"""🔔 **NOVO PAGAMENTO {status_text}**
 
 {status_emoji} **Status:** {'Aprovado e usuário adicionado' if success else 'Aprovado mas erro ao adicionar'}
-👤 **Usuário:** @{user.username or 'username_não_disponível'} (ID: {user.id})
+👤 **Usuário:** @{username or 'username_não_disponível'} (ID: {user_id})
 💰 **Valor:** R$ {amount:.2f}
 🕒 **Data:** {datetime.utcnow().strftime('%d/%m/%Y %H:%M:%S')}
 
@@ -738,7 +982,8 @@ Entre em contato com o suporte."""
             
             await bot.send_message(
                 chat_id=log_group_id,
-                text=log_message
+                text=log_message,
+                rate_limit_args={'priority': PRIORITY_LOG}
             )
             
             logger.info(f"📝 Notificação enviada para grupo de logs")
@@ -4,20 +4,24 @@ Envia arquivos para grupo de notificações e retorna file_id para armazenamento
 """
 
 import os
-import asyncio
-import tempfile
 from datetime import datetime
 from typing import Optional, Dict, Any
 from telegram import Bot
-from telegram.error import TelegramError
+from telegram.error import BadRequest, TelegramError
 from ..utils.logger import logger
 
+MAX_MEDIA_SIZE = 25 * 1024 * 1024  # limite de upload das mídias de boas-vindas
+
+# Respostas do getFile que indicam file_id inválido (e não erro transitório)
+INVALID_FILE_ID_ERRORS = ('wrong file identifier', 'invalid file_id', 'file_id_invalid', 'wrong remote file')
+
 class TelegramMediaService:
     """Serviço para gerenciar upload e armazenamento de mídia via Telegram"""
     
-    def __init__(self, bot_token: str):
+    def __init__(self, bot_token: str, bot: Bot = None):
         self.bot_token = bot_token
-        self.bot = Bot(token=bot_token)
+        # Permite reaproveitar o Bot já inicializado da Application (agendador de envios incluso)
+        self.bot = bot or Bot(token=bot_token)
     
     async def upload_media_to_telegram(self, 
                                      file_path: str, 
@@ -140,6 +144,44 @@ class TelegramMediaService:
             logger.error(f"❌ Erro geral ao enviar mídia via file_id: {e}")
             return False
     
+    async def get_media_info(self, file_id: str) -> Dict[str, Any]:
+        """
+        Consulta um file_id no Telegram (getFile)
+        
+        Returns:
+            Dict com 'valid' (True/False, ou None se não foi possível verificar)
+            e, quando válido, file_unique_id, file_size e file_path
+        """
+        try:
+            file = await self.bot.get_file(file_id)
+            return {
+                'valid': True,
+                'file_id': file.file_id,
+                'file_unique_id': file.file_unique_id,
+                'file_size': file.file_size,
+                'file_path': file.file_path
+            }
+        except BadRequest as e:
+            message = str(e).lower()
+            if 'too big' in message:
+                # Acima de 20MB o getFile não baixa, mas o file_id continua válido para envio
+                return {'valid': True, 'file_id': file_id}
+            if any(error in message for error in INVALID_FILE_ID_ERRORS):
+                return {'valid': False, 'error': str(e)}
+            return {'valid': None, 'error': str(e)}
+        except TelegramError as e:
+            logger.warning(f"⚠️  Não foi possível verificar file_id: {e}")
+            return {'valid': None, 'error': str(e)}
+    
+    async def download_media(self, file_id: str) -> Optional[bytes]:
+        """Baixa o conteúdo de um file_id (até 20MB, limite do getFile)"""
+        try:
+            file = await self.bot.get_file(file_id)
+            return bytes(await file.download_as_bytearray())
+        except TelegramError as e:
+            logger.warning(f"⚠️  Não foi possível baixar a mídia {file_id}: {e}")
+            return None
+    
     def validate_media_file(self, file, allowed_types: dict = None) -> Dict[str, Any]:
         """
         Valida arquivo de mídia
@@ -182,9 +224,8 @@ class TelegramMediaService:
                 'error': f'Tipo de arquivo não suportado: .{extension}'
             }
         
-        # Verifica tamanho (25MB = 25 * 1024 * 1024 bytes)
-        max_size = 25 * 1024 * 1024
-        if hasattr(file, 'content_length') and file.content_length > max_size:
+        # Verifica tamanho declarado (o tamanho real é conferido durante a gravação no store)
+        if hasattr(file, 'content_length') and file.content_length > MAX_MEDIA_SIZE:
             return {
                 'valid': False,
                 'error': 'Arquivo muito grande. Máximo: 25MB'
@@ -196,57 +237,3 @@ class TelegramMediaService:
             'extension': extension,
             'filename': filename
         }
-    
-    def create_temp_file(self, file, prefix: str = "media_") -> str:
-        """
-        Cria arquivo temporário para upload
-        
-        Args:
-            file: Arquivo do upload
-            prefix: Prefixo do arquivo temporário
-            
-        Returns:
-            Caminho do arquivo temporário
-        """
-        # Cria arquivo temporário
-        temp_fd, temp_path = tempfile.mkstemp(
-            suffix=f".{file.filename.rsplit('.', 1)[1]}" if '.' in file.filename else '',
-            prefix=prefix
-        )
-        
-        try:
-            # Salva o arquivo
-            with os.fdopen(temp_fd, 'wb') as temp_file:
-                file.save(temp_file)
-            return temp_path
-        except Exception as e:
-            # Remove arquivo em caso de erro
-            os.close(temp_fd)
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
-            raise e
-    
-    def cleanup_temp_file(self, temp_path: str):
-        """Remove arquivo temporário"""
-        try:
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
-                logger.info(f"🗑️  Arquivo temporário removido: {temp_path}")
-        except Exception as e:
-            logger.warning(f"⚠️  Erro ao remover arquivo temporário {temp_path}: {e}")
-
-# Função auxiliar para uso em rotas síncronas
-def run_async_media_upload(bot_token: str, file_path: str, log_group_id: str, bot_id: int, media_type: str) -> Optional[str]:
-    """Wrapper síncrono para upload de mídia"""
-    try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        service = TelegramMediaService(bot_token)
-        return loop.run_until_complete(
-            service.upload_media_to_telegram(file_path, log_group_id, bot_id, media_type)
-        )
-    except Exception as e:
-        logger.error(f"❌ Erro no upload síncrono: {e}")
-        return None
-    finally:
-        loop.close()
\ No newline at end of file
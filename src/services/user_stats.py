@@ -0,0 +1,98 @@
+"""
+Estatísticas de bots por usuário para o painel (total, ativos e vagas)
+Uma única consulta agregada (COUNT ... FILTER) por usuário, guardada durante a requisição
+(flask.g) e por USER_STATS_CACHE_TTL segundos no processo; criar, editar ou ativar um bot
+invalida o cache. A lista de bots vem de uma consulta que traz só as colunas exibidas
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from flask import current_app, g, has_request_context
+from sqlalchemy import func
+from ..models.bot import TelegramBot
+from ..database.models import db
+
+MAX_ACTIVE_BOTS = 30  # limite de bots ativos por usuário
+
+# Colunas usadas pela listagem e pelo dashboard (sem textos, mídias e planos)
+BOT_LIST_COLUMNS = (
+    TelegramBot.id, TelegramBot.bot_username, TelegramBot.bot_name, TelegramBot.is_active,
+    TelegramBot.is_running, TelegramBot.last_activity, TelegramBot.created_at,
+)
+
+@dataclass(frozen=True)
+class UserStats:
+    total_bots: int
+    active_bots: int
+
+    @property
+    def remaining_slots(self) -> int:
+        return max(0, MAX_ACTIVE_BOTS - self.active_bots)
+
+    @property
+    def can_add_bot(self) -> bool:
+        return self.active_bots < MAX_ACTIVE_BOTS
+
+class UserStatsService:
+    """Contagens de bots por usuário com cache da requisição e TTL curto"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache: Dict[int, Tuple[float, UserStats]] = {}  # user_id -> (expira em, estatísticas)
+
+    def get(self, user_id: int) -> UserStats:
+        """Estatísticas do usuário (requisição atual, cache do processo ou banco)"""
+        request_cache = self._request_cache()
+        if request_cache is not None and user_id in request_cache:
+            return request_cache[user_id]
+
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(user_id)
+        if cached and cached[0] > now:
+            stats = cached[1]
+        else:
+            stats = self._query(user_id)
+            with self._lock:
+                self._cache[user_id] = (now + current_app.config['USER_STATS_CACHE_TTL'], stats)
+
+        if request_cache is not None:
+            request_cache[user_id] = stats
+        return stats
+
+    def invalidate(self, user_id: int):
+        """Descarta as estatísticas do usuário (chamar após criar, editar ou ativar um bot)"""
+        with self._lock:
+            self._cache.pop(user_id, None)
+        request_cache = self._request_cache()
+        if request_cache is not None:
+            request_cache.pop(user_id, None)
+
+    @staticmethod
+    def _request_cache() -> Optional[dict]:
+        if not has_request_context():
+            return None
+        if 'user_stats' not in g:
+            g.user_stats = {}
+        return g.user_stats
+
+    @staticmethod
+    def _query(user_id: int) -> UserStats:
+        total, active = db.session.query(
+            func.count(TelegramBot.id),
+            func.count(TelegramBot.id).filter(TelegramBot.is_active.is_(True))
+        ).filter(TelegramBot.user_id == user_id).one()
+        return UserStats(total_bots=total or 0, active_bots=active or 0)
+
+    @staticmethod
+    def list_bots(user_id: int, limit: Optional[int] = None) -> List:
+        """Bots do usuário só com as colunas exibidas (linhas com os mesmos nomes de atributo do modelo)"""
+        query = db.session.query(*BOT_LIST_COLUMNS).filter(TelegramBot.user_id == user_id).order_by(TelegramBot.id)
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+
+# Instância global do serviço
+user_stats = UserStatsService()
@@ -0,0 +1,215 @@
+"""
+Consumidor da fila durável de webhooks da PushinPay (tabela webhook_events)
+A rota só grava o evento e responde; um pool de threads aplica os eventos em
+lote: aprovação idempotente (outbox de liberação) ou falha do pagamento
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import and_, or_
+from ..models.payment import Payment
+from ..models.webhook_event import WebhookEvent
+from ..database.models import db
+from .fulfillment_service import confirm_payment
+from ..utils.logger import logger
+
+# Status da PushinPay que confirmam ou encerram o pagamento
+PAID_STATUSES = {'approved', 'paid', 'completed', 'success'}
+FAILED_STATUSES = {'cancelled', 'canceled', 'failed', 'expired'}
+
+PURGE_INTERVAL = 3600  # segundos entre limpezas de eventos antigos já aplicados
+
+class WebhookEventConsumer:
+    """Pool de threads que aplica em lote os eventos de webhook pendentes"""
+
+    def __init__(self):
+        self._app = None
+        self._threads: List[threading.Thread] = []
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._purge_lock = threading.Lock()
+        self._last_purge = 0.0
+
+    def start(self, app):
+        """Inicia o pool de consumidores (cada thread com seu app_context e sessão)"""
+        if any(thread.is_alive() for thread in self._threads):
+            return
+
+        self._app = app
+        self._stopping.clear()
+        self._threads = [
+            threading.Thread(target=self._worker, name=f'webhook-consumer-{i}', daemon=True)
+            for i in range(app.config['WEBHOOK_CONSUMER_THREADS'])
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"📥 {len(self._threads)} consumidores de webhook iniciados")
+
+    def notify(self):
+        """Acorda os consumidores para aplicar eventos recém-gravados"""
+        self._wakeup.set()
+
+    def stop(self, timeout: float = 5):
+        """Para os consumidores e aguarda as threads"""
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _worker(self):
+        """Laço de uma thread consumidora"""
+        with self._app.app_context():
+            config = self._app.config
+            while not self._stopping.is_set():
+                try:
+                    applied = self.apply_batch()
+                    self._maybe_purge()
+                except Exception as e:
+                    logger.error(f"❌ Erro ao aplicar eventos de webhook: {e}")
+                    db.session.rollback()
+                    applied = 0
+                finally:
+                    db.session.remove()
+
+                # Lote cheio: provavelmente há mais eventos esperando
+                if applied >= config['WEBHOOK_CONSUMER_BATCH_SIZE']:
+                    continue
+
+                self._wakeup.wait(config['WEBHOOK_CONSUMER_POLL_INTERVAL'])
+                self._wakeup.clear()
+
+    @staticmethod
+    def _claimable(stale_before: datetime):
+        """Eventos pendentes ou em processamento abandonado (consumidor caiu)"""
+        return or_(
+            WebhookEvent.state == 'pending',
+            and_(WebhookEvent.state == 'processing', WebhookEvent.locked_at < stale_before)
+        )
+
+    def _claim_batch(self) -> List[Tuple[int, str, str, int]]:
+        """Assume um lote de eventos com compare-and-set (outros consumidores podem competir)"""
+        config = self._app.config
+        now = datetime.utcnow()
+        stale_before = now - timedelta(seconds=config['WEBHOOK_CONSUMER_LOCK_TIMEOUT'])
+
+        candidates = db.session.query(WebhookEvent.id).filter(
+            self._claimable(stale_before)
+        ).order_by(WebhookEvent.id).limit(config['WEBHOOK_CONSUMER_BATCH_SIZE']).all()
+
+        claimed = []
+        for (event_id,) in candidates:
+            updated = WebhookEvent.query.filter(
+                WebhookEvent.id == event_id,
+                self._claimable(stale_before)
+            ).update({'state': 'processing', 'locked_at': now}, synchronize_session=False)
+            if updated:
+                claimed.append(event_id)
+        db.session.commit()
+
+        if not claimed:
+            return []
+
+        return db.session.query(
+            WebhookEvent.id, WebhookEvent.transaction_id, WebhookEvent.status, WebhookEvent.attempts
+        ).filter(WebhookEvent.id.in_(claimed)).order_by(WebhookEvent.id).all()
+
+    def apply_batch(self) -> int:
+        """Aplica um lote de eventos; retorna quantos foram assumidos"""
+        events = self._claim_batch()
+        if not events:
+            return 0
+
+        # Um resultado por transação: o evento de pagamento confirmado prevalece sobre os demais
+        statuses: Dict[str, str] = {}
+        for _, transaction_id, status, _ in events:
+            status = (status or '').lower()
+            if statuses.get(transaction_id) not in PAID_STATUSES:
+                statuses[transaction_id] = status
+
+        payment_ids = dict(
+            db.session.query(Payment.pix_code, Payment.id).filter(Payment.pix_code.in_(list(statuses))).all()
+        )
+
+        outcomes: Dict[str, Optional[str]] = {}  # transaction_id -> erro (None = aplicado)
+        for transaction_id, status in statuses.items():
+            payment_id = payment_ids.get(transaction_id)
+            if payment_id is None:
+                logger.error(f"Pagamento não encontrado para ID: {transaction_id}")
+                outcomes[transaction_id] = 'pagamento não encontrado'
+                continue
+
+            try:
+                self._apply(payment_id, transaction_id, status)
+                outcomes[transaction_id] = None
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"❌ Erro ao aplicar webhook da transação {transaction_id}: {e}")
+                outcomes[transaction_id] = str(e)
+
+        self._record_outcomes(events, outcomes, set(payment_ids))
+        return len(events)
+
+    def _apply(self, payment_id: int, transaction_id: str, status: str):
+        """Aplica o status informado pela PushinPay ao pagamento (idempotente)"""
+        if status in PAID_STATUSES:
+            if confirm_payment(payment_id, 'completed'):
+                logger.info(f"Pagamento {transaction_id} confirmado via webhook")
+
+        elif status in FAILED_STATUSES:
+            updated = Payment.query.filter_by(id=payment_id, status='pending').update(
+                {'status': 'failed'}, synchronize_session=False
+            )
+            db.session.commit()
+            if updated:
+                logger.info(f"Pagamento {transaction_id} cancelado/falhado")
+
+    def _record_outcomes(self, events, outcomes: Dict[str, Optional[str]], known: set):
+        """Marca os eventos do lote como aplicados, falhos ou para nova tentativa"""
+        now = datetime.utcnow()
+        max_attempts = self._app.config['WEBHOOK_CONSUMER_MAX_ATTEMPTS']
+
+        done_ids = [event_id for event_id, transaction_id, _, _ in events if outcomes[transaction_id] is None]
+        if done_ids:
+            WebhookEvent.query.filter(WebhookEvent.id.in_(done_ids)).update(
+                {'state': 'done', 'processed_at': now, 'locked_at': None}, synchronize_session=False
+            )
+
+        for event_id, transaction_id, _, attempts in events:
+            error = outcomes[transaction_id]
+            if error is None:
+                continue
+
+            # Pagamento desconhecido não melhora com novas tentativas
+            exhausted = transaction_id not in known or attempts + 1 >= max_attempts
+            WebhookEvent.query.filter_by(id=event_id).update({
+                'state': 'failed' if exhausted else 'pending',
+                'attempts': attempts + 1,
+                'last_error': error,
+                'locked_at': None,
+                'processed_at': now if exhausted else None
+            }, synchronize_session=False)
+
+        db.session.commit()
+
+    def _maybe_purge(self):
+        """Remove eventos já aplicados mais antigos que WEBHOOK_EVENT_RETENTION_DAYS (no máximo uma vez por hora)"""
+        if time.monotonic() - self._last_purge < PURGE_INTERVAL or not self._purge_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_purge = time.monotonic()
+            cutoff = datetime.utcnow() - timedelta(days=self._app.config['WEBHOOK_EVENT_RETENTION_DAYS'])
+            deleted = WebhookEvent.query.filter(
+                WebhookEvent.state == 'done',
+                WebhookEvent.processed_at < cutoff
+            ).delete(synchronize_session=False)
+            db.session.commit()
+            if deleted:
+                logger.info(f"🧹 {deleted} eventos de webhook antigos removidos")
+        finally:
+            self._purge_lock.release()
+
+# Instância global do consumidor
+webhook_consumer = WebhookEventConsumer()
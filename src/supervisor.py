@@ -0,0 +1,232 @@
+"""
+Supervisor de workers de bots Telegram
+Cria N processos, cada um hospedando apenas os bots atribuídos a ele por hash consistente
+
+Uso:
+    python -m src.supervisor --workers 4
+
+O processo web (gunicorn src.wsgi:app / python -m src.app) deve rodar com BOT_WORKERS definido para não hospedar bots.
+Só funciona com TELEGRAM_UPDATE_MODE=polling: no modo webhook os updates chegam ao processo
+web, que não tem as Applications dos bots (ver check_update_mode).
+As métricas dos bots (handlers, filas, chamadas ao Telegram) ficam nos workers: com
+WORKER_METRICS_PORT definido, cada worker serve /metrics em WORKER_METRICS_PORT + índice.
+"""
+
+import argparse
+import hmac
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+from typing import Dict, List
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+from .utils.hash_ring import HashRing
+from .utils.logger import logger
+
+RESPAWN_DELAY = 5  # segundos antes de recriar um worker que morreu
+STOP_TIMEOUT = 30  # segundos para um worker encerrar seus bots
+
+WEBHOOK_MODE_UNSUPPORTED = (
+    "TELEGRAM_UPDATE_MODE=webhook não é suportado com BOT_WORKERS > 0: os updates chegam ao "
+    "processo web, que não hospeda bots, e receberiam 503 para sempre. Use TELEGRAM_UPDATE_MODE=polling "
+    "com o supervisor, ou BOT_WORKERS=0 para hospedar os bots no processo web"
+)
+
+def check_update_mode(update_mode: str):
+    """Recusa o modo webhook quando os bots rodam nos workers do supervisor"""
+    if update_mode == 'webhook':
+        logger.error(f"❌ {WEBHOOK_MODE_UNSUPPORTED}")
+        raise RuntimeError(WEBHOOK_MODE_UNSUPPORTED)
+
+def prepare_database():
+    """Cria as tabelas uma única vez, antes dos workers (evita corrida no create_all)"""
+    from .app import create_app
+    create_app(start_bots=False, consume_webhooks=False)
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+def serve_worker_metrics(app, port: int):
+    """
+    Serve o /metrics deste worker em uma thread (mesma autenticação por METRICS_TOKEN do processo web)
+
+    Returns:
+        O servidor WSGI (server_port tem a porta efetiva)
+    """
+    from .utils.metrics import metrics
+
+    def metrics_app(environ, start_response):
+        if environ.get('PATH_INFO') != '/metrics':
+            start_response('404 Not Found', [('Content-Type', 'text/plain')])
+            return [b'Not Found\n']
+
+        token = app.config.get('METRICS_TOKEN')
+        if token and not hmac.compare_digest(environ.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'):
+            start_response('401 Unauthorized', [('Content-Type', 'text/plain; charset=utf-8')])
+            return ['Não autorizado\n'.encode()]
+
+        # Os coletores das filas persistidas consultam o banco
+        with app.app_context():
+            body = metrics.render().encode()
+        start_response('200 OK', [('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')])
+        return [body]
+
+    server = make_server('0.0.0.0', port, metrics_app, handler_class=_QuietHandler)
+    threading.Thread(target=server.serve_forever, name='worker-metrics', daemon=True).start()
+    return server
+
+def run_worker(worker_id: str, members: List[str], control_queue):
+    """Ponto de entrada de um worker: hospeda o shard de bots atribuído a worker_id"""
+    from .app import create_app
+    from .services.bot_runner import bot_manager_service
+    from .services.bot_runtime import bot_runtime
+    from .services.telegram_bot_manager import bot_manager
+
+    # O supervisor coordena o encerramento; Ctrl+C no terminal não derruba os workers direto
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: control_queue.put({'type': 'stop'}))
+
+    bot_manager.set_shard(HashRing(members), worker_id)
+    app = create_app(start_bots=True, consume_webhooks=False)
+
+    logger.info(f"👷 Worker {worker_id} (pid {os.getpid()}) iniciado com {len(members)} workers no anel")
+
+    metrics_port = app.config['WORKER_METRICS_PORT']
+    if metrics_port:
+        port = metrics_port + int(worker_id.rsplit('-', 1)[-1])
+        try:
+            serve_worker_metrics(app, port)
+            logger.info(f"📈 Worker {worker_id} servindo /metrics na porta {port}")
+        except OSError as e:
+            logger.error(f"❌ Worker {worker_id} não conseguiu abrir /metrics na porta {port}: {e}")
+
+    try:
+        while True:
+            message = control_queue.get()
+
+            if message['type'] == 'stop':
+                break
+
+            if message['type'] == 'members':
+                logger.info(f"🔀 Worker {worker_id} rebalanceando para {message['members']}")
+                bot_runtime.submit(bot_manager.apply_shard(HashRing(message['members'])))
+    finally:
+        bot_manager_service.shutdown()
+        logger.info(f"⏹️  Worker {worker_id} encerrado")
+
+class BotSupervisor:
+    """Cria, monitora e rebalanceia os processos workers de bots"""
+
+    def __init__(self, worker_count: int):
+        self.worker_ids = [f"worker-{i}" for i in range(worker_count)]
+        self.members: List[str] = []  # workers vivos no anel
+        self.processes: Dict[str, multiprocessing.Process] = {}
+        self.queues: Dict[str, multiprocessing.Queue] = {}
+        self.dead_since: Dict[str, float] = {}
+        self._stopping = False
+
+    def _spawn(self, worker_id: str):
+        """Cria o processo do worker e o adiciona ao anel"""
+        self.members = sorted(set(self.members) | {worker_id})
+        control_queue = multiprocessing.Queue()
+        process = multiprocessing.Process(
+            target=run_worker,
+            args=(worker_id, list(self.members), control_queue),
+            name=worker_id,
+            daemon=False
+        )
+        process.start()
+        self.processes[worker_id] = process
+        self.queues[worker_id] = control_queue
+        logger.info(f"🚀 Worker {worker_id} criado (pid {process.pid})")
+
+    def _broadcast_members(self, exclude: str = None):
+        """Envia a composição atual do anel para os workers vivos"""
+        for worker_id in self.members:
+            if worker_id == exclude:
+                continue
+            self.queues[worker_id].put({'type': 'members', 'members': list(self.members)})
+
+    def start(self):
+        """Cria todos os workers com o anel completo"""
+        setup = multiprocessing.Process(target=prepare_database, name='prepare-database')
+        setup.start()
+        setup.join()
+
+        self.members = list(self.worker_ids)
+        for worker_id in self.worker_ids:
+            self._spawn(worker_id)
+
+    def check_workers(self):
+        """Remove workers mortos do anel (rebalanceando) e os recria após RESPAWN_DELAY"""
+        for worker_id in self.worker_ids:
+            process = self.processes.get(worker_id)
+
+            if worker_id in self.members and process and not process.is_alive():
+                logger.error(f"💀 Worker {worker_id} morreu (exit {process.exitcode}), rebalanceando bots")
+                self.members.remove(worker_id)
+                self.dead_since[worker_id] = time.monotonic()
+                self._broadcast_members()
+
+            elif worker_id not in self.members and time.monotonic() - self.dead_since.get(worker_id, 0) >= RESPAWN_DELAY:
+                self._spawn(worker_id)
+                self.dead_since.pop(worker_id, None)
+                self._broadcast_members(exclude=worker_id)
+
+    def stop(self):
+        """Pede para todos os workers encerrarem e aguarda"""
+        self._stopping = True
+        for worker_id, process in self.processes.items():
+            if process.is_alive():
+                self.queues[worker_id].put({'type': 'stop'})
+
+        deadline = time.monotonic() + STOP_TIMEOUT
+        for worker_id, process in self.processes.items():
+            process.join(max(0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f"⚠️  Worker {worker_id} não encerrou a tempo, finalizando")
+                process.terminate()
+
+    def run(self):
+        """Loop principal do supervisor"""
+        self.start()
+        try:
+            while not self._stopping:
+                time.sleep(1)
+                self.check_workers()
+        finally:
+            self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Supervisor de workers de bots Telegram")
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=int(os.environ.get('BOT_WORKERS', '0')) or os.cpu_count() or 1,
+        help="Número de processos workers (padrão: BOT_WORKERS ou número de CPUs)"
+    )
+    args = parser.parse_args()
+
+    from .utils.config import load_config
+    try:
+        check_update_mode(load_config().TELEGRAM_UPDATE_MODE)
+    except RuntimeError:
+        sys.exit(1)
+
+    supervisor = BotSupervisor(args.workers)
+
+    def handle_signal(signum, frame):
+        supervisor._stopping = True
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    print(f"🤖 Supervisor iniciando {args.workers} workers de bots...")
+    supervisor.run()
+
+if __name__ == '__main__':
+    main()
@@ -8,8 +8,76 @@ class Config:
     DEBUG = False
     TESTING = False
     DATABASE_URI = os.getenv("DATABASE_URI")
-    TELEGRAM_API_URL = "https://api.telegram.org/bot"
+    TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org/bot")
     WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+    # Recebimento de updates dos bots: "polling" (padrão) ou "webhook" (rota /tg/<bot_id>/<secret>)
+    TELEGRAM_UPDATE_MODE = os.getenv("TELEGRAM_UPDATE_MODE", "polling")
+    TELEGRAM_WEBHOOK_BASE_URL = os.getenv("TELEGRAM_WEBHOOK_BASE_URL", WEBHOOK_URL)
+    # Inicialização dos bots: quantos iniciam ao mesmo tempo, limite por bot e quando é "lento"
+    BOT_STARTUP_CONCURRENCY = int(os.getenv("BOT_STARTUP_CONCURRENCY", "20"))
+    BOT_STARTUP_TIMEOUT = float(os.getenv("BOT_STARTUP_TIMEOUT", "30"))
+    BOT_STARTUP_SLOW_SECONDS = float(os.getenv("BOT_STARTUP_SLOW_SECONDS", "5"))
+    # Agendador de envios ao Telegram: limite global por bot, por chat privado, por grupo e novas tentativas após 429
+    TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+    TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))
+    TELEGRAM_CHAT_BURST = float(os.getenv("TELEGRAM_CHAT_BURST", "3"))
+    TELEGRAM_GROUP_RATE_PER_MINUTE = float(os.getenv("TELEGRAM_GROUP_RATE_PER_MINUTE", "20"))
+    TELEGRAM_GROUP_BURST = float(os.getenv("TELEGRAM_GROUP_BURST", "5"))
+    TELEGRAM_SEND_MAX_RETRIES = int(os.getenv("TELEGRAM_SEND_MAX_RETRIES", "3"))
+    # Mídias de boas-vindas: store local por conteúdo e verificação periódica dos file_ids
+    MEDIA_STORE_DIR = os.getenv("MEDIA_STORE_DIR", "uploads/media")
+    MEDIA_HEALTH_INTERVAL = float(os.getenv("MEDIA_HEALTH_INTERVAL", "21600"))
+    MEDIA_HEALTH_CONCURRENCY = int(os.getenv("MEDIA_HEALTH_CONCURRENCY", "5"))
+    # Tarefas em segundo plano do painel (/bots/jobs/<id>): por quanto tempo manter as concluídas
+    BACKGROUND_JOB_RETENTION_HOURS = float(os.getenv("BACKGROUND_JOB_RETENTION_HOURS", "24"))
+    # Reconciliação dos bots com o banco: LISTEN/NOTIFY no Postgres; nos demais, consulta por updated_at a cada
+    # BOT_RECONCILE_POLL_INTERVAL segundos. A comparação completa desejado x em execução roda a cada BOT_RECONCILE_FULL_INTERVAL
+    BOT_RECONCILE_POLL_INTERVAL = float(os.getenv("BOT_RECONCILE_POLL_INTERVAL", "5"))
+    BOT_RECONCILE_FULL_INTERVAL = float(os.getenv("BOT_RECONCILE_FULL_INTERVAL", "600"))
+    # Estado de execução dos bots (is_running / last_activity): intervalo, em segundos, entre as gravações em lote
+    HEARTBEAT_FLUSH_INTERVAL = float(os.getenv("HEARTBEAT_FLUSH_INTERVAL", "5"))
+    # Endpoint /metrics (formato Prometheus): se definido, exige "Authorization: Bearer <METRICS_TOKEN>"
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+    # Supervisor: cada worker expõe suas métricas de bots em /metrics na porta WORKER_METRICS_PORT + índice do worker
+    # (worker-0 na própria porta base). 0 desativa; o /metrics do processo web não tem bots com BOT_WORKERS > 0
+    WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "0"))
+    # QR Code PIX: threads de renderização e quantos PNGs/file_ids manter em cache
+    QR_RENDER_WORKERS = int(os.getenv("QR_RENDER_WORKERS", "2"))
+    QR_CACHE_SIZE = int(os.getenv("QR_CACHE_SIZE", "512"))
+    # Cliente assíncrono da PushinPay usado pelos bots
+    PUSHINPAY_API_URL = os.getenv("PUSHINPAY_API_URL", "https://api.pushinpay.com.br/api")
+    PUSHINPAY_WEBHOOK_URL = os.getenv("PUSHINPAY_WEBHOOK_URL", "http://localhost:5000/webhook/pushinpay")
+    PUSHINPAY_TIMEOUT = float(os.getenv("PUSHINPAY_TIMEOUT", "10"))
+    PUSHINPAY_MAX_CONNECTIONS = int(os.getenv("PUSHINPAY_MAX_CONNECTIONS", "50"))
+    PUSHINPAY_MAX_CONCURRENCY_PER_TOKEN = int(os.getenv("PUSHINPAY_MAX_CONCURRENCY_PER_TOKEN", "5"))
+    # PIX simulado quando a PushinPay falha (só para desenvolvimento: em produção o cliente receberia um PIX falso)
+    PUSHINPAY_MOCK_ON_ERROR = os.getenv("PUSHINPAY_MOCK_ON_ERROR", "false").lower() == "true"
+    # Reconciliação de pagamentos pendentes: primeira verificação, backoff máximo e lote por rodada
+    PAYMENT_RECONCILE_INITIAL_DELAY = float(os.getenv("PAYMENT_RECONCILE_INITIAL_DELAY", "5"))
+    PAYMENT_RECONCILE_MAX_DELAY = float(os.getenv("PAYMENT_RECONCILE_MAX_DELAY", "300"))
+    PAYMENT_RECONCILE_BATCH_SIZE = int(os.getenv("PAYMENT_RECONCILE_BATCH_SIZE", "50"))
+    # Intervalo mínimo entre consultas à PushinPay disparadas pelo botão "Verificar Pagamento"
+    PAYMENT_VERIFY_MIN_INTERVAL = float(os.getenv("PAYMENT_VERIFY_MIN_INTERVAL", "5"))
+    # Outbox de liberação de acesso: varredura periódica, lote, tentativas e lock abandonado
+    FULFILLMENT_POLL_INTERVAL = float(os.getenv("FULFILLMENT_POLL_INTERVAL", "5"))
+    FULFILLMENT_BATCH_SIZE = int(os.getenv("FULFILLMENT_BATCH_SIZE", "50"))
+    FULFILLMENT_MAX_ATTEMPTS = int(os.getenv("FULFILLMENT_MAX_ATTEMPTS", "8"))
+    FULFILLMENT_LOCK_TIMEOUT = float(os.getenv("FULFILLMENT_LOCK_TIMEOUT", "120"))
+    # Fila durável de webhooks da PushinPay: threads consumidoras, lote, varredura e retenção
+    WEBHOOK_CONSUMER_THREADS = int(os.getenv("WEBHOOK_CONSUMER_THREADS", "2"))
+    WEBHOOK_CONSUMER_BATCH_SIZE = int(os.getenv("WEBHOOK_CONSUMER_BATCH_SIZE", "100"))
+    WEBHOOK_CONSUMER_POLL_INTERVAL = float(os.getenv("WEBHOOK_CONSUMER_POLL_INTERVAL", "2"))
+    WEBHOOK_CONSUMER_LOCK_TIMEOUT = float(os.getenv("WEBHOOK_CONSUMER_LOCK_TIMEOUT", "60"))
+    WEBHOOK_CONSUMER_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_CONSUMER_MAX_ATTEMPTS", "5"))
+    WEBHOOK_EVENT_RETENTION_DAYS = int(os.getenv("WEBHOOK_EVENT_RETENTION_DAYS", "7"))
+    # Cache (s) das contagens de bots por usuário no painel
+    USER_STATS_CACHE_TTL = float(os.getenv("USER_STATS_CACHE_TTL", "30"))
+    # Analytics: intervalo (s) de gravação dos rollups do funil
+    ANALYTICS_FLUSH_INTERVAL = float(os.getenv("ANALYTICS_FLUSH_INTERVAL", "10"))
+    # Arquivamento de pagamentos encerrados em payments_history: idade mínima, intervalo e lote
+    PAYMENT_ARCHIVE_AFTER_DAYS = int(os.getenv("PAYMENT_ARCHIVE_AFTER_DAYS", "30"))
+    PAYMENT_ARCHIVE_INTERVAL = float(os.getenv("PAYMENT_ARCHIVE_INTERVAL", "3600"))
+    PAYMENT_ARCHIVE_BATCH_SIZE = int(os.getenv("PAYMENT_ARCHIVE_BATCH_SIZE", "1000"))
 
 class DevelopmentConfig(Config):
     """Development configuration."""
@@ -0,0 +1,54 @@
+import bisect
+import hashlib
+from typing import Dict, Iterable, List, Optional
+
+class HashRing:
+    """Anel de hash consistente com nós virtuais para distribuir bots entre workers"""
+
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = 160):
+        self.replicas = replicas
+        self.nodes = set()
+        self._keys: List[int] = []  # hashes ordenados dos nós virtuais
+        self._ring: Dict[int, str] = {}  # hash -> nó
+        for node in nodes:
+            self.add_node(node)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+    def add_node(self, node: str):
+        """Adiciona um nó (worker) ao anel"""
+        if node in self.nodes:
+            return
+        self.nodes.add(node)
+        for i in range(self.replicas):
+            point = self._hash(f"{node}#{i}")
+            self._ring[point] = node
+            bisect.insort(self._keys, point)
+
+    def remove_node(self, node: str):
+        """Remove um nó do anel; apenas as chaves dele mudam de dono"""
+        if node not in self.nodes:
+            return
+        self.nodes.discard(node)
+        for i in range(self.replicas):
+            point = self._hash(f"{node}#{i}")
+            if self._ring.get(point) == node:
+                del self._ring[point]
+                index = bisect.bisect_left(self._keys, point)
+                if index < len(self._keys) and self._keys[index] == point:
+                    del self._keys[index]
+
+    def get_node(self, key) -> Optional[str]:
+        """Retorna o nó responsável pela chave (ex.: ID do bot)"""
+        if not self._keys:
+            return None
+        index = bisect.bisect(self._keys, self._hash(str(key))) % len(self._keys)
+        return self._ring[self._keys[index]]
+
+    def __contains__(self, node: str) -> bool:
+        return node in self.nodes
+
+    def __len__(self) -> int:
+        return len(self.nodes)
@@ -0,0 +1,259 @@
+"""
+Métricas no formato de exposição de texto do Prometheus (sem dependência externa)
+Contadores, gauges e histogramas com labels, decoradores para handlers dos bots e
+chamadas externas, e coletores avaliados na hora da leitura (profundidade de filas)
+"""
+
+import asyncio
+import functools
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Limites dos histogramas de latência (segundos)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names: Iterable[str], values: Iterable) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric:
+    """Base das métricas: valores por combinação de labels, protegidos por lock (loop e threads Flask)"""
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]  # contagens, soma, total
+            counts = entry[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, (list(entry[0]), entry[1], entry[2])) for key, entry in self._values.items()]
+
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames + ('le',), key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+# Coletor: devolve [(labels, valor)] no momento da leitura
+Collector = Callable[[], Iterable[Tuple[dict, float]]]
+
+class MetricsRegistry:
+    """Registro das métricas do processo e renderização em /metrics"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Tuple[str, str, Tuple[str, ...], Collector]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, name: str, documentation: str, labelnames: Tuple[str, ...], collect: Collector):
+        """Gauge calculado na leitura (ex.: tamanho das filas dos bots em execução)"""
+        self._collectors.append((name, documentation, tuple(labelnames), collect))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+
+        for name, documentation, labelnames, collect in self._collectors:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            try:
+                for labels, value in collect():
+                    key = tuple(labels.get(label, '') for label in labelnames)
+                    lines.append(f"{name}{_format_labels(labelnames, key)} {_format_value(value)}")
+            except Exception:
+                # Uma fonte indisponível não derruba a leitura das demais
+                continue
+        return '\n'.join(lines) + '\n'
+
+# Registro global e métricas da aplicação
+metrics = MetricsRegistry()
+
+HANDLER_LATENCY = metrics.histogram(
+    'botmanager_handler_duration_seconds', 'Duração dos handlers dos bots Telegram', ('bot_id', 'handler'))
+HANDLER_ERRORS = metrics.counter(
+    'botmanager_handler_errors_total', 'Exceções nos handlers dos bots (tratadas ou não)', ('bot_id', 'handler'))
+HANDLER_IN_FLIGHT = metrics.gauge(
+    'botmanager_handler_in_flight', 'Handlers em execução no momento', ('bot_id', 'handler'))
+
+EXTERNAL_LATENCY = metrics.histogram(
+    'botmanager_external_call_duration_seconds', 'Duração das chamadas a serviços externos', ('service', 'operation'))
+EXTERNAL_ERRORS = metrics.counter(
+    'botmanager_external_call_errors_total', 'Chamadas a serviços externos que falharam', ('service', 'operation'))
+EXTERNAL_IN_FLIGHT = metrics.gauge(
+    'botmanager_external_call_in_flight', 'Chamadas a serviços externos em andamento', ('service', 'operation'))
+
+TELEGRAM_LATENCY = metrics.histogram(
+    'botmanager_telegram_request_duration_seconds', 'Duração das chamadas à API do Telegram', ('bot_id', 'endpoint'))
+TELEGRAM_WAIT = metrics.histogram(
+    'botmanager_telegram_send_wait_seconds', 'Espera no agendador de envios antes da chamada', ('bot_id',))
+TELEGRAM_ERRORS = metrics.counter(
+    'botmanager_telegram_errors_total', 'Chamadas à API do Telegram que falharam', ('bot_id', 'endpoint', 'error'))
+
+def _bot_label(context) -> str:
+    application = getattr(context, 'application', None)
+    bot_id = application.bot_data.get('bot_id') if application is not None else None
+    return str(bot_id) if bot_id is not None else ''
+
+def instrument_handler(handler: str):
+    """Decora um handler `(self, update, context)` com latência, erros e em andamento por bot"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, update, context, *args, **kwargs):
+            labels = {'bot_id': _bot_label(context), 'handler': handler}
+            HANDLER_IN_FLIGHT.inc(**labels)
+            started = time.perf_counter()
+            try:
+                return await func(self, update, context, *args, **kwargs)
+            except Exception:
+                HANDLER_ERRORS.inc(**labels)
+                raise
+            finally:
+                HANDLER_LATENCY.observe(time.perf_counter() - started, **labels)
+                HANDLER_IN_FLIGHT.dec(**labels)
+        return wrapper
+    return decorator
+
+def record_handler_error(context, handler: str):
+    """Conta um erro tratado dentro do handler (os handlers capturam as exceções para responder ao usuário)"""
+    HANDLER_ERRORS.inc(bot_id=_bot_label(context), handler=handler)
+
+def _failed(result) -> bool:
+    """Resultados com success=False (dict ou dataclass) contam como erro"""
+    if isinstance(result, dict):
+        return result.get('success') is False
+    return getattr(result, 'success', None) is False
+
+def instrument_call(service: str, operation: str):
+    """Decora uma chamada externa (síncrona ou assíncrona) com latência, erros e em andamento"""
+    labels = {'service': service, 'operation': operation}
+
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                EXTERNAL_IN_FLIGHT.inc(**labels)
+                started = time.perf_counter()
+                try:
+                    result = await func(*args, **kwargs)
+                except Exception:
+                    EXTERNAL_ERRORS.inc(**labels)
+                    raise
+                finally:
+                    EXTERNAL_LATENCY.observe(time.perf_counter() - started, **labels)
+                    EXTERNAL_IN_FLIGHT.dec(**labels)
+                if _failed(result):
+                    EXTERNAL_ERRORS.inc(**labels)
+                return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            EXTERNAL_IN_FLIGHT.inc(**labels)
+            started = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                EXTERNAL_ERRORS.inc(**labels)
+                raise
+            finally:
+                EXTERNAL_LATENCY.observe(time.perf_counter() - started, **labels)
+                EXTERNAL_IN_FLIGHT.dec(**labels)
+            if _failed(result):
+                EXTERNAL_ERRORS.inc(**labels)
+            return result
+        return wrapper
+    return decorator
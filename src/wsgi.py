@@ -0,0 +1,8 @@
+"""
+Ponto de entrada WSGI do painel (gunicorn src.wsgi:app)
+Processo web: recebe os webhooks da PushinPay e aplica a fila de eventos
+"""
+
+from .app import create_app
+
+app = create_app(consume_webhooks=True)
@@ -0,0 +1,40 @@
+import os
+import sys
+import tempfile
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# A configuração é lida na importação de src: definir o ambiente antes
+WORK_DIR = tempfile.mkdtemp(prefix='botmanager-tests-')
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{os.path.join(WORK_DIR, 'test.db')}",
+    TELEGRAM_UPDATE_MODE='webhook',
+    TELEGRAM_WEBHOOK_BASE_URL='https://example.test',
+)
+os.environ.pop('BOT_WORKERS', None)
+
+from fake_telegram import FakeTelegram
+
+@pytest.fixture(scope='session')
+def fake_telegram():
+    server = FakeTelegram()
+    server.start()
+    yield server
+    server.stop()
+
+@pytest.fixture(scope='session')
+def app(fake_telegram):
+    """Aplicação sem bots iniciados (cada teste inicia os que precisa) e uploads no diretório temporário"""
+    from src.app import create_app
+    from src.services.bot_runner import bot_manager_service
+
+    cwd = os.getcwd()
+    os.chdir(WORK_DIR)
+    app = create_app(start_bots=False, consume_webhooks=False)
+    app.config.update(TESTING=True, TELEGRAM_API_URL=fake_telegram.api_url)
+    yield app
+    bot_manager_service.shutdown()
+    os.chdir(cwd)
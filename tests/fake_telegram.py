@@ -0,0 +1,111 @@
+"""
+Servidor HTTP falso da Bot API do Telegram para os testes
+Responde aos métodos usados pelos bots e registra cada chamada (método e parâmetros)
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+class FakeTelegram:
+    """Bot API falsa em 127.0.0.1 (porta livre); use api_url como TELEGRAM_API_URL"""
+
+    def __init__(self):
+        self.calls: List[Tuple[str, dict]] = []
+        self.delay = 0.0  # segundos de espera antes de cada resposta
+        self.peak: Dict[str, int] = {}  # método -> maior número de chamadas simultâneas
+        self._in_flight: Dict[str, int] = {}
+        self._message_id = 100
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def api_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}/bot"
+
+    def start(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def methods(self) -> List[str]:
+        with self._lock:
+            return [method for method, _ in self.calls]
+
+    def wait_for(self, method: str, timeout: float = 5.0, **params) -> Optional[dict]:
+        """Espera uma chamada de `method` com os parâmetros informados (None se não vier)"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                for called, called_params in self.calls:
+                    if called == method and all(str(called_params.get(k)) == str(v) for k, v in params.items()):
+                        return called_params
+            time.sleep(0.05)
+        return None
+
+    def _record(self, method: str, params: dict):
+        with self._lock:
+            self.calls.append((method, params))
+            self._in_flight[method] = self._in_flight.get(method, 0) + 1
+            self.peak[method] = max(self.peak.get(method, 0), self._in_flight[method])
+
+    def _finish(self, method: str):
+        with self._lock:
+            self._in_flight[method] -= 1
+
+    def _message(self, chat_id) -> dict:
+        with self._lock:
+            self._message_id += 1
+            message_id = self._message_id
+        return {
+            'message_id': message_id,
+            'date': int(time.time()),
+            'chat': {'id': int(chat_id), 'type': 'private'},
+        }
+
+    def _result(self, method: str, params: dict):
+        if method == 'getMe':
+            return {'id': 1, 'is_bot': True, 'first_name': 'Fake', 'username': 'fakebot'}
+        if method == 'getUpdates':
+            return []
+        if method.startswith('send'):
+            return self._message(params.get('chat_id', 1))
+        return True
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                content_type = self.headers.get('Content-Type', '')
+                if 'json' in content_type:
+                    params = json.loads(body or b'{}')
+                elif 'urlencoded' in content_type:
+                    params = {k: v[0] for k, v in parse_qs(body.decode()).items()}
+                else:
+                    params = {}
+
+                method = self.path.rsplit('/', 1)[-1]
+                fake._record(method, params)
+                if fake.delay:
+                    time.sleep(fake.delay)
+                fake._finish(method)
+                data = json.dumps({'ok': True, 'result': fake._result(method, params)}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
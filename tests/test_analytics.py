@@ -0,0 +1,36 @@
+from src.database.models import db
+from src.models.bot import TelegramBot
+from src.models.client import User
+from src.models.fulfillment import FulfillmentOutbox
+from src.models.payment import Payment
+from src.services import fulfillment_service
+from src.services.analytics import analytics
+
+def test_confirmed_payment_is_recorded_at_its_paid_at(app, monkeypatch):
+    recorded = []
+    monkeypatch.setattr(analytics, 'record_payment', lambda *args: recorded.append(args))
+    monkeypatch.setattr(fulfillment_service.fulfillment_worker, 'notify', lambda: None)
+
+    with app.app_context():
+        user = User(username='analytics', email='analytics@example.test')
+        user.set_password('senha')
+        db.session.add(user)
+        db.session.flush()
+        bot = TelegramBot(bot_token='333:CCC', user_id=user.id)
+        db.session.add(bot)
+        db.session.flush()
+        payment = Payment(pix_code='pix-analytics', amount=19.9, plan_name='Mensal', user_id=user.id, bot_id=bot.id)
+        db.session.add(payment)
+        db.session.commit()
+        ids = (user.id, bot.id, payment.id)
+
+        assert fulfillment_service.confirm_payment(payment.id, 'approved')
+        paid_at = Payment.query.get(payment.id).paid_at
+
+        FulfillmentOutbox.query.filter_by(payment_id=ids[2]).delete()
+        Payment.query.filter_by(id=ids[2]).delete()
+        TelegramBot.query.filter_by(id=ids[1]).delete()
+        User.query.filter_by(id=ids[0]).delete()
+        db.session.commit()
+
+    assert recorded == [(ids[1], ids[0], 'Mensal', 19.9, paid_at)]
@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+from src.database.models import db
+from src.models.bot import TelegramBot
+from src.models.client import User
+from src.services.bot_runtime import bot_runtime
+from src.services.telegram_bot_manager import TelegramBotManager
+
+BOT_COUNT = 6
+CONCURRENCY = 2
+
+@pytest.fixture
+def active_bots(app):
+    with app.app_context():
+        user = User(username='boot', email='boot@example.test', pushinpay_token='tok')
+        user.set_password('senha')
+        db.session.add(user)
+        db.session.flush()
+        bots = [
+            TelegramBot(bot_token=f'{700 + i}:ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghi', bot_username=f'boot{i}',
+                        user_id=user.id, is_active=True)
+            for i in range(BOT_COUNT)
+        ]
+        db.session.add_all(bots)
+        db.session.commit()
+        bot_ids, user_id = [bot.id for bot in bots], user.id
+
+    yield bot_ids
+    with app.app_context():
+        TelegramBot.query.filter(TelegramBot.id.in_(bot_ids)).delete(synchronize_session=False)
+        User.query.filter_by(id=user_id).delete()
+        db.session.commit()
+
+@pytest.fixture
+def startup_config(app, fake_telegram):
+    saved = app.config['BOT_STARTUP_CONCURRENCY']
+    app.config['BOT_STARTUP_CONCURRENCY'] = CONCURRENCY
+    fake_telegram.delay = 0.2
+    fake_telegram.peak.pop('getMe', None)
+    yield
+    fake_telegram.delay = 0.0
+    app.config['BOT_STARTUP_CONCURRENCY'] = saved
+
+def test_boot_respects_startup_concurrency(app, fake_telegram, active_bots, startup_config):
+    manager = TelegramBotManager()
+
+    async def boot():
+        try:
+            await manager.start_all_active_bots()
+        finally:
+            await manager.stop_all_bots()
+
+    bot_runtime.run(boot(), 60)
+
+    report = manager.last_startup_report
+    assert sorted(entry['bot_id'] for entry in report['started']) == active_bots
+    assert not report['failed']
+    assert fake_telegram.peak['getMe'] == CONCURRENCY
+
+def test_individual_starts_share_the_startup_limit(app, fake_telegram, active_bots, startup_config):
+    manager = TelegramBotManager()
+
+    async def start_individually():
+        bots = TelegramBot.query.filter(TelegramBot.id.in_(active_bots)).all()
+        try:
+            results = await asyncio.gather(*(manager.start_bot_limited(bot) for bot in bots))
+        finally:
+            await manager.stop_all_bots()
+        return [started for started, _ in results]
+
+    assert all(bot_runtime.run(start_individually(), 60))
+    assert fake_telegram.peak['getMe'] == CONCURRENCY
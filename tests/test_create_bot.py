@@ -0,0 +1,26 @@
+from src.database.models import db
+from src.models.bot import TelegramBot
+from src.models.client import User
+
+BOT_TOKEN = '654321:ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghi'
+
+def test_create_bot_requires_pushinpay_token_before_saving(app):
+    with app.app_context():
+        user = User(username='sem_token', email='sem_token@example.test')
+        user.set_password('senha')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+    response = client.post('/bots/create', json={'token': BOT_TOKEN, 'name': 'Sem token'})
+
+    assert response.status_code == 400
+    assert 'PushinPay' in response.get_json()['error']
+    with app.app_context():
+        assert TelegramBot.query.filter_by(bot_token=BOT_TOKEN).count() == 0
+        User.query.filter_by(id=user_id).delete()
+        db.session.commit()
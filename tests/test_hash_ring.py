@@ -0,0 +1,51 @@
+from src.services.telegram_bot_manager import TelegramBotManager
+from src.utils.hash_ring import HashRing
+
+WORKERS = ['worker-0', 'worker-1', 'worker-2', 'worker-3']
+BOT_IDS = range(1, 2001)
+
+def assignment(ring: HashRing) -> dict:
+    return {bot_id: ring.get_node(bot_id) for bot_id in BOT_IDS}
+
+def test_ownership_is_stable():
+    first = assignment(HashRing(WORKERS))
+    # Ordem de inserção não importa e o resultado não depende do processo (md5, não hash())
+    assert assignment(HashRing(reversed(WORKERS))) == first
+    assert set(first.values()) == set(WORKERS)
+
+def test_removing_worker_only_moves_its_bots():
+    ring = HashRing(WORKERS)
+    before = assignment(ring)
+    ring.remove_node('worker-2')
+    after = assignment(ring)
+
+    moved = {bot_id for bot_id in BOT_IDS if before[bot_id] != after[bot_id]}
+    assert moved == {bot_id for bot_id, node in before.items() if node == 'worker-2'}
+    assert 'worker-2' not in after.values()
+
+def test_adding_worker_back_restores_assignment():
+    ring = HashRing(WORKERS)
+    before = assignment(ring)
+    ring.remove_node('worker-1')
+    ring.add_node('worker-1')
+    assert assignment(ring) == before
+
+def test_owns_bot_follows_shard():
+    ring = HashRing(WORKERS)
+    managers = {worker_id: TelegramBotManager() for worker_id in WORKERS}
+    for worker_id, manager in managers.items():
+        manager.set_shard(ring, worker_id)
+
+    for bot_id in BOT_IDS:
+        owners = [worker_id for worker_id, manager in managers.items() if manager.owns_bot(bot_id)]
+        assert owners == [ring.get_node(bot_id)]
+
+def test_owns_bot_without_shard_or_hosting():
+    manager = TelegramBotManager()
+    assert manager.owns_bot(1)
+
+    manager.set_shard(HashRing(['worker-0']), 'worker-0')
+    assert manager.owns_bot(1)
+
+    manager.hosting = False
+    assert not manager.owns_bot(1)
@@ -0,0 +1,37 @@
+import asyncio
+from types import SimpleNamespace
+from src.services.telegram_bot_manager import bot_manager
+from src.utils.metrics import HANDLER_ERRORS, HANDLER_LATENCY
+
+def fake_context(bot_id: int):
+    return SimpleNamespace(application=SimpleNamespace(bot_data={'bot_id': bot_id}), bot=None)
+
+def fake_update(reply_text):
+    message = SimpleNamespace(text='oi', reply_text=reply_text)
+    user = SimpleNamespace(id=7, username='cliente')
+    return SimpleNamespace(message=message, effective_message=message, effective_user=user, callback_query=None)
+
+def errors(bot_id: int, handler: str) -> float:
+    return HANDLER_ERRORS._values.get((str(bot_id), handler), 0)
+
+def test_handled_exception_counts_as_handler_error():
+    async def failing_reply(*args, **kwargs):
+        raise RuntimeError('falha no envio')
+
+    asyncio.run(bot_manager._handle_any_text(fake_update(failing_reply), fake_context(901)))
+
+    assert errors(901, 'text') == 1
+
+def test_start_callback_is_not_measured_as_start(app):
+    sent = []
+
+    async def reply(*args, **kwargs):
+        sent.append(args)
+
+    with app.app_context():
+        # Sem configuração em cache: responde com o aviso de erro de configuração
+        asyncio.run(bot_manager._handle_start_callback(fake_update(reply), fake_context(902)))
+
+    assert sent
+    assert ('902', 'start') not in HANDLER_LATENCY._values
+    assert errors(902, 'start') == 0
@@ -0,0 +1,65 @@
+import asyncio
+import httpx
+import pytest
+from src.services.pushinpay_client import AsyncPushinPayClient
+
+@pytest.fixture
+def pushinpay_config(app):
+    saved = {key: app.config[key] for key in ('PUSHINPAY_TIMEOUT', 'PUSHINPAY_MAX_CONCURRENCY_PER_TOKEN')}
+    with app.app_context():
+        yield app.config
+    app.config.update(saved)
+
+def client_with(handler) -> AsyncPushinPayClient:
+    client = AsyncPushinPayClient()
+    client._client = httpx.AsyncClient(base_url='https://pushinpay.test/api', transport=httpx.MockTransport(handler))
+    return client
+
+def test_mock_on_error_is_off_by_default(pushinpay_config):
+    assert pushinpay_config['PUSHINPAY_MOCK_ON_ERROR'] is False
+
+def test_create_pix_times_out_without_mock(pushinpay_config):
+    pushinpay_config['PUSHINPAY_TIMEOUT'] = 0.1
+
+    async def slow_api(request):
+        await asyncio.sleep(1)
+        return httpx.Response(201, json={'id': 'pix-1'})
+
+    async def scenario():
+        client = client_with(slow_api)
+        try:
+            return await client.create_pix_payment('Bearer tok', 10.0)
+        finally:
+            await client.aclose()
+
+    charge = asyncio.run(scenario())
+    assert not charge.success
+    assert not charge.mock
+    assert charge.error == 'Tempo esgotado ao gerar PIX'
+
+def test_concurrency_is_limited_per_token(pushinpay_config):
+    pushinpay_config['PUSHINPAY_MAX_CONCURRENCY_PER_TOKEN'] = 2
+    in_flight = {}
+    peak = {}
+
+    async def api(request):
+        token = request.headers['Authorization']
+        in_flight[token] = in_flight.get(token, 0) + 1
+        peak[token] = max(peak.get(token, 0), in_flight[token])
+        await asyncio.sleep(0.02)
+        in_flight[token] -= 1
+        return httpx.Response(200, json={'status': 'paid'})
+
+    async def scenario():
+        client = client_with(api)
+        try:
+            return await asyncio.gather(*(
+                client.check_payment_status(token, str(i))
+                for i in range(6) for token in ('Bearer a', 'Bearer b')
+            ))
+        finally:
+            await client.aclose()
+
+    results = asyncio.run(scenario())
+    assert all(result.paid for result in results)
+    assert peak == {'Bearer a': 2, 'Bearer b': 2}
@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+from src.database.models import db
+from src.models.bot import TelegramBot
+from src.models.client import User
+from src.services.pushinpay_service import pushinpay_service
+
+def test_saving_token_bumps_owner_bots(app, monkeypatch):
+    monkeypatch.setattr(pushinpay_service, 'validate_pushinpay_token', lambda token: {'valid': True})
+    old = datetime.utcnow() - timedelta(days=1)
+
+    with app.app_context():
+        owner = User(username='dono', email='dono@example.test')
+        other = User(username='outro', email='outro@example.test')
+        for user in (owner, other):
+            user.set_password('senha')
+        db.session.add_all([owner, other])
+        db.session.flush()
+        owned = TelegramBot(bot_token='111:AAA', user_id=owner.id, updated_at=old)
+        foreign = TelegramBot(bot_token='222:BBB', user_id=other.id, updated_at=old)
+        db.session.add_all([owned, foreign])
+        db.session.commit()
+        owner_id, other_id, owned_id, foreign_id = owner.id, other.id, owned.id, foreign.id
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(owner_id)
+        session['_fresh'] = True
+    response = client.post('/auth/pushinpay-token', json={'token': 'novo-token'})
+    assert response.status_code == 200
+
+    with app.app_context():
+        assert User.query.get(owner_id).pushinpay_token == 'novo-token'
+        assert TelegramBot.query.get(owned_id).updated_at > old
+        assert TelegramBot.query.get(foreign_id).updated_at == old
+        TelegramBot.query.filter(TelegramBot.id.in_([owned_id, foreign_id])).delete(synchronize_session=False)
+        User.query.filter(User.id.in_([owner_id, other_id])).delete(synchronize_session=False)
+        db.session.commit()
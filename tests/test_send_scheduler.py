@@ -0,0 +1,59 @@
+import asyncio
+import time
+from telegram.error import RetryAfter
+from src.services.send_scheduler import PRIORITY_LOG, PRIORITY_PAYMENT, SendScheduler
+
+class FakeClient:
+    """Faz o papel da chamada HTTP do bot: registra a ordem e pode responder 429 uma vez por chat"""
+
+    def __init__(self, flood_chats=()):
+        self.sent = []
+        self.flood_chats = set(flood_chats)
+
+    def send(self, chat_id):
+        async def callback():
+            if chat_id in self.flood_chats:
+                self.flood_chats.discard(chat_id)
+                raise RetryAfter(1)
+            self.sent.append((chat_id, time.monotonic()))
+            return True
+        return callback
+
+def send(scheduler: SendScheduler, client: FakeClient, chat_id, priority=None):
+    rate_limit_args = {'priority': priority} if priority is not None else None
+    return scheduler.process_request(client.send(chat_id), (), {}, 'sendMessage', {'chat_id': chat_id}, rate_limit_args)
+
+def test_payment_sends_go_ahead_of_bulk():
+    async def scenario():
+        scheduler = SendScheduler(global_rate=20)
+        client = FakeClient()
+        scheduler.global_bucket.tokens = 0  # balde global vazio: todos entram na fila
+
+        await asyncio.gather(
+            send(scheduler, client, 101, PRIORITY_LOG),
+            send(scheduler, client, 102, PRIORITY_LOG),
+            send(scheduler, client, 103, PRIORITY_LOG),
+            send(scheduler, client, 200, PRIORITY_PAYMENT),
+        )
+        await scheduler.shutdown()
+        return [chat_id for chat_id, _ in client.sent]
+
+    assert asyncio.run(scenario()) == [200, 101, 102, 103]
+
+def test_retry_after_pauses_only_that_chat():
+    async def scenario():
+        scheduler = SendScheduler(global_rate=30, max_retries=1)
+        client = FakeClient(flood_chats={1})
+        started = time.monotonic()
+
+        flooded = asyncio.ensure_future(send(scheduler, client, 1))
+        await asyncio.sleep(0.05)  # o primeiro envio ao chat 1 recebe o 429
+        await send(scheduler, client, 2)
+        await flooded
+        await scheduler.shutdown()
+        return {chat_id: sent_at - started for chat_id, sent_at in client.sent}, scheduler
+
+    elapsed, scheduler = asyncio.run(scenario())
+    assert elapsed[2] < 0.5
+    assert elapsed[1] >= 0.95
+    assert scheduler._paused_until == 0.0
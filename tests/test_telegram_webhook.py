@@ -0,0 +1,72 @@
+import time
+import pytest
+from src.database.models import db
+from src.models.bot import TelegramBot
+from src.models.client import User
+from src.services.bot_runtime import bot_runtime
+from src.services.telegram_bot_manager import bot_manager, webhook_secret
+from src.supervisor import check_update_mode
+
+BOT_TOKEN = '123456:ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghi'
+
+def start_update(chat_id: int) -> dict:
+    return {
+        'update_id': 1,
+        'message': {
+            'message_id': 1,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Cliente'},
+            'text': '/start',
+            'entities': [{'type': 'bot_command', 'offset': 0, 'length': 6}],
+        },
+    }
+
+@pytest.fixture
+def running_bot(app):
+    with app.app_context():
+        user = User(username='webhook', email='webhook@example.test', pushinpay_token='tok')
+        user.set_password('senha')
+        db.session.add(user)
+        db.session.flush()
+        bot = TelegramBot(bot_token=BOT_TOKEN, bot_username='fakebot', user_id=user.id,
+                          pix_values='[10.0]', plan_names='["Mensal"]')
+        db.session.add(bot)
+        db.session.commit()
+        bot_id, user_id = bot.id, user.id
+
+    async def start():
+        return await bot_manager.start_bot(TelegramBot.query.get(bot_id))
+
+    assert bot_runtime.run(start(), 30)
+    yield bot_id
+    bot_runtime.run(bot_manager.stop_bot_by_id(bot_id), 30)
+    with app.app_context():
+        TelegramBot.query.filter_by(id=bot_id).delete()
+        User.query.filter_by(id=user_id).delete()
+        db.session.commit()
+
+def test_webhook_update_reaches_bot(app, fake_telegram, running_bot):
+    assert fake_telegram.wait_for('setWebhook') is not None
+
+    with app.app_context():
+        secret = webhook_secret(BOT_TOKEN)
+    response = app.test_client().post(
+        f'/tg/{running_bot}/{secret}', json=start_update(42),
+        headers={'X-Telegram-Bot-Api-Secret-Token': secret}
+    )
+
+    assert response.status_code == 200
+    assert fake_telegram.wait_for('sendMessage', chat_id=42) is not None
+
+def test_webhook_rejects_wrong_secret(app, running_bot):
+    response = app.test_client().post(
+        f'/tg/{running_bot}/errado', json=start_update(42),
+        headers={'X-Telegram-Bot-Api-Secret-Token': 'errado'}
+    )
+    assert response.status_code == 403
+
+def test_webhook_mode_refused_with_bot_workers():
+    with pytest.raises(RuntimeError):
+        check_update_mode('webhook')
+    check_update_mode('polling')
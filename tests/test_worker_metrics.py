@@ -0,0 +1,30 @@
+import urllib.error
+import urllib.request
+import pytest
+from src.supervisor import serve_worker_metrics
+
+@pytest.fixture
+def metrics_server(app):
+    server = serve_worker_metrics(app, 0)
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+def test_worker_serves_bot_metrics(metrics_server):
+    with urllib.request.urlopen(f"{metrics_server}/metrics") as response:
+        body = response.read().decode()
+    assert '# TYPE botmanager_handler_duration_seconds histogram' in body
+    assert 'botmanager_bots_running' in body
+
+def test_worker_metrics_requires_token(app, metrics_server):
+    app.config['METRICS_TOKEN'] = 'segredo'
+    try:
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"{metrics_server}/metrics")
+        assert error.value.code == 401
+
+        request = urllib.request.Request(f"{metrics_server}/metrics", headers={'Authorization': 'Bearer segredo'})
+        with urllib.request.urlopen(request) as response:
+            assert response.status == 200
+    finally:
+        app.config['METRICS_TOKEN'] = None